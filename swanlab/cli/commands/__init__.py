@@ -8,6 +8,7 @@ r"""
     暴露子命令
 """
 from .auth import login, logout
+from .backup import backup
 from .converter import convert
 from .dashboard import watch
 from .sync import sync
@@ -0,0 +1,70 @@
+"""
+@author: cunyue
+@file: __init__.py
+@time: 2025/7/7 11:02
+@description: 备份文件管理命令
+"""
+
+import os
+import sys
+
+import click
+
+from swanlab.log import swanlog
+from swanlab.log.backup import BackupHandler
+from swanlab.log.backup.repair import repair as repair_backup, backup_files
+
+
+@click.group()
+def backup():
+    """
+    Manage local backup files.
+    """
+    pass
+
+
+@backup.command()
+@click.argument(
+    "path",
+    type=click.Path(
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        readable=True,
+        resolve_path=True,
+    ),
+)
+@click.option(
+    "--output",
+    "-o",
+    default=None,
+    type=click.Path(dir_okay=False, resolve_path=True),
+    help="Write the repaired backup file to this path. "
+    "If not specified, the backup file is repaired in place and the original files are kept with a `.bak` suffix.",
+)
+def repair(path, output):
+    """
+    Repair a corrupted backup file, skipping damaged blocks and keeping every intact record.
+    """
+    file_path = os.path.join(path, BackupHandler.BACKUP_FILE)
+    if not os.path.exists(file_path):
+        swanlog.error(f"Can not find backup file {BackupHandler.BACKUP_FILE} in {path}.")
+        return sys.exit(1)
+    if output is not None and os.path.exists(output):
+        swanlog.error(f"Output file {output} already exists.")
+        return sys.exit(1)
+    target = output or file_path + ".repaired"
+    if output is None and os.path.exists(target):
+        os.remove(target)
+    count, lost_records, lost_bytes = repair_backup(file_path, target)
+    swanlog.info(f"Recovered {count} records, lost at least {lost_records} records ({lost_bytes} bytes).")
+    if output is not None:
+        return swanlog.info(f"Repaired backup file saved to {output}")
+    if lost_records == 0 and lost_bytes == 0:
+        os.remove(target)
+        return swanlog.info("No corruption found, backup file is unchanged.")
+    # 原地修复，保留原始文件
+    for f in backup_files(file_path):
+        os.replace(f, f + ".bak")
+    os.replace(target, file_path)
+    swanlog.info("Backup file repaired, original files are kept with a `.bak` suffix.")
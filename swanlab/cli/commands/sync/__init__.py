@@ -5,12 +5,19 @@
 @description: 同步本地数据到云端
 """
 
+import sys
+from typing import List
+
 import click
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn, TimeElapsedColumn
 
 from swanlab.core_python import create_client, auth
 from swanlab.error import KeyFileError
+from swanlab.log import swanlog
 from swanlab.package import get_key, HostFormatter
 from swanlab.sync import sync as sync_logs
+from swanlab.sync.parallel import sync_runs, SyncResult
 
 
 @click.command()
@@ -55,7 +62,29 @@ from swanlab.sync import sync as sync_logs
     type=str,
     help="The project to sync the logs to. If not specified, it will use the default project.",
 )
-def sync(path, api_key, workspace, project, host):
+@click.option(
+    "--jobs",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    help="The number of runs to sync concurrently, each run is synced in its own process. Defaults to 1.",
+)
+@click.option(
+    "--follow",
+    "-f",
+    is_flag=True,
+    default=False,
+    help="Follow backup files that are still being written and upload new records as they appear, "
+    "until the runs finish. Useful for syncing running offline experiments from a machine sharing the filesystem.",
+)
+@click.option(
+    "--follow-timeout",
+    default=None,
+    type=click.FloatRange(min=0, min_open=True),
+    help="When following, stop if no new records appear within this many seconds and mark the run as crashed. "
+    "If not specified, wait until the run finishes.",
+)
+def sync(path, api_key, workspace, project, host, jobs, follow, follow_timeout):
     """
     Synchronize local logs to the cloud.
     """
@@ -67,9 +96,48 @@ def sync(path, api_key, workspace, project, host):
         api_key = get_key() if api_key is None else api_key
     except KeyFileError:
         pass
-    for path in path:
-        # 1.3 登录，创建 http 对象
-        log_info = auth.terminal_login(api_key=api_key, save_key=False)
+    # 1.3 登录，所有实验共享同一次登录
+    log_info = auth.terminal_login(api_key=api_key, save_key=False)
+    # 2. 同步日志
+    # 2.1 单个实验直接同步，抛出错误
+    if len(path) == 1:
         create_client(log_info)
-        # 2. 同步日志
-        sync_logs(path, workspace=workspace, project_name=project, login_required=False, raise_error=len(path) == 1)
+        return sync_logs(
+            path[0],
+            workspace=workspace,
+            project_name=project,
+            login_required=False,
+            follow=follow,
+            follow_timeout=follow_timeout,
+        )
+    # 2.2 多个实验，汇总进度并在结束时输出报告
+    # 每个实验自身的终端输出会被屏蔽，进度展示绑定到当前的标准输出
+    kwargs = dict(workspace=workspace, project_name=project, follow=follow, follow_timeout=follow_timeout)
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("🔁 Syncing runs"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=Console(file=sys.stdout),
+    ) as progress:
+        task = progress.add_task("sync", total=len(path))
+        results = sync_runs(list(path), log_info, jobs=jobs, callback=lambda _: progress.advance(task), **kwargs)
+    failed = report(results)
+    if failed:
+        sys.exit(1)
+
+
+def report(results: List[SyncResult]) -> int:
+    """
+    输出同步报告
+    :return: 失败的实验数量
+    """
+    failed = [r for r in results if not r.success]
+    swanlog.info(f"Synced {len(results) - len(failed)}/{len(results)} runs")
+    for r in results:
+        if r.success:
+            swanlog.info(f"✅ {r.path} -> {r.url}")
+        else:
+            swanlog.error(f"❌ {r.path}: {r.error}")
+    return len(failed)
@@ -36,6 +36,9 @@ cli.add_command(C.convert)  # 转换命令，用于转换其他实验跟踪工
 # noinspection PyTypeChecker
 cli.add_command(C.sync)  # 同步命令，用于同步本地数据到云端
 
+# noinspection PyTypeChecker
+cli.add_command(C.backup)  # 备份命令，用于管理本地备份文件
+
 
 if __name__ == "__main__":
     cli()
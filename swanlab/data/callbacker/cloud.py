@@ -7,7 +7,6 @@
 """
 
 import sys
-from typing import Literal
 
 from rich.text import Text
 
@@ -31,7 +30,7 @@ from ...core_python import *
 from ...core_python import auth
 from ...core_python.uploader import thread
 from ...log.backup import backup
-from ...log.type import LogData
+from ...log.type import LogData, get_log_level
 from ...swanlab_settings import get_settings
 
 
@@ -93,13 +92,9 @@ class CloudRunCallback(SwanLabRunCallback):
 
     @backup("terminal")
     def _terminal_handler(self, log_data: LogData):
-        level: Literal['INFO', 'WARN']
-        if log_data['type'] == 'stdout':
-            level = "INFO"
-        elif log_data['type'] == 'stderr':
-            level = "WARN"
-        else:
+        if log_data['type'] not in ('stdout', 'stderr'):
             return swanlog.warning("Unknown log type: " + log_data['type'])
+        level = get_log_level(log_data)
         self.pool.queue.put((thread.UploadType.LOG, [LogModel(level=level, contents=log_data['contents'])]))
 
     def __str__(self):
@@ -213,6 +208,7 @@ class CloudRunCallback(SwanLabRunCallback):
         state = run.state
         sys.excepthook = self._except_handler
         swanlog_epoch = run.swanlog_epoch
+        self._flush_terminal_handler()
         self.backup.stop(error=error, epoch=swanlog_epoch + 1)
         swanlog.info("Waiting for uploading complete")
         # 关闭线程池，等待上传线程完成
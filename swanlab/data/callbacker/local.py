@@ -29,14 +29,16 @@ if package_version != "0.1.8b1":
     )
 
 
-import json
 import os
 from datetime import datetime
 from typing import Tuple, Optional, TextIO
 
-from swanlab.toolkit import RuntimeInfo, MetricInfo, SwanLabSharedSettings
+from swanlab.toolkit import RuntimeInfo, MetricInfo, SwanLabSharedSettings, create_time
+from swanlab.data.index import IndexWriter, index_path, merge_summary
 from swanlab.data.run.callback import SwanLabRunCallback
 from swanlab.log import swanlog
+from swanlab.swanlab_settings import get_settings
+from .writer import MetricWriter
 
 
 class LocalRunCallback(SwanLabRunCallback):
@@ -46,6 +48,12 @@ class LocalRunCallback(SwanLabRunCallback):
         self.board = swanboard.SwanBoardCallback()
         # 当前日志写入文件的句柄
         self.file: Optional[TextIO] = None
+        # 指标写入器，缓存分片日志句柄并定期写入摘要
+        self.metric_writer = MetricWriter()
+        # 本地索引写入器，开启 local_index 设置后创建
+        self.index: Optional[IndexWriter] = None
+        # 标量指标摘要，列名 -> 摘要
+        self._summaries = {}
 
     def __str__(self):
         return "SwanLabLocalRunCallback"
@@ -71,10 +79,9 @@ class LocalRunCallback(SwanLabRunCallback):
             # 如果句柄存在，但是文件名不一样，则关闭句柄，重新打开
             self.file.close()
             self.file = open(os.path.join(self.settings.console_dir, log_name), "a", encoding="utf-8")
-        # 写入日志
-        for content in log_data["contents"]:
-            self.file.write(content['message'] + '\n')
-            self.file.flush()
+        # 写入日志，终端输出已经被累积为批次，每个批次只刷写一次
+        self.file.write("".join(content['message'] + '\n' for content in log_data["contents"]))
+        self.file.flush()
 
     def on_init(self, proj_name: str, workspace: str, public: bool = None, logdir: str = None, *args, **kwargs):
         self.board.on_init(proj_name)
@@ -102,6 +109,19 @@ class LocalRunCallback(SwanLabRunCallback):
         self.board.before_init_experiment(
             os.path.basename(self.settings.run_dir), exp_name, description, colors=colors, num=1
         )
+        if get_settings().local_index:
+            self.index = IndexWriter(index_path(self.settings.swanlog_dir))
+            self.index.upsert_run(
+                self.settings.run_dir,
+                run_id=run_id,
+                project=self.backup.cache_proj_name,
+                workspace=self.backup.cache_workspace,
+                name=exp_name,
+                description=description,
+                mode="local",
+                state="RUNNING",
+                create_time=create_time(),
+            )
 
     def on_run(self):
         self.handle_run()
@@ -119,6 +139,14 @@ class LocalRunCallback(SwanLabRunCallback):
 
     @backup("column")
     def on_column_create(self, column_info: ColumnInfo, *args, **kwargs):
+        if self.index is not None and column_info.error is None:
+            self.index.add_column(
+                self.settings.run_dir,
+                column_info.key,
+                column_info.kid,
+                column_info.chart_type.value.column_type,
+                column_info.cls,
+            )
         # 屏蔽 board 不支持的图表类型和列类型
         if column_info.chart_type.value.chart_type not in ["line", "image", "audio", "text"]:
             return
@@ -133,12 +161,13 @@ class LocalRunCallback(SwanLabRunCallback):
         if metric_info.error:
             return
         # ---------------------------------- 保存指标数据 ----------------------------------
-        self.settings.mkdir(os.path.dirname(metric_info.metric_file_path))
-        self.settings.mkdir(os.path.dirname(metric_info.summary_file_path))
-        with open(metric_info.summary_file_path, "w+", encoding="utf-8") as f:
-            f.write(json.dumps(metric_info.metric_summary, ensure_ascii=False))
-        with open(metric_info.metric_file_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(metric_info.metric, ensure_ascii=False) + "\n")
+        self.metric_writer.write(metric_info)
+        if self.index is not None and metric_info.column_info.chart_type == metric_info.column_info.chart_type.LINE:
+            key = metric_info.column_info.key
+            self._summaries[key] = merge_summary(
+                self._summaries.get(key), metric_info.metric_step, metric_info.metric["data"]
+            )
+            self.index.update_summary(self.settings.run_dir, key, self._summaries[key])
         # ---------------------------------- 保存媒体字节流数据 ----------------------------------
         write_media_buffer(metric_info)
 
@@ -147,6 +176,16 @@ class LocalRunCallback(SwanLabRunCallback):
         训练结束，取消系统回调
         此函数被`run.finish`调用
         """
+        # 写入剩余的终端日志与指标数据
+        self._flush_terminal_handler()
+        self.metric_writer.close()
+        if self.index is not None:
+            self.index.upsert_run(
+                self.settings.run_dir,
+                state="FINISHED" if error is None else "CRASHED",
+                finish_time=create_time(),
+            )
+            self.index.close()
         # 写入错误信息
         if error is not None:
             with open(self.settings.error_path, "a") as fError:
@@ -69,5 +69,6 @@ class OfflineCallback(SwanLabRunCallback):
 
     def on_stop(self, error: str = None, *args, **kwargs):
         self._sync_tip_print()
+        self._flush_terminal_handler()
         self.backup.stop(error=error, epoch=get_run().swanlog_epoch + 1)
         self._unregister_sys_callback()
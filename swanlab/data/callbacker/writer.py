@@ -0,0 +1,150 @@
+"""
+@author: cunyue
+@file: writer.py
+@time: 2025/7/8 16:40
+@description: 本地模式下的指标写入器
+每条指标都需要追加到分片日志并更新摘要文件，如果每次都打开、关闭文件，高频记录时文件系统调用会成为瓶颈，因此：
+1. 指标先缓存在内存中，距离上次刷写超过刷写间隔时统一写入，保证 swanboard 能够及时读取到新的指标
+2. 分片日志的句柄按路径缓存，超过最大句柄数时关闭最久未使用的句柄，避免耗尽文件描述符
+   即使指标数量超过最大句柄数，每个分片日志在一次刷写中也只会打开一次
+3. 摘要文件只保留最新内容，每次刷写时写入一次，而不是每条指标都重写一次
+4. 标量指标同时追加写入列式存储，见 swanlab.data.store
+5. 后台线程每隔刷写间隔刷写一次，避免记录停止后最后的指标一直留在缓存中
+用户在主线程中记录指标，硬件监控在采集线程中记录指标，因此所有操作都需要持有锁
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, IO, Set, List, Optional
+
+from swanlab.data.store import ScalarBuffer
+from swanlab.toolkit import MetricInfo
+
+
+class MetricWriter:
+    """
+    指标写入器，关闭前必须调用 close 保证所有数据写入磁盘
+    """
+
+    def __init__(self, max_open_files: int = 128, flush_interval: float = 1):
+        """
+        :param max_open_files: 最多同时打开的分片日志句柄数
+        :param flush_interval: 最长刷写间隔，单位秒
+        """
+        assert max_open_files > 0, "max_open_files must be greater than 0"
+        self.max_open_files = max_open_files
+        self.flush_interval = flush_interval
+        # 文件路径 -> 句柄，按使用顺序排列，最后一个为最近使用的句柄
+        self._files: "OrderedDict[str, IO]" = OrderedDict()
+        # 分片日志路径 -> 尚未写入的指标
+        self._lines: Dict[str, List[str]] = {}
+        # 摘要文件路径 -> 尚未写入的最新摘要
+        self._summaries: Dict[str, dict] = {}
+        # 列目录 -> 尚未写入的标量数据点
+        self._scalars: Dict[str, ScalarBuffer] = {}
+        # 已经创建的目录
+        self._dirs: Set[str] = set()
+        self._flush_time = time.monotonic()
+        self._lock = threading.Lock()
+        # 定时刷写线程，在第一次写入时启动
+        self._flush_stop = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def _start_flush_thread(self):
+        # 刷写间隔为 0 时每次写入都会刷写，为无穷大时只在关闭时刷写，都不需要定时刷写
+        if self._flush_thread is not None or not 0 < self.flush_interval < math.inf:
+            return
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="SwanLabMetricFlush", daemon=True)
+        self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._flush_stop.wait(self.flush_interval):
+            self.flush()
+
+    def _mkdir(self, path: str):
+        if path in self._dirs:
+            return
+        os.makedirs(path, exist_ok=True)
+        self._dirs.add(path)
+
+    def _open(self, path: str, binary: bool = False) -> IO:
+        f = self._files.get(path)
+        if f is not None:
+            self._files.move_to_end(path)
+            return f
+        if len(self._files) >= self.max_open_files:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        self._mkdir(os.path.dirname(path))
+        f = open(path, "ab") if binary else open(path, "a", encoding="utf-8")
+        self._files[path] = f
+        return f
+
+    def write(self, metric_info: MetricInfo):
+        """
+        写入一条指标，数据与摘要延迟到下一次刷写时写入
+        """
+        line = json.dumps(metric_info.metric, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._start_flush_thread()
+            self._write(metric_info, line)
+
+    def _write(self, metric_info: MetricInfo, line: str):
+        lines = self._lines.get(metric_info.metric_file_path)
+        if lines is None:
+            self._lines[metric_info.metric_file_path] = [line]
+        else:
+            lines.append(line)
+        self._summaries[metric_info.summary_file_path] = metric_info.metric_summary
+        if metric_info.column_info.chart_type == metric_info.column_info.chart_type.LINE:
+            column_dir = os.path.dirname(metric_info.metric_file_path)
+            buffer = self._scalars.get(column_dir)
+            if buffer is None:
+                buffer = self._scalars[column_dir] = ScalarBuffer()
+            buffer.append(metric_info.metric)
+        if time.monotonic() - self._flush_time >= self.flush_interval:
+            self._flush()
+
+    def flush(self):
+        """
+        写入所有缓存的指标与摘要
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        for path, lines in self._lines.items():
+            f = self._open(path)
+            f.write("".join(lines))
+            f.flush()
+        self._lines.clear()
+        for column_dir, buffer in self._scalars.items():
+            for name, data in buffer.dump().items():
+                f = self._open(os.path.join(column_dir, name), binary=True)
+                f.write(data)
+                f.flush()
+        self._scalars.clear()
+        for path, summary in self._summaries.items():
+            self._mkdir(os.path.dirname(path))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(summary, ensure_ascii=False))
+        self._summaries.clear()
+        self._flush_time = time.monotonic()
+
+    def close(self):
+        """
+        刷写并关闭所有句柄
+        """
+        self._flush_stop.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+        with self._lock:
+            self._flush()
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
@@ -0,0 +1,277 @@
+"""
+@author: cunyue
+@file: index.py
+@time: 2025/7/10 10:30
+@description: 本地实验索引
+对比多个本地实验时需要遍历每个实验目录下的 JSON 文件，实验数量较多时非常缓慢
+因此在 swanlog 目录下维护一个 SQLite 数据库（index.db），记录实验元信息、列信息与标量指标摘要：
+1. 写入由后台线程批量完成，数据库以 WAL 模式打开，写入时不会阻塞其他进程的查询
+2. 同一列的摘要在两次写入之间只保留最新值，写入频率与记录频率无关
+3. 索引只是一个加速查询的副本，写入失败不会影响训练，实验数据以实验目录为准
+4. 查询以只读方式打开数据库，不会创建数据库，索引不存在时返回空结果
+"""
+
+import math
+import os
+import pathlib
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Optional, Dict, Tuple, List, Any, Literal
+
+from swanlab.log import swanlog
+from swanlab.toolkit import get_swanlog_dir
+
+INDEX_FILE = "index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_dir TEXT PRIMARY KEY,
+    run_id TEXT,
+    project TEXT,
+    workspace TEXT,
+    name TEXT,
+    description TEXT,
+    mode TEXT,
+    state TEXT,
+    url TEXT,
+    create_time TEXT,
+    finish_time TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_project ON runs (project);
+CREATE TABLE IF NOT EXISTS columns (
+    run_dir TEXT,
+    key TEXT,
+    kid TEXT,
+    type TEXT,
+    cls TEXT,
+    PRIMARY KEY (run_dir, key)
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    run_dir TEXT,
+    key TEXT,
+    last REAL,
+    last_step INTEGER,
+    max REAL,
+    max_step INTEGER,
+    min REAL,
+    min_step INTEGER,
+    num INTEGER,
+    PRIMARY KEY (run_dir, key)
+);
+CREATE INDEX IF NOT EXISTS summaries_key ON summaries (key);
+"""
+
+RUN_FIELDS = (
+    "run_id",
+    "project",
+    "workspace",
+    "name",
+    "description",
+    "mode",
+    "state",
+    "url",
+    "create_time",
+    "finish_time",
+)
+
+# 已有的字段不会被空值覆盖，例如 swanlab sync 只补充云端地址
+UPSERT_RUN = (
+    "INSERT INTO runs (run_dir, {fields}) VALUES (?, {marks}) ON CONFLICT (run_dir) DO UPDATE SET {updates}".format(
+        fields=", ".join(RUN_FIELDS),
+        marks=", ".join("?" * len(RUN_FIELDS)),
+        updates=", ".join(f"{f} = COALESCE(excluded.{f}, runs.{f})" for f in RUN_FIELDS),
+    )
+)
+UPSERT_COLUMN = "INSERT OR REPLACE INTO columns (run_dir, key, kid, type, cls) VALUES (?, ?, ?, ?, ?)"
+SUMMARY_FIELDS = ("last", "last_step", "max", "max_step", "min", "min_step", "num")
+UPSERT_SUMMARY = "INSERT OR REPLACE INTO summaries (run_dir, key, {fields}) VALUES (?, ?, {marks})".format(
+    fields=", ".join(SUMMARY_FIELDS),
+    marks=", ".join("?" * len(SUMMARY_FIELDS)),
+)
+
+
+def index_path(swanlog_dir: str = None) -> str:
+    """
+    获取索引数据库路径
+    :param swanlog_dir: swanlog 目录，为 None 时使用默认的 swanlog 目录
+    """
+    return os.path.join(swanlog_dir or get_swanlog_dir(), INDEX_FILE)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _query(path: str, sql: str, params: tuple) -> List[dict]:
+    """
+    以只读方式查询索引，不会创建数据库与表，因此可以查询只读的 swanlog 目录
+    索引不存在或者尚未创建表时返回空列表
+    """
+    if not os.path.isfile(path):
+        return []
+    uri = pathlib.Path(path).absolute().as_uri()
+    error = None
+    # 只读目录中无法创建 WAL 模式所需的共享内存文件，此时不会有进程在写入，以不可变方式重新打开
+    for mode in ("mode=ro", "immutable=1"):
+        try:
+            with closing(sqlite3.connect(f"{uri}?{mode}", uri=True, timeout=30)) as conn:
+                conn.row_factory = sqlite3.Row
+                return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return []
+            error = e
+    raise error
+
+
+def merge_summary(summary: Optional[dict], step: int, value: Any) -> dict:
+    """
+    将一个标量数据点合并到摘要中，NaN 与无穷大不参与最大值、最小值的计算
+    :param summary: 已有的摘要，为 None 时创建新的摘要
+    :param step: 步数
+    :param value: 指标值，NaN 与无穷大以 "NaN"、"INF" 字符串表示
+    """
+    summary = summary or {"num": 0}
+    value = float(value)
+    summary["num"] += 1
+    summary["last"], summary["last_step"] = value, step
+    if math.isfinite(value):
+        if summary.get("max") is None or value > summary["max"]:
+            summary["max"], summary["max_step"] = value, step
+        if summary.get("min") is None or value < summary["min"]:
+            summary["min"], summary["min_step"] = value, step
+    return summary
+
+
+class IndexWriter:
+    """
+    索引写入器，所有写入操作只是将数据放入缓存，由后台线程定期批量写入数据库
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1):
+        """
+        :param path: 索引数据库路径
+        :param flush_interval: 后台线程的写入间隔，单位秒
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._statements: List[Tuple[str, tuple]] = []
+        # (实验目录, 列名) -> 最新的摘要
+        self._summaries: Dict[Tuple[str, str], dict] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="SwanLabIndexWriter", daemon=True)
+        self._thread.start()
+
+    def upsert_run(self, run_dir: str, **fields):
+        """
+        新增或更新实验信息，值为 None 的字段不会覆盖已有的值
+        :param run_dir: 实验目录，作为实验的唯一标识
+        :param fields: 实验字段，见 RUN_FIELDS
+        """
+        unknown = set(fields) - set(RUN_FIELDS)
+        assert not unknown, f"Unknown run fields: {unknown}"
+        params = (os.path.abspath(run_dir),) + tuple(fields.get(f) for f in RUN_FIELDS)
+        with self._lock:
+            self._statements.append((UPSERT_RUN, params))
+
+    def add_column(self, run_dir: str, key: str, kid: str, column_type: str, cls: str):
+        """
+        新增列信息
+        """
+        with self._lock:
+            self._statements.append((UPSERT_COLUMN, (os.path.abspath(run_dir), key, kid, column_type, cls)))
+
+    def update_summary(self, run_dir: str, key: str, summary: dict):
+        """
+        更新标量指标摘要，摘要格式见 merge_summary
+        """
+        with self._lock:
+            self._summaries[(os.path.abspath(run_dir), key)] = summary.copy()
+
+    def flush(self):
+        """
+        将缓存的数据写入数据库，只能在后台线程中调用
+        """
+        with self._lock:
+            statements, self._statements = self._statements, []
+            summaries, self._summaries = self._summaries, {}
+        if not statements and not summaries:
+            return
+        with self._conn:
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+            self._conn.executemany(
+                UPSERT_SUMMARY,
+                [(run_dir, key) + tuple(s.get(f) for f in SUMMARY_FIELDS) for (run_dir, key), s in summaries.items()],
+            )
+
+    def _loop(self):
+        try:
+            self._conn = _connect(self.path)
+        except sqlite3.Error as e:
+            return swanlog.warning(f"Failed to open local index {self.path}: {e}")
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+            self.flush()
+        except sqlite3.Error as e:
+            swanlog.warning(f"Failed to write local index {self.path}: {e}")
+        finally:
+            self._conn.close()
+
+    def close(self):
+        """
+        写入剩余的数据并停止后台线程
+        """
+        self._stop.set()
+        self._thread.join()
+
+
+# ---------------------------------- 查询 ----------------------------------
+
+
+def list_runs(project: str = None, swanlog_dir: str = None) -> List[dict]:
+    """
+    列出索引中的实验，按创建时间排序
+    :param project: 项目名称，为 None 时列出所有项目的实验
+    :param swanlog_dir: swanlog 目录，为 None 时使用默认的 swanlog 目录
+    """
+    return _query(
+        index_path(swanlog_dir),
+        "SELECT * FROM runs WHERE ? IS NULL OR project = ? ORDER BY create_time",
+        (project, project),
+    )
+
+
+def best_runs(
+    key: str,
+    mode: Literal["max", "min", "last"] = "max",
+    project: str = None,
+    limit: int = 1,
+    swanlog_dir: str = None,
+) -> List[dict]:
+    """
+    按照某个标量指标查询最好的实验，例如 best_runs("val/acc", project="mnist")
+    :param key: 指标名称
+    :param mode: 排序依据，max 为最大值降序，min 为最小值升序，last 为最新值降序
+    :param project: 项目名称，为 None 时在所有项目中查询
+    :param limit: 返回的实验数量
+    :param swanlog_dir: swanlog 目录，为 None 时使用默认的 swanlog 目录
+    :return: 实验信息列表，每一项额外包含 value 与 step 字段，为对应的指标值与步数
+    """
+    order = {"max": "DESC", "min": "ASC", "last": "DESC"}
+    assert mode in order, f"Invalid mode: {mode}, must be one of {list(order)}"
+    sql = (
+        f"SELECT runs.*, summaries.{mode} AS value, summaries.{mode}_step AS step "
+        "FROM summaries JOIN runs ON runs.run_dir = summaries.run_dir "
+        f"WHERE summaries.key = ? AND (? IS NULL OR runs.project = ?) AND summaries.{mode} IS NOT NULL "
+        f"ORDER BY summaries.{mode} {order[mode]} LIMIT ?"
+    )
+    return _query(index_path(swanlog_dir), sql, (key, project, project, limit))
@@ -18,6 +18,8 @@ from rich.text import Text
 from swanlab.data.run import SwanLabRunState, get_run
 from swanlab.env import is_windows
 from swanlab.log import swanlog
+from swanlab.log.accumulator import LogAccumulator
+from swanlab.log.limiter import LogLimiter
 from swanlab.log.backup import BackupHandler
 from swanlab.log.type import LogData
 from swanlab.package import get_package_version
@@ -114,7 +116,14 @@ class SwanLabRunCallback(SwanKitCallback, U):
 
     def __init__(self, backup=False, save_file=True):
         super(U, self).__init__()
-        self.backup = BackupHandler(enable=backup, save_file=save_file)
+        segment_size = get_settings().backup_segment_size
+        self.backup = BackupHandler(
+            enable=backup,
+            save_file=save_file,
+            segment_size=segment_size * 1024 * 1024 if segment_size else None,
+        )
+        # 终端日志累积器，在 handle_run 中创建
+        self.log_accumulator: Optional[LogAccumulator] = None
 
     def _register_sys_callback(self):
         """
@@ -136,6 +145,13 @@ class SwanLabRunCallback(SwanKitCallback, U):
         """
         pass
 
+    def _flush_terminal_handler(self):
+        """
+        交出累积的终端日志，此后的终端输出不再累积，在 on_stop 中停止备份、上传之前调用
+        """
+        if self.log_accumulator is not None:
+            self.log_accumulator.close()
+
     def _clean_handler(self):
         """
         正常退出清理函数，此函数调用`run.finish`
@@ -172,12 +188,18 @@ class SwanLabRunCallback(SwanKitCallback, U):
             description=self.settings.description,
             tags=self.settings.tags,
         )
-        # 2. 注册终端输出流代理
+        # 2. 注册终端输出流代理，终端输出经过去重、限速，按时间窗口累积后批量处理
         settings = get_settings()
+        self.log_accumulator = LogAccumulator(self._terminal_handler, max_latency=settings.log_max_latency)
         swanlog.start_proxy(
             proxy_type=settings.log_proxy_type,
             max_log_length=settings.max_log_length,
-            handler=self._terminal_handler,
+            handler=self.log_accumulator,
+            limiter=LogLimiter(
+                dedup=settings.log_dedup,
+                max_lines_per_second=settings.log_max_lines_per_second,
+                max_bytes_per_second=settings.log_max_bytes_per_second,
+            ),
         )
         # 3. 注入系统回调
         self._register_sys_callback()
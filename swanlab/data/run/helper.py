@@ -7,13 +7,20 @@ r"""
 @Description:
     回调函数操作员，批量处理回调函数的调用
 """
+import heapq
+import os
+import pickle
+import subprocess
+import sys
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
 from enum import Enum
 from typing import List, Union, Dict, Any, Tuple, Callable, Optional
 
 from swanlab.data.run.webhook import try_send_webhook
 from swanlab.log import swanlog
-from swanlab.swanlab_settings import get_settings
+from swanlab.swanlab_settings import Settings, get_settings, set_settings
 from swanlab.toolkit import SwanKitCallback, MetricInfo, ColumnInfo, RuntimeInfo, SwanLabSharedSettings
 
 OperatorReturnType = Dict[str, Any]
@@ -135,44 +142,269 @@ class SwanLabRunState(Enum):
     RUNNING = 0
 
 
+def adaptive_interval(count: int) -> int:
+    """
+    未设置采集间隔时，根据已经采集的次数决定采集间隔，单位秒
+    """
+    # 采集10次以下，每次间隔10秒
+    # 采集10次到50次，每次间隔30秒
+    # 采集50次以上，每次间隔60秒
+    if count < 10:
+        return 10
+    elif count < 50:
+        return 30
+    else:
+        return 60
+
+
+class MonitorTask:
+    """
+    MonitorCron 中的单个采集任务
+    """
+
+    def __init__(self, collector: Callable, interval: Optional[float], timeout: Optional[float]):
+        self.collector = collector
+        self.interval = interval
+        self.timeout = timeout
+        self.count = 0  # 计数器,执行次数
+        self.overruns = 0  # 到达采集时间时上一次采集仍未完成的次数
+        self.timeouts = 0  # 采集超时、结果被丢弃的次数
+        self.future: Optional[Future] = None
+        self.started = 0.0
+
+    @property
+    def sleep_time(self) -> float:
+        if self.interval is not None:
+            return self.interval
+        return adaptive_interval(self.count)
+
+    @property
+    def timeout_time(self) -> float:
+        return self.timeout if self.timeout is not None else self.sleep_time
+
+
 class MonitorCron:
     """
     用于定时采集系统信息
+    所有采集任务由一个常驻的调度线程按照各自的采集时间（小顶堆）分发到线程池中执行，一个缓慢的采集任务不会推迟其他任务：
+    1. 每个采集任务有自己的采集间隔与超时时间，分别由采集器的 interval 与 timeout 属性指定，未指定时使用全局设置
+    2. 到达采集时间时，如果上一次采集仍未完成，本次采集被跳过并计入 overruns，不会堆积
+    3. 超时完成的采集结果被丢弃并计入 timeouts
     """
 
-    def __init__(self, monitor_func: Callable):
-        self.count = 0  # 计数器,执行次数
-        self.monitor_interval = get_settings().hardware_interval  # 用户设置的采集间隔
+    MAX_WORKERS = 4
+    """
+    执行采集任务的最大线程数
+    """
 
-        def _():
-            monitor_func()
-            self.count += 1
-            self.timer = threading.Timer(self.sleep_time, _)
-            self.timer.daemon = True
-            self.timer.start()
+    def __init__(self, collectors: List[Callable], handler: Callable[[Any], None]):
+        """
+        :param collectors: 采集任务，调用后返回采集结果，可以设置 interval 与 timeout 属性，单位秒
+        :param handler: 采集结果处理函数，同一时间只会在一个线程中被调用
+        """
+        monitor_interval = get_settings().hardware_interval  # 用户设置的采集间隔
+        self.tasks = [
+            MonitorTask(
+                c,
+                interval=getattr(c, "interval", None) or monitor_interval,
+                timeout=getattr(c, "timeout", None),
+            )
+            for c in collectors
+        ]
+        self.handler = handler
+        self._handler_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=min(self.MAX_WORKERS, max(len(self.tasks), 1)),
+            thread_name_prefix="SwanLabMonitor",
+        )
+        self._cond = threading.Condition()
+        self._stopped = False
+        # (下一次采集时间, 任务序号)，立即执行
+        now = time.monotonic()
+        self._heap: List[Tuple[float, int]] = [(now, i) for i in range(len(self.tasks))]
+        heapq.heapify(self._heap)
+        self._thread = threading.Thread(target=self._loop, name="SwanLabMonitorCron", daemon=True)
+        self._thread.start()
 
-        # 立即执行
-        self.timer = threading.Timer(0, _)
-        self.timer.daemon = True
-        self.timer.start()
+    @property
+    def count(self) -> int:
+        return sum(t.count for t in self.tasks)
 
-    def cancel(self):
-        if self.timer is not None:
-            self.timer.cancel()
+    @property
+    def overruns(self) -> int:
+        return sum(t.overruns for t in self.tasks)
 
     @property
-    def sleep_time(self):
-        if self.monitor_interval is not None:
-            return self.monitor_interval
-        # 采集10次以下，每次间隔10秒
-        # 采集10次到50次，每次间隔30秒
-        # 采集50次以上，每次间隔60秒
-        if self.count < 10:
-            return 10
-        elif self.count < 50:
-            return 30
-        else:
-            return 60
+    def timeouts(self) -> int:
+        return sum(t.timeouts for t in self.tasks)
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopped and self._heap:
+                due, index = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                task = self.tasks[index]
+                self._dispatch(task, now)
+                # 以计划时间为基准计算下一次采集时间，调度延迟不会累积；落后超过一个间隔时从当前时间重新开始
+                next_due = due + task.sleep_time
+                heapq.heappush(self._heap, (next_due if next_due > now else now + task.sleep_time, index))
+
+    def _dispatch(self, task: MonitorTask, now: float):
+        if task.future is not None and not task.future.done():
+            task.overruns += 1
+            return swanlog.debug(f"Hardware collector is still running, skip it: {task.collector}")
+        task.started = now
+        try:
+            task.future = self._executor.submit(task.collector)
+        except RuntimeError:
+            # 线程池已关闭
+            return
+        task.future.add_done_callback(lambda f: self._done(task, f))
+
+    def _done(self, task: MonitorTask, future: Future):
+        task.count += 1
+        # 线程池关闭时取消的任务，此时调用 future.exception() 会抛出 CancelledError
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            return swanlog.debug(f"Hardware collector failed: {task.collector}, {future.exception()}")
+        if time.monotonic() - task.started > task.timeout_time:
+            task.timeouts += 1
+            return swanlog.debug(f"Hardware collector timed out, drop the result: {task.collector}")
+        with self._handler_lock:
+            if self._stopped:
+                return
+            self.handler(future.result())
+
+    def cancel(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        # 不等待正在执行的采集任务，例如卡住的子进程
+        self._executor.shutdown(wait=False)
+        # 等待正在执行的处理函数结束，此后不会再处理任何采集结果
+        with self._handler_lock:
+            pass
+
+
+def run_monitor_process(stdin, stdout, settings: Settings, factory: Callable[[], List[Callable]], root_pid: int):
+    """
+    监控子进程主体，在子进程中重新创建采集任务，采集结果通过 pickle 序列化后写入 stdout 发送给父进程
+    从 stdin 读到停止信号或者父进程退出（stdin 关闭）时停止采集
+    """
+    # 避免循环引用
+    from swanlab.data.run.metadata.hardware.process import set_root_pid
+
+    set_settings(settings)
+    # 进程级指标统计的是训练进程，而不是监控子进程
+    set_root_pid(root_pid)
+
+    def send(result):
+        if result is None:
+            return
+        try:
+            pickle.dump(result, stdout)
+            stdout.flush()
+        except (OSError, ValueError, pickle.PicklingError) as e:
+            swanlog.debug(f"Failed to send hardware info to the main process: {e}")
+
+    cron = MonitorCron(factory(), send)
+    try:
+        pickle.load(stdin)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    finally:
+        cron.cancel()
+        stdout.close()
+
+
+def default_monitor_factory() -> List[Callable]:
+    """
+    子进程中创建采集任务的默认方法，与主进程使用相同的配置
+    """
+    # 避免循环引用
+    from swanlab.data.run.metadata import get_monitor_funcs
+
+    return get_monitor_funcs()
+
+
+class MonitorProcess:
+    """
+    在子进程中定时采集系统信息，与 MonitorCron 接口相同
+    采集任务与训练代码不再竞争 GIL，主线程卡住时子进程仍然继续采集，父进程中只有一个接收线程调用处理函数
+    子进程通过 python -m swanlab.data.run.monitor 启动，不继承父进程的线程与 CUDA 等状态，采集任务在子进程中重新创建
+    不使用 multiprocessing 的 spawn 方式，因为它会在子进程中重新导入用户的主模块，
+    没有 if __name__ == "__main__" 保护的训练脚本会在子进程中被再次执行
+    """
+
+    MODULE = "swanlab.data.run.monitor"
+    """
+    子进程入口模块
+    """
+
+    STOP_TIMEOUT = 5
+    """
+    停止时等待子进程退出的时间，单位秒，超时后强制结束子进程
+    """
+
+    def __init__(self, handler: Callable[[Any], None], factory: Callable[[], List[Callable]] = default_monitor_factory):
+        """
+        :param handler: 采集结果处理函数，在接收线程中被调用
+        :param factory: 在子进程中创建采集任务的函数，必须可以被 pickle 且不能定义在主模块中（模块级函数）
+        """
+        self.handler = handler
+        # 子进程与父进程使用相同的模块搜索路径，才能导入 swanlab 与 factory 所在的模块
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", self.MODULE],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        try:
+            pickle.dump((get_settings(), factory, os.getpid()), self._process.stdin)
+            self._process.stdin.flush()
+        except Exception:
+            self._process.kill()
+            self._process.wait()
+            raise
+        self.count = 0
+        self._thread = threading.Thread(target=self._loop, name="SwanLabMonitorReceiver", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                result = pickle.load(self._process.stdout)
+            except (EOFError, OSError, pickle.UnpicklingError):
+                return
+            self.count += 1
+            try:
+                self.handler(result)
+            except Exception as e:  # noqa
+                swanlog.debug(f"Failed to handle hardware info: {e}")
+
+    def cancel(self):
+        # 发送停止信号，子进程退出前发送的采集结果仍会被处理
+        try:
+            pickle.dump(None, self._process.stdin)
+            self._process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            self._process.wait(self.STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            swanlog.debug("Monitor process did not exit in time, terminate it.")
+            self._process.terminate()
+            self._process.wait()
+        self._thread.join(self.STOP_TIMEOUT)
+        self._process.stdout.close()
 
 
 def check_log_level(log_level: Optional[str]) -> str:
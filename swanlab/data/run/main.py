@@ -9,6 +9,8 @@ r"""
 """
 import os
 import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Callable, Dict, Optional, List
 
 from swanlab.data import namer as N
@@ -20,8 +22,8 @@ from swanlab.swanlab_settings import reset_settings, get_settings
 from swanlab.toolkit import SwanLabSharedSettings, MediaType
 from .config import SwanLabConfig
 from .exp import SwanLabExp
-from .helper import SwanLabRunOperator, RuntimeInfo, SwanLabRunState, MonitorCron, check_log_level
-from .metadata import get_requirements, get_metadata, get_conda
+from .helper import SwanLabRunOperator, RuntimeInfo, SwanLabRunState, MonitorCron, MonitorProcess, check_log_level
+from .metadata import get_requirements, get_metadata, get_conda, get_git_diff_info
 from .public import SwanLabPublicConfig
 from ..formatter import check_key_format, check_exp_name_format, check_desc_format, check_tags_format
 
@@ -135,55 +137,97 @@ class SwanLabRun:
         self.__operator.on_run()
         # 执行__save，必须在on_run之后，因为on_run之前部分的信息还没完全初始化
         getattr(config, "_SwanLabConfig__save")()
-        metadata, self.monitor_funcs = get_metadata(self.__settings.run_dir if swanlab_settings.backup else None)
-        # 系统信息采集
-        self.__operator.on_runtime_info_update(
-            RuntimeInfo(
-                requirements=get_requirements() if swanlab_settings.requirements_collect else None,
-                conda=get_conda() if swanlab_settings.conda_collect else None,
-                metadata=metadata,
-            )
-        )
-        # 定时采集系统信息
+        # 系统信息采集与定时采集在后台线程中开启，不阻塞 swanlab.init
+        self.monitor_funcs = None
         self.monitor_cron = None
-        # 测试时不开启此功能
-        if "PYTEST_VERSION" not in os.environ:
-            if self.monitor_funcs is not None and len(self.monitor_funcs) != 0:
-                swanlog.debug("Monitor on.")
-                self.monitor_cron = MonitorCron(self.__get_monitor_func())
+        self.__runtime_lock = threading.Lock()
+        self.__runtime_stopped = False
+        self.__runtime_thread = threading.Thread(
+            target=self.__collect_runtime_info,
+            args=(swanlab_settings,),
+            name="SwanLabRuntimeInfo",
+            daemon=True,
+        )
+        self.__runtime_thread.start()
 
-    def __get_monitor_func(self):
+    RUNTIME_INFO_TIMEOUT = 30
+    """
+    结束实验时等待系统信息采集完成的最长时间，单位秒，超时后不再上传系统信息
+    """
+
+    def __collect_runtime_info(self, swanlab_settings):
         """
-        获取监控函数
+        采集系统信息，完成后更新运行时信息并开启定时采集
+        元信息、依赖（pip 子进程）与 conda 环境（conda 子进程）在线程池中并行采集
+        开启 git_diff_collect 时，最后采集 git 工作区的 diff 并再次更新元信息
         """
-        if self.monitor_funcs is None or len(self.monitor_funcs) == 0:
-            return None
 
-        def monitor_func():
-            monitor_info_list = [f() for f in self.monitor_funcs]
+        def result(future: Optional[Future]):
+            if future is None:
+                return None
+            try:
+                return future.result()
+            except Exception as e:  # noqa
+                swanlog.warning(f"Failed to collect runtime info: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="SwanLabRuntimeInfo") as pool:
+            metadata = pool.submit(get_metadata, self.__settings.run_dir if swanlab_settings.backup else None)
+            requirements = pool.submit(get_requirements) if swanlab_settings.requirements_collect else None
+            conda = pool.submit(get_conda) if swanlab_settings.conda_collect else None
+        metadata, monitor_funcs = result(metadata) or (None, [])
+        with self.__runtime_lock:
+            # 实验已经结束
+            if self.__runtime_stopped:
+                return
+            self.monitor_funcs = monitor_funcs
+            self.__operator.on_runtime_info_update(
+                RuntimeInfo(requirements=result(requirements), conda=result(conda), metadata=metadata)
+            )
+            # 定时采集系统信息，测试时不开启此功能
+            if "PYTEST_VERSION" not in os.environ and self.monitor_funcs:
+                swanlog.debug("Monitor on.")
+                if swanlab_settings.hardware_monitor_process:
+                    self.monitor_cron = MonitorProcess(self.__get_monitor_handler())
+                else:
+                    self.monitor_cron = MonitorCron(self.monitor_funcs, self.__get_monitor_handler())
+        # git diff 需要比较整个工作区，在运行时信息上传之后再采集，采集完成后更新元信息
+        if metadata is None:
+            return
+        git_diff_info = get_git_diff_info()
+        if not git_diff_info:
+            return
+        with self.__runtime_lock:
+            if not self.__runtime_stopped:
+                self.__operator.on_runtime_info_update(RuntimeInfo(metadata={**metadata, **git_diff_info}))
+
+    def __get_monitor_handler(self):
+        """
+        获取监控结果处理函数，每次处理一个采集任务的结果
+        """
+
+        def monitor_handler(monitor_info):
             # 剔除其中为None的数据
-            for monitor_info in monitor_info_list:
-                if monitor_info is None:
-                    swanlog.debug("Hardware info is empty. Skip it.")
-                    continue
-                for info in monitor_info:
-                    key, name, value, cfg = (
-                        info['key'],
-                        info['name'],
-                        info['value'],
-                        info['config'],
-                    )
-                    v = DataWrapper(key, [Line(value)], reference="TIME")
-                    self.__exp.add(
-                        data=v,
-                        key=key,
-                        name=name,
-                        column_config=cfg,
-                        column_class="SYSTEM",
-                        section_type="SYSTEM",
-                    )
-
-        return monitor_func
+            if monitor_info is None:
+                return swanlog.debug("Hardware info is empty. Skip it.")
+            for info in monitor_info:
+                key, name, value, cfg = (
+                    info['key'],
+                    info['name'],
+                    info['value'],
+                    info['config'],
+                )
+                v = DataWrapper(key, [Line(value)], reference="TIME")
+                self.__exp.add(
+                    data=v,
+                    key=key,
+                    name=name,
+                    column_config=cfg,
+                    column_class="SYSTEM",
+                    section_type="SYSTEM",
+                )
+
+        return monitor_handler
 
     def __register_exp(
         self,
@@ -236,6 +280,14 @@ class SwanLabRun:
         """
         停止部分功能，内部清理时调用
         """
+        # 等待系统信息采集完成，此后不再更新运行时信息、不再开启定时采集
+        runtime_thread = getattr(self, "_SwanLabRun__runtime_thread", None)
+        if runtime_thread is not None:
+            runtime_thread.join(self.RUNTIME_INFO_TIMEOUT)
+            if runtime_thread.is_alive():
+                swanlog.debug("Runtime info collection timed out, skip it.")
+            with self.__runtime_lock:
+                self.__runtime_stopped = True
         monitor_cron = getattr(self, "monitor_cron", None)
         if monitor_cron is not None:
             monitor_cron.cancel()
@@ -327,6 +379,8 @@ class SwanLabRun:
             raise ValueError("When the state is 'CRASHED', the error message cannot be None.")
         _set_run_state(state)
         error = error if state == SwanLabRunState.CRASHED else None
+        # 先输出终端日志的限流统计，再读取 epoch
+        swanlog.finish_proxy()
         setattr(run, "_SwanLabRun__swanlog_epoch", swanlog.epoch)
         # 退出回调
         getattr(run, "_SwanLabRun__cleanup")(error)
@@ -5,6 +5,7 @@
 @description: 实验元信息采集
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List
 
 from swanlab.package import get_package_version
@@ -13,7 +14,43 @@ from .conda import get_conda
 from .cooperation import get_cooperation_info
 from .hardware import *
 from .requirements import get_requirements
-from .runtime import get_runtime_info
+from .runtime import get_runtime_info, get_git_diff_info
+
+
+def prepare_monitor_funcs(monitor_funcs: List[HardwareCollector]) -> List[HardwareCollector]:
+    """
+    按照配置处理硬件监控任务
+    """
+    settings = get_settings()
+    # 如果硬件监控被关闭，则monitor_funcs置空
+    if not settings.hardware_monitor:
+        return []
+    # 支持高频采样的采集任务在本地聚合后上报
+    if settings.hardware_sample_interval is not None:
+        monitor_funcs = [
+            (
+                HardwareSampler(
+                    f,
+                    settings.hardware_sample_interval,
+                    settings.hardware_interval,
+                    aggregates=settings.hardware_sample_aggregates,
+                )
+                if f.sampling
+                else f
+            )
+            for f in monitor_funcs
+        ]
+    return monitor_funcs
+
+
+def get_monitor_funcs() -> List[HardwareCollector]:
+    """
+    只创建硬件监控任务，不采集其他元信息，用于在监控子进程中重新创建采集任务
+    """
+    settings = get_settings()
+    if not settings.metadata_collect or not settings.collect_hardware:
+        return []
+    return prepare_monitor_funcs(get_hardware_info()[1])
 
 
 def get_metadata(logdir: str = None) -> Tuple[dict, List[HardwareCollector]]:
@@ -24,15 +61,16 @@ def get_metadata(logdir: str = None) -> Tuple[dict, List[HardwareCollector]]:
     # 1. 按照配置采集元信息
     hardware_info, monitor_funcs, runtime_info = {}, [], {}
     if settings.metadata_collect:
-        # 1.1 采集软硬件信息
-        if settings.collect_hardware:
-            hardware_info, monitor_funcs = get_hardware_info()
-        # 1.2 如果硬件监控被关闭，则monitor_funcs置空
-        if not settings.hardware_monitor:
-            monitor_funcs = []
-        # 1.3 采集运行时信息
-        if settings.collect_runtime:
-            runtime_info = get_runtime_info()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="SwanLabRuntime") as pool:
+            # 1.1 采集运行时信息，其中的 git 等子进程与硬件信息采集同时进行
+            runtime_future = pool.submit(get_runtime_info) if settings.collect_runtime else None
+            # 1.2 采集软硬件信息
+            if settings.collect_hardware:
+                hardware_info, monitor_funcs = get_hardware_info()
+            # 1.3 硬件监控任务
+            monitor_funcs = prepare_monitor_funcs(monitor_funcs)
+            if runtime_future is not None:
+                runtime_info = runtime_future.result()
     # 2. swanlab官方信息收集
     coop = get_cooperation_info()
     # 2.1 生成基本swanlab信息
@@ -61,8 +99,10 @@ def get_metadata(logdir: str = None) -> Tuple[dict, List[HardwareCollector]]:
 
 __all__ = [
     "get_metadata",
+    "get_monitor_funcs",
     "get_requirements",
     "get_conda",
+    "get_git_diff_info",
     "get_cooperation_info",
     "HardwareInfo",
     "HardwareCollector",
@@ -0,0 +1,211 @@
+"""
+@author: cunyue
+@file: git.py
+@time: 2025/7/16 16:40
+@description: git 仓库信息读取
+直接读取 .git 目录中的 HEAD、refs、packed-refs 与 config，不启动 git 子进程，兼容 worktree 与 submodule
+工作区的修改状态与 diff 需要比较工作区与索引，仍然通过 git diff 获取
+"""
+
+import os
+import re
+import subprocess
+import threading
+from typing import Dict, Optional, Tuple
+
+# 符号引用的最大解析深度，与 git 一致
+MAX_SYMREF_DEPTH = 5
+
+SECTION_PATTERN = re.compile(r'^\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+
+
+class GitReadError(Exception):
+    """
+    无法读取 git 仓库，例如使用了 reftable 等尚不支持的格式，此时需要回退到 git 子进程
+    """
+
+    pass
+
+
+def parse_config_value(value: str) -> str:
+    """
+    解析 config 中的值，去除行尾注释与引号
+    """
+    result, quoted, escaped = [], False, False
+    for char in value.strip():
+        if escaped:
+            result.append({"n": "\n", "t": "\t"}.get(char, char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char in "#;" and not quoted:
+            break
+        else:
+            result.append(char)
+    return "".join(result).strip()
+
+
+def parse_config(text: str) -> Dict[str, str]:
+    """
+    解析 git config 文件，返回 "section.subsection.key" -> 值，section 与 key 不区分大小写，subsection 区分大小写
+    同一个 key 出现多次时以最后一次为准，与 git config --get 一致
+    """
+    config, section = {}, None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith("["):
+            match = SECTION_PATTERN.match(line)
+            if match is None:
+                section = None
+                continue
+            name, subsection = match.groups()
+            # 旧语法 [section.subsection] 中的 subsection 不区分大小写
+            section = name.lower() if subsection is None else f"{name.lower()}.{subsection}"
+            line = line[match.end() :].strip()
+            if not line:
+                continue
+        if section is None:
+            continue
+        key, _, value = line.partition("=")
+        # 没有等号的 key 表示 true
+        config[f"{section}.{key.strip().lower()}"] = parse_config_value(value) if _ else "true"
+    return config
+
+
+class GitRepo:
+    """
+    git 仓库，git_dir 为 .git 目录，worktree 中 HEAD 等位于 git_dir，分支等共享的引用位于 common_dir
+    """
+
+    def __init__(self, git_dir: str, work_tree: Optional[str] = None):
+        """
+        :param git_dir: .git 目录
+        :param work_tree: 工作区目录，裸仓库为 None
+        """
+        self.git_dir = git_dir
+        self.work_tree = work_tree
+        commondir = self.read(git_dir, "commondir")
+        self.common_dir = git_dir if commondir is None else os.path.join(git_dir, commondir.strip())
+
+    @staticmethod
+    def read(*parts: str) -> Optional[str]:
+        """
+        读取文件，文件不存在时返回 None
+        """
+        try:
+            with open(os.path.join(*parts), "r", encoding="utf-8") as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def config(self) -> Dict[str, str]:
+        config = parse_config(self.read(self.common_dir, "config") or "")
+        if config.get("extensions.refstorage", "files").lower() != "files":
+            raise GitReadError(f"Unsupported ref storage: {config['extensions.refstorage']}")
+        return config
+
+    def packed_refs(self) -> Dict[str, str]:
+        """
+        解析 packed-refs，返回引用 -> 提交 hash，跳过注释与 ^ 开头的标签对象行
+        """
+        refs = {}
+        for line in (self.read(self.common_dir, "packed-refs") or "").splitlines():
+            if not line or line[0] in "#^":
+                continue
+            sha, _, ref = line.partition(" ")
+            refs[ref.strip()] = sha
+        return refs
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """
+        解析引用对应的提交 hash，依次查找松散引用与 packed-refs，引用不存在时（例如还没有提交）返回 None
+        """
+        for _ in range(MAX_SYMREF_DEPTH):
+            # worktree 私有的引用位于 git_dir，其余位于 common_dir
+            content = self.read(self.git_dir, ref) or self.read(self.common_dir, ref)
+            if content is None:
+                return self.packed_refs().get(ref)
+            content = content.strip()
+            if not content.startswith("ref:"):
+                return content
+            ref = content[4:].strip()
+        raise GitReadError(f"Too many levels of symbolic refs: {ref}")
+
+    def head(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        获取当前分支名与最新提交的 hash，分离头指针状态下分支名为 None
+        """
+        content = self.read(self.git_dir, "HEAD")
+        if content is None:
+            raise GitReadError(f"HEAD not found in {self.git_dir}")
+        content = content.strip()
+        if not content.startswith("ref:"):
+            return None, content
+        ref = content[4:].strip()
+        branch = ref[len("refs/heads/") :] if ref.startswith("refs/heads/") else ref
+        return branch, self.resolve(ref)
+
+    def remote_url(self, remote: str = "origin") -> Optional[str]:
+        return self.config().get(f"remote.{remote}.url")
+
+
+def find_git_repo(path: Optional[str] = None) -> Optional[GitRepo]:
+    """
+    从 path 开始向上查找 git 仓库，与 git 一致优先使用 GIT_DIR 环境变量，找不到时返回 None
+    .git 为文件时（worktree、submodule）其内容为 "gitdir: <路径>"
+    :param path: 查找的起始目录，默认为当前工作目录
+    """
+    git_dir = os.getenv("GIT_DIR")
+    if git_dir:
+        return GitRepo(os.path.abspath(git_dir), os.getenv("GIT_WORK_TREE"))
+    path = os.path.abspath(path or os.getcwd())
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isfile(dot_git):
+            content = GitRepo.read(dot_git) or ""
+            if content.startswith("gitdir:"):
+                return GitRepo(os.path.normpath(os.path.join(path, content[7:].strip())), path)
+        elif os.path.isfile(os.path.join(dot_git, "HEAD")):
+            return GitRepo(dot_git, path)
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def get_git_diff(work_tree: str, max_size: int, timeout: float = 10) -> Tuple[Optional[str], bool]:
+    """
+    获取工作区相对于 HEAD 的 diff，不包含未跟踪的文件
+    只读取前 max_size 个字节，超出部分直接结束子进程，避免大型仓库中 diff 过大
+    :param work_tree: 工作区目录
+    :param max_size: diff 的最大字节数
+    :param timeout: 超时时间，单位秒，超时后结束子进程
+    :return: diff 与是否被截断，失败时 diff 为 None
+    """
+    try:
+        process = subprocess.Popen(
+            ["git", "diff", "HEAD", "--no-color", "--no-ext-diff"],
+            cwd=work_tree,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        return None, False
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        output = process.stdout.read(max_size + 1)
+        truncated = len(output) > max_size
+        if truncated:
+            process.kill()
+        returncode = process.wait()
+    finally:
+        timer.cancel()
+        process.stdout.close()
+    if not truncated and returncode != 0:
+        return None, False
+    return output[:max_size].decode("utf-8", errors="replace"), truncated
@@ -5,8 +5,10 @@
 @description: 硬件信息采集
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, List, Any, Optional, Tuple
 
+from .cgroup import get_cgroup_info
 from .cpu import get_cpu_info
 from .disk import get_disk_info
 from .dcu.hygon import get_hygon_dcu_info
@@ -19,33 +21,49 @@ from .xpu.kunlunxin import get_kunlunxin_xpu_info
 from .network import get_network_info
 from .npu.ascend import get_ascend_npu_info
 from .soc.apple import get_apple_chip_info
+from .sampler import HardwareSampler
 from .type import HardwareFuncResult, HardwareCollector, HardwareInfo
 
-__all__ = ["get_hardware_info", "HardwareCollector", "HardwareInfo"]
+__all__ = ["get_hardware_info", "HardwareCollector", "HardwareInfo", "HardwareSampler"]
+
+
+HARDWARE_FUNCS: List[Callable[[], HardwareFuncResult]] = [
+    # 我们希望计算芯片的信息放在最前面，前端展示用
+    get_nvidia_gpu_info,
+    get_moorethreads_gpu_info,
+    get_ascend_npu_info,
+    get_cambricon_mlu_info,
+    get_apple_chip_info,
+    get_kunlunxin_xpu_info,
+    get_metax_gpu_info,
+    get_hygon_dcu_info,
+    get_cpu_info,
+    get_memory_size,
+    get_cgroup_info,
+    get_disk_info,
+    get_network_info,
+]
+"""
+硬件信息采集函数，采集任务的顺序与此顺序一致
+"""
 
 
 def get_hardware_info() -> Tuple[Optional[Any], List[HardwareCollector]]:
     """
     采集硬件信息，包括CPU、GPU、内存、硬盘等
+    各个采集函数大多在等待 nvcc、npu-smi、system_profiler 等子进程，因此在线程池中并行执行，总耗时取决于最慢的一个
     """
-    monitor_funcs = []
-    # 我们希望计算芯片的信息放在最前面，前端展示用
-    nvidia = dec_hardware_func(get_nvidia_gpu_info, monitor_funcs)
-    moorethreads = dec_hardware_func(get_moorethreads_gpu_info, monitor_funcs)
-    ascend = dec_hardware_func(get_ascend_npu_info, monitor_funcs)
-    cambricon = dec_hardware_func(get_cambricon_mlu_info, monitor_funcs)
-    apple = dec_hardware_func(get_apple_chip_info, monitor_funcs)
-    kunlunxin = dec_hardware_func(get_kunlunxin_xpu_info, monitor_funcs)
-    metax = dec_hardware_func(get_metax_gpu_info, monitor_funcs)
-    hygon = dec_hardware_func(get_hygon_dcu_info, monitor_funcs)
-    c = dec_hardware_func(get_cpu_info, monitor_funcs)
-    m = dec_hardware_func(get_memory_size, monitor_funcs)
-    d = dec_hardware_func(get_disk_info, monitor_funcs)
-    n = dec_hardware_func(get_network_info, monitor_funcs)
+    with ThreadPoolExecutor(max_workers=len(HARDWARE_FUNCS), thread_name_prefix="SwanLabHardware") as pool:
+        results = list(pool.map(lambda f: f(), HARDWARE_FUNCS))
+    monitor_funcs = [collector for _, collector in results if collector]
+    nvidia, moorethreads, ascend, cambricon, apple, kunlunxin, metax, hygon, c, m, cgroup, d, n = (
+        r[0] for r in results
+    )
 
     info = {
         "memory": m,
         "cpu": c,
+        "cgroup": cgroup,
         "disk": d,
         "network": n,
         "gpu": {},
@@ -74,19 +92,6 @@ def get_hardware_info() -> Tuple[Optional[Any], List[HardwareCollector]]:
     return filter_none(info, fallback={}), monitor_funcs
 
 
-def dec_hardware_func(
-    func: Callable[[], HardwareFuncResult],
-    monitor_funcs: List[HardwareCollector],
-) -> Optional[Any]:
-    """
-    装饰器，用于记录硬件信息采集函数
-    """
-    x, y = func()
-    if y:
-        monitor_funcs.append(y)
-    return x
-
-
 def filter_none(data, fallback=None):
     """
     过滤掉字典中值为None的键值对，只对字典有效
@@ -0,0 +1,301 @@
+"""
+@author: cunyue
+@file: cgroup.py
+@time: 2025/7/15 15:20
+@description: cgroup 资源限制与用量采集
+在 Kubernetes、Slurm 等容器或作业调度环境中，psutil 返回的是宿主机的内存与 CPU，无法反映作业自身的限制
+此处读取当前进程所在 cgroup（兼容 v1 与 v2）的限制与用量，仅在存在内存或 CPU 限制时采集：
+1. 内存：工作集（用量减去可回收的非活跃文件缓存，与 OOM 判断口径一致）与其占限制的百分比，v2 额外采集内存压力（PSI）
+2. CPU：相对于 CPU 配额的使用率，以及被限流的调度周期占比
+cgroup 文件在第一次读取时打开，之后每次采集通过 pread 从头读取，不重复打开文件
+"""
+
+import math
+import os
+import platform
+import time
+from typing import Dict, Optional, Tuple
+
+import psutil
+
+from .type import HardwareCollector, HardwareConfig, HardwareFuncResult, HardwareInfo, HardwareInfoList
+from .utils import generate_key
+
+# 大于此值的内存限制视为没有限制，v1 中没有限制时的值为 9223372036854771712
+UNLIMITED = 1 << 60
+
+# 指标 -> 名称，key 为 cgroup.{指标}
+CGROUP_METRICS = {
+    "mem.value": "Cgroup Memory In Use (MB)",
+    "mem.pct": "Cgroup Memory Utilization (%)",
+    "mem.pressure": "Cgroup Memory Pressure (%)",
+    "cpu.pct": "Cgroup CPU Utilization (%)",
+    "cpu.throttled": "Cgroup CPU Throttled (%)",
+}
+
+
+def parse_kv(text: str) -> Dict[str, int]:
+    """
+    解析 memory.stat、cpu.stat 等 "key value" 格式的文件
+    """
+    result = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1].lstrip("-").isdigit():
+            result[parts[0]] = int(parts[1])
+    return result
+
+
+def parse_pressure(text: str) -> Optional[float]:
+    """
+    解析 PSI 文件，返回 "some" 行的 avg10，即最近 10 秒内至少一个任务因资源不足而等待的时间占比
+    """
+    for line in text.splitlines():
+        if line.startswith("some "):
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                if key == "avg10":
+                    return float(value)
+    return None
+
+
+class Cgroup:
+    """
+    当前进程所在的 cgroup，v1 中内存、CPU、CPU 统计分别位于不同的层级
+    """
+
+    def __init__(self, version: int, memory_dir: str, cpu_dir: str, cpuacct_dir: Optional[str] = None):
+        self.version = version
+        self.memory_dir = memory_dir
+        self.cpu_dir = cpu_dir
+        self.cpuacct_dir = cpuacct_dir or cpu_dir
+        # 文件路径 -> 文件描述符，不存在的文件为 None
+        self._fds: Dict[str, Optional[int]] = {}
+
+    def read(self, directory: str, name: str) -> Optional[str]:
+        """
+        读取 cgroup 文件，文件不存在或无法读取时返回 None
+        """
+        path = os.path.join(directory, name)
+        if path not in self._fds:
+            try:
+                self._fds[path] = os.open(path, os.O_RDONLY)
+            except OSError:
+                self._fds[path] = None
+        fd = self._fds[path]
+        if fd is None:
+            return None
+        try:
+            return os.pread(fd, 65536, 0).decode()
+        except OSError:
+            return None
+
+    def close(self):
+        for fd in self._fds.values():
+            if fd is not None:
+                os.close(fd)
+        self._fds.clear()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:  # noqa
+            pass
+
+    def memory_limit(self) -> Optional[int]:
+        """
+        内存限制，单位字节，没有限制时返回 None
+        """
+        text = self.read(self.memory_dir, "memory.max" if self.version == 2 else "memory.limit_in_bytes")
+        if text is None or not text.strip().isdigit():
+            return None
+        limit = int(text)
+        return limit if limit < UNLIMITED else None
+
+    def memory_usage(self) -> Optional[int]:
+        """
+        内存工作集，单位字节
+        """
+        text = self.read(self.memory_dir, "memory.current" if self.version == 2 else "memory.usage_in_bytes")
+        if text is None or not text.strip().isdigit():
+            return None
+        stat = parse_kv(self.read(self.memory_dir, "memory.stat") or "")
+        inactive = stat.get("inactive_file" if self.version == 2 else "total_inactive_file", 0)
+        return max(int(text) - inactive, 0)
+
+    def memory_pressure(self) -> Optional[float]:
+        """
+        内存压力，单位百分比，只在 v2 中可用
+        """
+        if self.version != 2:
+            return None
+        text = self.read(self.memory_dir, "memory.pressure")
+        return None if text is None else parse_pressure(text)
+
+    def cpu_limit(self) -> Optional[float]:
+        """
+        CPU 配额，单位核数，没有限制时返回 None
+        """
+        if self.version == 2:
+            text = self.read(self.cpu_dir, "cpu.max")
+            if text is None or text.startswith("max"):
+                return None
+            quota, period = text.split()[:2]
+        else:
+            quota, period = self.read(self.cpu_dir, "cpu.cfs_quota_us"), self.read(self.cpu_dir, "cpu.cfs_period_us")
+            if quota is None or period is None or int(quota) <= 0:
+                return None
+        return int(quota) / int(period) if int(period) > 0 else None
+
+    def cpu_usage(self) -> Optional[float]:
+        """
+        累计的 CPU 时间，单位秒
+        """
+        if self.version == 2:
+            usage = parse_kv(self.read(self.cpu_dir, "cpu.stat") or "").get("usage_usec")
+            return None if usage is None else usage / 1e6
+        text = self.read(self.cpuacct_dir, "cpuacct.usage")
+        return None if text is None or not text.strip().isdigit() else int(text) / 1e9
+
+    def cpu_throttling(self) -> Optional[Tuple[int, int]]:
+        """
+        累计的调度周期数与被限流的周期数
+        """
+        stat = parse_kv(self.read(self.cpu_dir, "cpu.stat") or "")
+        if "nr_periods" not in stat or "nr_throttled" not in stat:
+            return None
+        return stat["nr_periods"], stat["nr_throttled"]
+
+
+def _v1_dir(base: str, controller: str, path: str) -> Optional[str]:
+    """
+    查找 v1 中某个控制器的 cgroup 目录，控制器可能与其他控制器挂载在同一目录，例如 cpu,cpuacct
+    容器中通常只挂载了自身的 cgroup，此时 /proc/self/cgroup 中的路径在挂载点下不存在，使用挂载点本身
+    """
+    try:
+        mounts = sorted(os.listdir(base))
+    except OSError:
+        return None
+    for mount in mounts:
+        if controller in mount.split(","):
+            directory = os.path.join(base, mount, path.lstrip("/"))
+            return directory if os.path.isdir(directory) else os.path.join(base, mount)
+    return None
+
+
+def detect_cgroup(root: str = "/") -> Optional[Cgroup]:
+    """
+    检测当前进程所在的 cgroup
+    :param root: 文件系统根目录，用于测试
+    """
+    base = os.path.join(root, "sys", "fs", "cgroup")
+    try:
+        with open(os.path.join(root, "proc", "self", "cgroup"), "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    # hierarchy-ID:controller-list:cgroup-path
+    paths = {}
+    for line in lines:
+        parts = line.split(":", 2)
+        if len(parts) == 3:
+            for controller in parts[1].split(","):
+                paths[controller] = parts[2]
+    if os.path.exists(os.path.join(base, "cgroup.controllers")):
+        directory = os.path.normpath(os.path.join(base, paths.get("", "/").lstrip("/")))
+        directory = directory if os.path.isdir(directory) else base
+        return Cgroup(2, directory, directory)
+    memory_dir = _v1_dir(base, "memory", paths.get("memory", "/"))
+    cpu_dir = _v1_dir(base, "cpu", paths.get("cpu", "/"))
+    if memory_dir is None or cpu_dir is None:
+        return None
+    return Cgroup(1, memory_dir, cpu_dir, _v1_dir(base, "cpuacct", paths.get("cpuacct", "/")))
+
+
+def get_cgroup_info(root: str = "/") -> HardwareFuncResult:
+    """
+    获取 cgroup 的资源限制，不在 cgroup 中或者没有任何限制时不采集
+    """
+    if platform.system() != "Linux":
+        return None, None
+    try:
+        cgroup = detect_cgroup(root)
+        if cgroup is None:
+            return None, None
+        memory_limit, cpu_limit = cgroup.memory_limit(), cgroup.cpu_limit()
+        # 限制不小于宿主机资源时等同于没有限制
+        if memory_limit is not None and memory_limit >= psutil.virtual_memory().total:
+            memory_limit = None
+        if cpu_limit is not None and cpu_limit >= psutil.cpu_count():
+            cpu_limit = None
+        if memory_limit is None and cpu_limit is None:
+            return None, None
+        info = {
+            "version": cgroup.version,
+            "memory": None if memory_limit is None else str(round(memory_limit / (1024**3))),  # 单位为GB
+            "cpu": cpu_limit,
+        }
+        return info, CgroupCollector(cgroup, memory_limit, cpu_limit)
+    except Exception:  # noqa
+        return None, None
+
+
+class CgroupCollector(HardwareCollector):
+    sampling = True
+
+    def __init__(self, cgroup: Cgroup, memory_limit: Optional[int], cpu_limit: Optional[float]):
+        """
+        :param cgroup: 当前进程所在的 cgroup
+        :param memory_limit: 内存限制，单位字节，为 None 时不采集内存用量
+        :param cpu_limit: CPU 配额，单位核数，为 None 时不采集 CPU 用量
+        """
+        super().__init__()
+        self.cgroup = cgroup
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        mb = None if memory_limit is None else memory_limit / 1024 / 1024
+        # 指标 -> (key, 名称, 配置)
+        self.metrics = {}
+        for metric, name in CGROUP_METRICS.items():
+            y_range = (0, mb) if metric == "mem.value" else (0, 100)
+            config = HardwareConfig(y_range=y_range, chart_name=name).clone()
+            self.metrics[metric] = (generate_key(f"cgroup.{metric}"), name, config)
+        # 上一次采集的 (时间, CPU 时间, (调度周期数, 被限流的周期数))，用于计算差值
+        self._last_cpu: Optional[Tuple[float, Optional[float], Optional[Tuple[int, int]]]] = None
+
+    def info(self, metric: str, value: Optional[float]) -> Optional[HardwareInfo]:
+        if value is None or math.isnan(value):
+            return None
+        key, name, config = self.metrics[metric]
+        return {"key": key, "name": name, "value": value, "config": config}
+
+    def collect_memory(self) -> HardwareInfoList:
+        result = [self.info("mem.pressure", self.cgroup.memory_pressure())]
+        if self.memory_limit is None:
+            return result
+        usage = self.cgroup.memory_usage()
+        if usage is not None:
+            result.append(self.info("mem.value", usage / 1024 / 1024))
+            result.append(self.info("mem.pct", usage / self.memory_limit * 100))
+        return result
+
+    def collect_cpu(self) -> HardwareInfoList:
+        if self.cpu_limit is None:
+            return []
+        now, usage, throttling = time.monotonic(), self.cgroup.cpu_usage(), self.cgroup.cpu_throttling()
+        last, self._last_cpu = self._last_cpu, (now, usage, throttling)
+        # 第一次采集时没有可以比较的值
+        if last is None:
+            return []
+        result = []
+        last_time, last_usage, last_throttling = last
+        if usage is not None and last_usage is not None and now > last_time:
+            percent = (usage - last_usage) / (now - last_time) / self.cpu_limit * 100
+            result.append(self.info("cpu.pct", min(max(percent, 0.0), 100.0)))
+        if throttling is not None and last_throttling is not None:
+            periods, throttled = throttling[0] - last_throttling[0], throttling[1] - last_throttling[1]
+            result.append(self.info("cpu.throttled", self.division_guard(throttled, periods) * 100))
+        return result
+
+    def collect(self) -> HardwareInfoList:
+        return [*self.collect_memory(), *self.collect_cpu()]
@@ -0,0 +1,53 @@
+"""
+@author: cunyue
+@file: command.py
+@time: 2025/7/14 10:20
+@description: 厂商命令行工具查询
+npu-smi、cnmon 等命令行工具每次调用都需要启动一个子进程，耗时数十到数百毫秒
+采集器在每次采集开始时清空缓存，同一次采集中相同的命令只执行一次，不同的指标从同一份输出中解析
+"""
+
+import subprocess
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from swanlab.log import swanlog
+
+
+def run_command(args: Sequence[str], timeout: float) -> str:
+    """
+    执行命令并返回标准输出，失败时返回空字符串
+    """
+    try:
+        return subprocess.run(list(args), capture_output=True, text=True, timeout=timeout).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        swanlog.debug(f"Command failed: {' '.join(args)}, {e}")
+        return ""
+
+
+class CommandCache:
+    """
+    命令输出缓存，非线程安全，同一个采集器的采集任务不会并发执行
+    """
+
+    def __init__(self, runner: Optional[Callable[[Sequence[str]], str]] = None, timeout: float = 10):
+        """
+        :param runner: 执行命令并返回标准输出的函数，测试时可以替换为返回录制输出的函数
+        :param timeout: 命令的超时时间，单位秒
+        """
+        self.runner = runner or (lambda args: run_command(args, timeout))
+        self._outputs: Dict[Tuple[str, ...], str] = {}
+
+    def run(self, *args: str) -> str:
+        """
+        执行命令，缓存中存在相同命令的输出时直接返回
+        """
+        output = self._outputs.get(args)
+        if output is None:
+            output = self._outputs[args] = self.runner(args)
+        return output
+
+    def clear(self):
+        """
+        清空缓存，在每次采集开始时调用
+        """
+        self._outputs.clear()
@@ -13,6 +13,7 @@ import psutil
 
 from swanlab.data.run.metadata.hardware.type import HardwareFuncResult, HardwareCollector, HardwareInfoList
 from swanlab.toolkit import is_macos
+from .process import get_root_pid
 from .utils import CpuBaseCollector as C
 
 
@@ -74,13 +75,17 @@ def get_cpu_brand_linux():
 
 
 class CpuCollector(HardwareCollector, C):
+    sampling = True
+
     def __init__(self):
         super().__init__()
-        self.current_process = psutil.Process()
+        # 统计训练进程，在监控子进程中不是当前进程
+        self.current_process = psutil.Process(get_root_pid())
 
     def collect(self) -> HardwareInfoList:
+        percents = self.get_cpu_percents()
         return [
-            self.get_cpu_usage(),
-            # *self.get_per_cpu_usage(),
+            self.get_cpu_usage(percents),
+            # *self.get_per_cpu_usage(percents),
             self.get_cur_proc_thds_num(self.current_process),
         ]
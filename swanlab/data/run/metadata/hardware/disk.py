@@ -5,14 +5,15 @@
 @description: 磁盘信息采集
 """
 
+import os
 import time
-from typing import List
+from typing import Dict, List, Tuple
 
 import psutil
 
 from swanlab.swanlab_settings import get_settings
 from .type import HardwareFuncResult, HardwareCollector, HardwareInfo, HardwareConfig
-from .utils import random_index, generate_key
+from .utils import CounterDelta, DeviceFilter, random_index, generate_key
 
 
 def get_disk_info() -> HardwareFuncResult:
@@ -21,7 +22,14 @@ def get_disk_info() -> HardwareFuncResult:
 
 
 class DiskCollector(HardwareCollector):
-    def __init__(self):
+    """
+    磁盘信息采集器，除了所有磁盘的汇总读写速度，还单独上报每块磁盘的读写速度与繁忙时间占比
+    """
+
+    def __init__(self, sysfs: str = "/sys"):
+        """
+        :param sysfs: sysfs 挂载点，用于区分整块磁盘与分区，测试时可以替换
+        """
         super().__init__()
         self.last_disk_io = psutil.disk_io_counters()
         self.last_time = time.time()
@@ -51,6 +59,71 @@ class DiskCollector(HardwareCollector):
 
         self.unit = 1024**2
 
+        # 每块磁盘的读写速度与繁忙时间占比，(key 模板, 名称模板, 图表配置)
+        self.per_disk_metrics = (
+            (
+                generate_key("disk.{dev}.read"),
+                "Disk {dev} Read (MB)",
+                HardwareConfig(y_range=(0, None), chart_name="Disk Read per Device (MB)", chart_index=random_index()),
+            ),
+            (
+                generate_key("disk.{dev}.write"),
+                "Disk {dev} Write (MB)",
+                HardwareConfig(y_range=(0, None), chart_name="Disk Write per Device (MB)", chart_index=random_index()),
+            ),
+            (
+                generate_key("disk.{dev}.busy"),
+                "Disk {dev} Busy Time (%)",
+                HardwareConfig(
+                    y_range=(0, 100), chart_name="Disk Busy Time per Device (%)", chart_index=random_index()
+                ),
+            ),
+        )
+        # 磁盘名称 -> 每个指标的 (key, 名称, 配置)
+        self.per_disk_infos: Dict[str, List[Tuple[str, str, HardwareConfig]]] = {}
+        settings = get_settings()
+        self.device_filter = DeviceFilter(settings.hardware_device_include, settings.hardware_device_exclude)
+        self.sysfs_block = os.path.join(sysfs, "block")
+        self.per_disk_delta = CounterDelta()
+        self.per_disk_delta(self.read_per_disk_counters(), self.last_time)
+
+    def is_disk(self, name: str) -> bool:
+        """
+        判断是否单独上报此磁盘，Linux 中分区的读写已经计入所在的磁盘，只有整块磁盘位于 /sys/block 下
+        """
+        if not self.device_filter(name):
+            return False
+        return not os.path.isdir(self.sysfs_block) or os.path.exists(os.path.join(self.sysfs_block, name))
+
+    def read_per_disk_counters(self) -> Dict[str, Tuple[int, int, int]]:
+        """
+        读取每块磁盘的累计读写字节数与繁忙时间（毫秒，只在 Linux 上可用，其他平台为 0）
+        """
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        return {
+            name: (c.read_bytes, c.write_bytes, getattr(c, "busy_time", 0))
+            for name, c in counters.items()
+            if self.is_disk(name)
+        }
+
+    def get_per_disk_speed(self, now: float) -> List[HardwareInfo]:
+        """
+        获取每块磁盘的读写速度 (MB/s) 与繁忙时间占比 (%)
+        """
+        result = []
+        for name, (read, write, busy) in self.per_disk_delta(self.read_per_disk_counters(), now).items():
+            infos = self.per_disk_infos.get(name)
+            if infos is None:
+                infos = self.per_disk_infos[name] = [
+                    (key.format(dev=name), title.format(dev=name), config.clone(metric_name=name))
+                    for key, title, config in self.per_disk_metrics
+                ]
+            # 繁忙时间为每秒的毫秒数，只在 Linux 上可用
+            values = (read / self.unit, write / self.unit, min(busy / 10, 100))[: 3 if psutil.LINUX else 2]
+            for (key, title, config), value in zip(infos, values):
+                result.append({"key": key, "name": title, "value": value, "config": config})
+        return result
+
     def get_disk_read_speed(self, read_bytes: int, time_diff: float) -> HardwareInfo:
         """
         获取磁盘读取速度 (MB/s)
@@ -96,6 +169,7 @@ class DiskCollector(HardwareCollector):
             self.get_disk_read_speed(current_disk_io.read_bytes, time_diff),
             self.get_disk_write_speed(current_disk_io.write_bytes, time_diff),
             self.get_disk_usage(),
+            *self.get_per_disk_speed(current_time),
         ]
         # 更新上次的值
         self.last_disk_io = current_disk_io
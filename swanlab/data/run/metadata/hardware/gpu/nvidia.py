@@ -6,11 +6,13 @@
 """
 
 import subprocess
+from typing import Any, Callable, List, NamedTuple, Optional, Set, Tuple
 
 import pynvml
 
 from swanlab.log import swanlog
-from ..type import HardwareFuncResult, HardwareCollector, HardwareInfoList, HardwareInfo
+from ..process import ProcessTree
+from ..type import HardwareFuncResult, HardwareCollector, HardwareInfoList
 from ..utils import generate_key, HardwareConfig, random_index
 
 
@@ -91,173 +93,190 @@ def get_cuda_version():
         return None
 
 
-class GpuCollector(HardwareCollector):
+class GpuSnapshot(NamedTuple):
+    """
+    单个 GPU 在一次采集中的全部数据，采集失败的项为 None
+    """
 
-    def __init__(self, count: int, max_mem_mb: int):
-        super().__init__()
-        # GPU 利用率
-        self.gpu_util_key = generate_key("gpu.{idx}.pct")
-        util_config = HardwareConfig(y_range=(0, 100), chart_name="GPU Utilization (%)", chart_index=random_index())
-        # GPU 内存使用率
-        self.gpu_mem_pct_key = generate_key("gpu.{idx}.mem.pct")
-        mem_pct_config = HardwareConfig(
-            y_range=(0, 100), chart_name="GPU Memory Allocated (%)", chart_index=random_index()
-        )
-        # GPU 内存使用量
-        self.gpu_mem_value_key = generate_key("gpu.{idx}.mem.value")
-        mem_value_config = HardwareConfig(
-            y_range=(0, max_mem_mb), chart_name="GPU Memory Allocated (MB)", chart_index=random_index()
-        )
-        # GPU 温度
-        self.gpu_temp_key = generate_key("gpu.{idx}.temp")
-        tem_config = HardwareConfig(chart_name="GPU Temperature (℃)", chart_index=random_index())
-        # GPU 功耗
-        self.gpu_power_key = generate_key("gpu.{idx}.power")
-        power_config = HardwareConfig(chart_name="GPU Power Usage (W)", chart_index=random_index())
-        # GPU 访存时间百分比
-        self.gpu_mem_time_key = generate_key("gpu.{idx}.mem.time")
-        mem_time_config = HardwareConfig(
-            y_range=(0, 100), chart_name="GPU Time Spent Accessing Memory (%)", chart_index=random_index()
-        )
-        # 每个GPU的配置信息
-        self.per_gpu_configs = {
-            self.gpu_mem_pct_key: [],
-            self.gpu_mem_value_key: [],
-            self.gpu_temp_key: [],
-            self.gpu_power_key: [],
-            self.gpu_mem_time_key: [],
-            self.gpu_util_key: [],
-        }
-        self.handles = []
-        for idx in range(count):
-            metric_name = "GPU {idx}".format(idx=idx)
-            self.per_gpu_configs[self.gpu_mem_pct_key].append(mem_pct_config.clone(metric_name=metric_name))
-            self.per_gpu_configs[self.gpu_mem_value_key].append(mem_value_config.clone(metric_name=metric_name))
-            self.per_gpu_configs[self.gpu_temp_key].append(tem_config.clone(metric_name=metric_name))
-            self.per_gpu_configs[self.gpu_power_key].append(power_config.clone(metric_name=metric_name))
-            self.per_gpu_configs[self.gpu_mem_time_key].append(mem_time_config.clone(metric_name=metric_name))
-            self.per_gpu_configs[self.gpu_util_key].append(util_config.clone(metric_name=metric_name))
+    util: Optional[int]
+    mem_time: Optional[int]
+    mem_used: Optional[int]
+    mem_total: Optional[int]
+    temp: Optional[int]
+    power: Optional[float]
+    # 训练进程树在此 GPU 上占用的显存（字节）与 SM 利用率之和
+    proc_mem: Optional[int] = None
+    proc_util: Optional[float] = None
+    # 此 GPU 上是否运行着训练进程树中的进程
+    proc_found: bool = False
 
-    @HardwareCollector.try_run()
-    def get_gpu_config(self, key: str, idx: int) -> HardwareConfig:
-        """
-        获取 某个GPU的某个配置信息
-        """
-        return self.per_gpu_configs[key][idx]
 
-    @HardwareCollector.try_run()
-    def get_gpu_util(self, idx: int) -> HardwareInfo:
-        """
-        获取 GPU 利用率
-        """
-        handle = self.handles[idx]
-        util_info = pynvml.nvmlDeviceGetUtilizationRates(handle)
-        return {
-            "key": self.gpu_util_key.format(idx=idx),
-            "value": util_info.gpu,
-            "name": "GPU {idx} Utilization (%)".format(idx=idx),
-            "config": self.get_gpu_config(self.gpu_util_key, idx),
-        }
+def _query(func, *args):
+    """
+    调用 NVML 接口，失败时返回 None，避免某一项不受支持（例如部分型号不支持功耗查询）导致整个 GPU 采集失败
+    """
+    try:
+        return func(*args)
+    except pynvml.NVMLError:
+        return None
 
-    @HardwareCollector.try_run()
-    def get_gpu_mem_pct(self, idx: int) -> HardwareInfo:
-        """
-        获取 GPU 内存使用率
-        """
-        handle = self.handles[idx]
-        mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-        mem_pct = mem_info.used / mem_info.total * 100
-        return {
-            "key": self.gpu_mem_pct_key.format(idx=idx),
-            "value": mem_pct,
-            "name": "GPU {idx} Memory Allocated (%)".format(idx=idx),
-            "config": self.get_gpu_config(self.gpu_mem_pct_key, idx),
-        }
 
-    @HardwareCollector.try_run()
-    def get_gpu_mem_value(self, idx: int) -> HardwareInfo:
-        """
-        获取 GPU 内存使用量(MB)
-        """
-        handle = self.handles[idx]
-        mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-        return {
-            "key": self.gpu_mem_value_key.format(idx=idx),
-            "value": mem_info.used >> 20,
-            "name": "GPU {idx} Memory Allocated (MB)".format(idx=idx),
-            "config": self.get_gpu_config(self.gpu_mem_value_key, idx),
-        }
+class GpuCollector(HardwareCollector):
+    """
+    NVIDIA GPU 采集器
+    每次采集时每个 GPU 只查询一次快照（利用率、显存、温度、功耗各一次 NVML 调用），
+    NVML 在第一次采集时初始化并保持到采集器销毁，key、名称与配置在初始化时生成
+    NVML 的 nvmlDeviceGetFieldValues 没有利用率、已用显存与 GPU 温度对应的字段，无法进一步合并查询
+    除了整卡的指标，还统计训练进程树（见 ProcessTree）在每个 GPU 上的显存与利用率，
+    在共享节点或多进程 DDP 中可以区分训练进程自身的用量
+    """
 
-    @HardwareCollector.try_run()
-    def get_gpu_temp(self, idx: int) -> HardwareInfo:
-        """
-        获取 GPU 温度
-        """
-        handle = self.handles[idx]
-        temp_info = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-        return {
-            "key": self.gpu_temp_key.format(idx=idx),
-            "value": temp_info,
-            "name": "GPU {idx} Temperature (℃)".format(idx=idx),
-            "config": self.get_gpu_config(self.gpu_temp_key, idx),
+    sampling = True
+    persistent = True
+
+    # (key 模板, 名称模板, 快照中的取值函数)
+    METRICS = (
+        ("gpu.{idx}.mem.pct", "GPU {idx} Memory Allocated (%)", lambda s: s.mem_used / s.mem_total * 100),
+        ("gpu.{idx}.mem.value", "GPU {idx} Memory Allocated (MB)", lambda s: s.mem_used >> 20),
+        ("gpu.{idx}.pct", "GPU {idx} Utilization (%)", lambda s: s.util),
+        ("gpu.{idx}.temp", "GPU {idx} Temperature (℃)", lambda s: s.temp),
+        ("gpu.{idx}.power", "GPU {idx} Power Usage (W)", lambda s: s.power),
+        ("gpu.{idx}.mem.time", "GPU {idx} Time Spent Accessing Memory (%)", lambda s: s.mem_time),
+        ("gpu.{idx}.proc.mem.pct", "GPU {idx} Process Memory Allocated (%)", lambda s: s.proc_mem / s.mem_total * 100),
+        ("gpu.{idx}.proc.mem.value", "GPU {idx} Process Memory Allocated (MB)", lambda s: s.proc_mem >> 20),
+        ("gpu.{idx}.proc.pct", "GPU {idx} Process Utilization (%)", lambda s: min(s.proc_util, 100)),
+    )
+
+    def __init__(self, count: int, max_mem_mb: int):
+        super().__init__()
+        configs = {
+            # GPU 内存使用率
+            "gpu.{idx}.mem.pct": HardwareConfig(
+                y_range=(0, 100), chart_name="GPU Memory Allocated (%)", chart_index=random_index()
+            ),
+            # GPU 内存使用量
+            "gpu.{idx}.mem.value": HardwareConfig(
+                y_range=(0, max_mem_mb), chart_name="GPU Memory Allocated (MB)", chart_index=random_index()
+            ),
+            # GPU 利用率
+            "gpu.{idx}.pct": HardwareConfig(
+                y_range=(0, 100), chart_name="GPU Utilization (%)", chart_index=random_index()
+            ),
+            # GPU 温度
+            "gpu.{idx}.temp": HardwareConfig(chart_name="GPU Temperature (℃)", chart_index=random_index()),
+            # GPU 功耗
+            "gpu.{idx}.power": HardwareConfig(chart_name="GPU Power Usage (W)", chart_index=random_index()),
+            # GPU 访存时间百分比
+            "gpu.{idx}.mem.time": HardwareConfig(
+                y_range=(0, 100), chart_name="GPU Time Spent Accessing Memory (%)", chart_index=random_index()
+            ),
+            # 训练进程树的显存使用率
+            "gpu.{idx}.proc.mem.pct": HardwareConfig(
+                y_range=(0, 100), chart_name="GPU Process Memory Allocated (%)", chart_index=random_index()
+            ),
+            # 训练进程树的显存使用量
+            "gpu.{idx}.proc.mem.value": HardwareConfig(
+                y_range=(0, max_mem_mb), chart_name="GPU Process Memory Allocated (MB)", chart_index=random_index()
+            ),
+            # 训练进程树的利用率
+            "gpu.{idx}.proc.pct": HardwareConfig(
+                y_range=(0, 100), chart_name="GPU Process Utilization (%)", chart_index=random_index()
+            ),
         }
+        # 每个 GPU 的 (key, 名称, 配置, 取值函数)
+        self.per_gpu_metrics: List[List[Tuple[str, str, HardwareConfig, Callable[[GpuSnapshot], Any]]]] = []
+        for idx in range(count):
+            metric_name = "GPU {idx}".format(idx=idx)
+            self.per_gpu_metrics.append(
+                [
+                    (
+                        generate_key(key.format(idx=idx)),
+                        name.format(idx=idx),
+                        configs[key].clone(metric_name=metric_name),
+                        getter,
+                    )
+                    for key, name, getter in self.METRICS
+                ]
+            )
+        self.handles = []
+        self.tree = ProcessTree()
+        # 每个 GPU 上一次查询到的进程利用率采样时间戳，下一次只查询此后的采样
+        self.util_timestamps = [0] * count
 
-    @HardwareCollector.try_run()
-    def get_gpu_power(self, idx: int) -> HardwareInfo:
+    def process_util(self, idx: int, handle, pids: Set[int]) -> Optional[float]:
         """
-        获取 GPU 功耗
+        查询训练进程树在单个 GPU 上的 SM 利用率，每个进程取上次查询以来采样的平均值后求和
         """
-        handle = self.handles[idx]
-        # 功耗单位为mW，转换为W
-        power_info = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000
-        return {
-            "key": self.gpu_power_key.format(idx=idx),
-            "value": power_info,
-            "name": "GPU {idx} Power Usage (W)".format(idx=idx),
-            "config": self.get_gpu_config(self.gpu_power_key, idx),
-        }
+        try:
+            samples = pynvml.nvmlDeviceGetProcessUtilization(handle, self.util_timestamps[idx])
+        except pynvml.NVMLError as e:
+            # 上次查询以来没有新的采样，说明 GPU 上没有进程在运行
+            return 0 if e.value == pynvml.NVML_ERROR_NOT_FOUND else None
+        per_pid = {}
+        for sample in samples:
+            self.util_timestamps[idx] = max(self.util_timestamps[idx], sample.timeStamp)
+            if sample.pid in pids:
+                per_pid.setdefault(sample.pid, []).append(sample.smUtil)
+        return sum(sum(v) / len(v) for v in per_pid.values())
 
-    @HardwareCollector.try_run()
-    def get_gpu_mem_time(self, idx: int) -> HardwareInfo:
+    def snapshot(self, idx: int, handle, pids: Set[int]) -> GpuSnapshot:
         """
-        获取 GPU 访存时间百分比
+        查询单个 GPU 的快照
         """
-        handle = self.handles[idx]
-        info = pynvml.nvmlDeviceGetUtilizationRates(handle)
-        return {
-            "key": self.gpu_mem_time_key.format(idx=idx),
-            "value": info.memory,
-            "name": "GPU {idx} Time Spent Accessing Memory (%)".format(idx=idx),
-            "config": self.get_gpu_config(self.gpu_mem_time_key, idx),
-        }
+        util = _query(pynvml.nvmlDeviceGetUtilizationRates, handle)
+        mem = _query(pynvml.nvmlDeviceGetMemoryInfo, handle)
+        power = _query(pynvml.nvmlDeviceGetPowerUsage, handle)
+        procs = _query(pynvml.nvmlDeviceGetComputeRunningProcesses, handle)
+        return GpuSnapshot(
+            util=None if util is None else util.gpu,
+            mem_time=None if util is None else util.memory,
+            mem_used=None if mem is None else mem.used,
+            mem_total=None if mem is None else mem.total,
+            temp=_query(pynvml.nvmlDeviceGetTemperature, handle, pynvml.NVML_TEMPERATURE_GPU),
+            # 功耗单位为mW，转换为W
+            power=None if power is None else power / 1000,
+            # 没有权限时 usedGpuMemory 为 None
+            proc_mem=None if procs is None else sum(p.usedGpuMemory or 0 for p in procs if p.pid in pids),
+            proc_util=self.process_util(idx, handle, pids),
+            proc_found=procs is not None and any(p.pid in pids for p in procs),
+        )
 
     def collect(self) -> HardwareInfoList:
         """
         采集信息
         """
+        pids = self.tree.pids()
+        snapshots = [self.snapshot(idx, handle, pids) for idx, handle in enumerate(self.handles)]
+        # 没有任何 GPU 上找到训练进程时不上报进程级指标，例如容器中 NVML 返回的是宿主机的 PID，无法与训练进程匹配
+        # 没有权限时显存为 0，但仍然可以上报利用率，因此以是否找到训练进程为准，而不是显存是否为 0
+        if not any(s.proc_found for s in snapshots):
+            snapshots = [s._replace(proc_mem=None, proc_util=None) for s in snapshots]
         result: HardwareInfoList = []
-        for idx, handle in enumerate(self.handles):
-            result.append(self.get_gpu_mem_pct(idx))
-            result.append(self.get_gpu_mem_value(idx))
-            result.append(self.get_gpu_util(idx))
-            result.append(self.get_gpu_temp(idx))
-            result.append(self.get_gpu_power(idx))
-            result.append(self.get_gpu_mem_time(idx))
+        for snapshot, metrics in zip(snapshots, self.per_gpu_metrics):
+            for key, name, config, getter in metrics:
+                try:
+                    value = getter(snapshot)
+                except (TypeError, ZeroDivisionError):
+                    # 快照中的依赖项采集失败
+                    continue
+                if value is None:
+                    continue
+                result.append({"key": key, "name": name, "value": value, "config": config})
         return result
 
     def __del__(self):
-        pynvml.nvmlShutdown()
+        try:
+            pynvml.nvmlShutdown()
+        except Exception:  # noqa
+            pass
 
     def before_collect_impl(self):
-        # 低频采集下（30s以下），应该每次采集时都执行pynvml.nvmlInit()
-        # 高频采集下（30s以上），应该在初始化时执行pynvml.nvmlInit()，在最后一次采集时执行pynvml.nvmlShutdown()
-        # 在外部定时任务处，超过10次即变为低频采集，因此需要判断一下
+        # 常驻模式下只在第一次采集时初始化，NVML 保持初始化直到采集器销毁
         pynvml.nvmlInit()
-        for i in range(pynvml.nvmlDeviceGetCount()):
-            self.handles.append(pynvml.nvmlDeviceGetHandleByIndex(i))
+        self.handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
         swanlog.debug("NVIDIA GPU nvml inited.")
 
     def after_collect_impl(self):
         pynvml.nvmlShutdown()
-        self.handles.clear()
+        self.handles = []
         swanlog.debug("NVIDIA GPU nvml shutdown.")
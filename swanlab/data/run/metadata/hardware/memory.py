@@ -11,6 +11,7 @@ import psutil
 
 from swanlab.toolkit import is_macos
 from .type import HardwareFuncResult, HardwareCollector, HardwareInfo
+from .process import get_root_pid
 from .utils import MemoryBaseCollector as M
 
 
@@ -28,9 +29,12 @@ def get_memory_size() -> HardwareFuncResult:
 
 
 class MemoryCollector(HardwareCollector, M):
+    sampling = True
+
     def __init__(self):
         super().__init__()
-        self.current_process = psutil.Process()
+        # 统计训练进程，在监控子进程中不是当前进程
+        self.current_process = psutil.Process(get_root_pid())
 
     def collect(self) -> List[HardwareInfo]:
         return [self.get_mem_usage(), *self.get_cur_proc_mem(self.current_process)]
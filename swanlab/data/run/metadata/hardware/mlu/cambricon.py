@@ -8,8 +8,9 @@
 import math
 import platform
 import subprocess
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+from ..command import CommandCache
 from ..type import HardwareCollector as H
 from ..type import HardwareConfig, HardwareFuncResult, HardwareInfoList
 from ..utils import generate_key, random_index
@@ -82,252 +83,110 @@ def map_mlu() -> Tuple[Optional[str], dict]:
     return driver, mlu_map
 
 
-class CambriconCollector(H):
-    def __init__(self, mlu_map, max_mem_value):
-        super().__init__()
-        self.mlu_map = mlu_map
-        self.max_mem_value = max_mem_value
-
-        # mlu Utilization (%)
-        self.util_key = generate_key("mlu.{mlu_index}.ptc")
-        util_config = HardwareConfig(
-            y_range=(0, 100),
-            chart_index=random_index(),
-            chart_name="MLU Utilization (%)",
-        )
-        self.per_util_configs = {}
-
-        # mlu Memory Allocated (%)
-        self.memory_key = generate_key("mlu.{mlu_index}.mem.ptc")
-        memory_config = HardwareConfig(
-            y_range=(0, 100),
-            chart_index=random_index(),
-            chart_name="MLU Memory Allocated (%)",
-        )
-        self.per_memory_configs = {}
-
-        # mlu Memory Allocated (MB)
-        self.mem_value_key = generate_key("mlu.{mlu_index}.mem.value")
-        mem_value_config = HardwareConfig(
-            y_range=(0, self.max_mem_value),
-            chart_index=random_index(),
-            chart_name="MLU Memory Allocated (MB)",
-        )
-        self.per_mem_value_configs = {}
-
-        # mlu Temperature (°C)
-        self.temp_key = generate_key("mlu.{mlu_index}.temp")
-        temp_config = HardwareConfig(
-            y_range=(0, None),
-            chart_index=random_index(),
-            chart_name="MLU Temperature (°C)",
-        )
-        self.per_temp_configs = {}
-
-        # mlu Power (W)
-        self.power_key = generate_key("mlu.{mlu_index}.power")
-        power_config = HardwareConfig(
-            y_range=(0, None),
-            chart_index=random_index(),
-            chart_name="MLU Power (W)",
-        )
-        self.per_power_configs = {}
-
-        for mlu_id in self.mlu_map:
-            metric_name = f"MLU {mlu_id}"
-            self.per_util_configs[metric_name] = util_config.clone(metric_name=metric_name)
-            self.per_memory_configs[metric_name] = memory_config.clone(metric_name=metric_name)
-            self.per_mem_value_configs[metric_name] = mem_value_config.clone(metric_name=metric_name)
-            self.per_temp_configs[metric_name] = temp_config.clone(metric_name=metric_name)
-            self.per_power_configs[metric_name] = power_config.clone(metric_name=metric_name)
-
-    def collect(self) -> HardwareInfoList:
-        result: HardwareInfoList = []
-        usage_methods = [
-            self.get_utilization_usage,
-            self.get_memory_usage,
-            self.get_mem_value_usage,
-            self.get_temperature_usage,
-            self.get_power_usage,
-        ]
-
-        for method in usage_methods:
-            result.extend(method().values())
-        return result
-
-    def get_utilization_usage(self) -> dict:
-        """
-        获取指定mlu设备的利用率
-        """
-        output = subprocess.run(["cnmon", "info", "-u"], capture_output=True, text=True).stdout
-
-        util_infos = {}
-        mlu_ids = []
-
-        # 获取所有mlu ID
-        for mlu_id in self.mlu_map:
-            mlu_ids.append(mlu_id)
-
-        index = 0
-        lines = output.strip().split("\n")
-        for line in lines:
-            line = line.strip()
-            if "mlu average" in line.lower():
-                util_infos[mlu_ids[index]] = {
-                    "key": self.util_key.format(mlu_index=mlu_ids[index]),
-                    "name": f"MLU {mlu_ids[index]} Utilization (%)",
-                    "value": math.nan,
-                    "config": self.per_util_configs[f"MLU {mlu_ids[index]}"],
-                }
-                # 获得此mlu的利用率数值
-                util = line.split(":")[-1].replace("%", "").strip()
-                if util.isdigit():
-                    util_infos[mlu_ids[index]]["value"] = float(util)
-                index += 1
-                continue
-        return util_infos
-
-    def get_memory_usage(self) -> dict:
-        """
-        获取指定mlu设备的显存占用率
-        """
-        output = subprocess.run(
-            ["cnmon", "info", "-m"],
-            capture_output=True,
-            text=True,
-        ).stdout
-
-        memory_infos = {}
-        mlu_ids = []
-
-        # 获取所有mlu ID
-        for mlu_id in self.mlu_map:
-            mlu_ids.append(mlu_id)
-
-        index = 0
-        lines = output.strip().split("\n")
-        for line_idx, line in enumerate(lines):
-            # 如果包含mlu average，则表示该行是mlu的利用率
-            if "physical memory usage" in line.lower():
-                if "used" in lines[line_idx + 2].lower():
-                    used_line = lines[line_idx + 2]
-                    # 初始化mlu的利用率
-                    memory_infos[mlu_ids[index]] = {
-                        "key": self.memory_key.format(mlu_index=mlu_ids[index]),
-                        "name": f"MLU {mlu_ids[index]} Memory Allocated (%)",
-                        "value": math.nan,
-                        "config": self.per_memory_configs[f"MLU {mlu_ids[index]}"],
-                    }
-                    # 获得此mlu的显存数值（MiB）
-                    memory = used_line.split(":")[-1].replace("MiB", "").strip()
-                    if memory.isdigit():
-                        # 计算mlu显存占用率
-                        memory_infos[mlu_ids[index]]["value"] = (
-                            float(memory) / (float(self.mlu_map[mlu_ids[index]]["memory"]) * 1024) * 100
-                        )
-                    index += 1
-                    continue
-        return memory_infos
+CNMON_QUERY = ("cnmon", "info", "-u", "-m", "-e", "-p")
+"""
+一次查询所有卡的利用率、显存、温度与功耗
+"""
 
-    def get_mem_value_usage(self) -> dict:
-        """
-        获取指定mlu设备的显存使用量 (MB)
-        """
-        output = subprocess.run(
-            ["cnmon", "info", "-m"],
-            capture_output=True,
-            text=True,
-        ).stdout
+# 指标名称 -> (单独查询的参数, 段落标题, 数值行相对标题的偏移, 数值行的字段名, 单位)
+CNMON_SECTIONS = {
+    "util": ("-u", "mlu average", 0, "mlu average", "%"),
+    "memory": ("-m", "physical memory usage", 2, "used", "MiB"),
+    "temp": ("-e", "temperature", 2, "chip", "C"),
+    "power": ("-p", "power", 1, "usage", "W"),
+}
 
-        mem_value_infos = {}
-        mlu_ids = []
 
-        # 获取所有mlu ID
-        for mlu_id in self.mlu_map:
-            mlu_ids.append(mlu_id)
+def parse_cnmon_section(output: str, metric: str) -> List[float]:
+    """
+    解析 cnmon info 的输出，按卡的顺序返回某一指标的值，无法解析的值为 NaN
+    每张卡的每个指标都位于一个段落中，例如：
+    Physical Memory Usage
+        Total                   : 24576 MiB
+        Used                    : 1150 MiB
+    """
+    _, title, offset, field, unit = CNMON_SECTIONS[metric]
+    values = []
+    lines = output.strip().split("\n")
+    for line_idx, line in enumerate(lines):
+        if title not in line.lower() or line_idx + offset >= len(lines):
+            continue
+        value_line = lines[line_idx + offset]
+        if field not in value_line.lower():
+            continue
+        value = value_line.split(":")[-1].replace(unit, "").strip()
+        try:
+            values.append(float(value))
+        except ValueError:
+            values.append(math.nan)
+    return values
 
-        index = 0
-        lines = output.strip().split("\n")
-        for line_idx, line in enumerate(lines):
-            # 如果包含mlu average，则表示该行是mlu的利用率
-            if "physical memory usage" in line.lower():
-                if "used" in lines[line_idx + 2].lower():
-                    used_line = lines[line_idx + 2]
-                    # 初始化mlu的利用率
-                    mem_value_infos[mlu_ids[index]] = {
-                        "key": self.mem_value_key.format(mlu_index=mlu_ids[index]),
-                        "name": f"MLU {mlu_ids[index]} Memory Allocated (MB)",
-                        "value": math.nan,
-                        "config": self.per_mem_value_configs[f"MLU {mlu_ids[index]}"],
-                    }
-                    # 获得此mlu的显存数值（MiB）
-                    memory = used_line.split(":")[-1].replace("MiB", "").strip()
-                    if memory.isdigit():
-                        mem_value_infos[mlu_ids[index]]["value"] = float(memory)
-                    index += 1
-                    continue
-        return mem_value_infos
 
-    def get_temperature_usage(self) -> dict:
+class CambriconCollector(H):
+    def __init__(self, mlu_map, max_mem_value, cli: Optional[CommandCache] = None):
         """
-        获取指定mlu设备的温度(°C)
+        :param mlu_map: mlu_id -> mlu 信息，见 map_mlu
+        :param max_mem_value: 单张卡的显存容量，单位 MB
+        :param cli: cnmon 命令的执行与缓存，默认直接执行命令
         """
-        output = subprocess.run(["cnmon", "info", "-e"], capture_output=True, text=True).stdout
-        temp_infos = {}
-        mlu_ids = []
-
-        # 获取所有mlu ID
-        for mlu_id in self.mlu_map:
-            mlu_ids.append(mlu_id)
-
-        index = 0
-        lines = output.strip().split("\n")
-        for line_idx, line in enumerate(lines):
-            if "temperature" in line.lower():
-                if "chip" in lines[line_idx + 2].lower():
-                    temp_line = lines[line_idx + 2]
-                    temp_infos[mlu_ids[index]] = {
-                        "key": self.temp_key.format(mlu_index=mlu_ids[index]),
-                        "name": f"MLU {mlu_ids[index]} Temperature (°C)",
-                        "value": math.nan,
-                        "config": self.per_temp_configs[f"MLU {mlu_ids[index]}"],
-                    }
-                    # 获得此mlu的温度数值
-                    temp = temp_line.split(":")[-1].replace("C", "").strip()
-                    if temp.isdigit():
-                        temp_infos[mlu_ids[index]]["value"] = float(temp)
-                    index += 1
-                    continue
-        return temp_infos
-
-    def get_power_usage(self) -> dict:
+        super().__init__()
+        self.mlu_map = mlu_map
+        self.max_mem_value = max_mem_value
+        self.cli = cli or CommandCache()
+        # 指标名称 -> (key, 图表名称后缀, 图表配置)
+        self.metrics = {
+            # mlu Utilization (%)
+            "util": (generate_key("mlu.{mlu_index}.ptc"), "Utilization (%)", (0, 100)),
+            # mlu Memory Allocated (%)
+            "memory": (generate_key("mlu.{mlu_index}.mem.ptc"), "Memory Allocated (%)", (0, 100)),
+            # mlu Memory Allocated (MB)
+            "mem_value": (generate_key("mlu.{mlu_index}.mem.value"), "Memory Allocated (MB)", (0, max_mem_value)),
+            # mlu Temperature (°C)
+            "temp": (generate_key("mlu.{mlu_index}.temp"), "Temperature (°C)", (0, None)),
+            # mlu Power (W)
+            "power": (generate_key("mlu.{mlu_index}.power"), "Power (W)", (0, None)),
+        }
+        # 指标名称 -> 卡标签 -> 图表配置
+        self.per_configs: Dict[str, Dict[str, HardwareConfig]] = {}
+        for metric, (_, suffix, y_range) in self.metrics.items():
+            config = HardwareConfig(y_range=y_range, chart_index=random_index(), chart_name=f"MLU {suffix}")
+            self.per_configs[metric] = {
+                f"MLU {mlu_id}": config.clone(metric_name=f"MLU {mlu_id}") for mlu_id in self.mlu_map
+            }
+
+    def query(self, metric: str) -> List[float]:
         """
-        获取指定mlu设备的功耗(W)
+        从合并查询的输出中解析指标，解析不到时（例如 cnmon 版本不支持合并参数）单独查询此指标
         """
-        output = subprocess.run(["cnmon", "info", "-p"], capture_output=True, text=True).stdout
-        power_infos = {}
-        mlu_ids = []
-
-        # 获取所有mlu ID
-        for mlu_id in self.mlu_map:
-            mlu_ids.append(mlu_id)
+        values = parse_cnmon_section(self.cli.run(*CNMON_QUERY), metric)
+        if not values:
+            values = parse_cnmon_section(self.cli.run("cnmon", "info", CNMON_SECTIONS[metric][0]), metric)
+        return values
 
-        index = 0
-        lines = output.strip().split("\n")
-        for line_idx, line in enumerate(lines):
-            if "power" in line.lower() and line_idx + 1 < len(lines):
-                if "usage" in lines[line_idx + 1].lower():
-                    power_line = lines[line_idx + 1]
-                    power_infos[mlu_ids[index]] = {
-                        "key": self.power_key.format(mlu_index=mlu_ids[index]),
-                        "name": f"MLU {mlu_ids[index]} Power (W)",
-                        "value": math.nan,
-                        "config": self.per_power_configs[f"MLU {mlu_ids[index]}"],
+    def collect(self) -> HardwareInfoList:
+        # 每次采集只执行一次 cnmon info，所有卡的指标从同一份输出中解析
+        self.cli.clear()
+        memory = self.query("memory")
+        values = {
+            "util": self.query("util"),
+            "memory": [
+                used / (float(self.mlu_map[mlu_id]["memory"]) * 1024) * 100
+                for mlu_id, used in zip(self.mlu_map, memory)
+            ],
+            "mem_value": memory,
+            "temp": self.query("temp"),
+            "power": self.query("power"),
+        }
+        result: HardwareInfoList = []
+        for metric, (key, suffix, _) in self.metrics.items():
+            # 段落按卡的顺序输出，多出的段落被忽略
+            for mlu_id, value in zip(self.mlu_map, values[metric]):
+                result.append(
+                    {
+                        "key": key.format(mlu_index=mlu_id),
+                        "name": f"MLU {mlu_id} {suffix}",
+                        "value": value,
+                        "config": self.per_configs[metric][f"MLU {mlu_id}"],
                     }
-                    # 获得此mlu的功耗数值
-                    power = power_line.split(":")[-1].replace("W", "").strip()
-                    if power.isdigit():
-                        power_infos[mlu_ids[index]]["value"] = float(power)
-                    index += 1
-                    continue
-        return power_infos
+                )
+        return result
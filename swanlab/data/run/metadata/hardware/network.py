@@ -5,13 +5,15 @@
 @description: 网络信息采集
 """
 
+import os
 import time
-from typing import List
+from typing import Dict, List, Tuple
 
 import psutil
 
+from swanlab.swanlab_settings import get_settings
 from .type import HardwareFuncResult, HardwareCollector, HardwareInfo
-from .utils import generate_key, random_index, HardwareConfig
+from .utils import CounterDelta, DeviceFilter, generate_key, random_index, HardwareConfig
 
 
 def get_network_info() -> HardwareFuncResult:
@@ -19,10 +21,51 @@ def get_network_info() -> HardwareFuncResult:
     return None, NetworkCollector()
 
 
+def read_file_int(path: str) -> int:
+    with open(path, "r") as f:
+        return int(f.read().strip())
+
+
+def read_infiniband_counters(sysfs: str = "/sys") -> Dict[str, Tuple[int, int]]:
+    """
+    读取 RDMA（InfiniBand、RoCE）端口的累计发送与接收字节数
+    计数器位于 /sys/class/infiniband/{设备}/ports/{端口}/counters，port_xmit_data 与 port_rcv_data 的单位为 4 字节
+    :return: "{设备}-{端口}" -> (发送字节数, 接收字节数)，没有 RDMA 设备时返回空字典
+    """
+    base = os.path.join(sysfs, "class", "infiniband")
+    result = {}
+    try:
+        devices = sorted(os.listdir(base))
+    except OSError:
+        return result
+    for device in devices:
+        ports_dir = os.path.join(base, device, "ports")
+        try:
+            ports = sorted(os.listdir(ports_dir), key=lambda p: int(p) if p.isdigit() else 0)
+        except OSError:
+            continue
+        for port in ports:
+            counters = os.path.join(ports_dir, port, "counters")
+            try:
+                result[f"{device}-{port}"] = (
+                    read_file_int(os.path.join(counters, "port_xmit_data")) * 4,
+                    read_file_int(os.path.join(counters, "port_rcv_data")) * 4,
+                )
+            except (OSError, ValueError):
+                continue
+    return result
+
+
 class NetworkCollector(HardwareCollector):
-    """网络信息采集器"""
+    """
+    网络信息采集器，除了所有网卡的汇总流量，还单独上报每个网卡与每个 RDMA 端口的流量
+    RDMA 流量绕过内核协议栈，不计入网卡的流量
+    """
 
-    def __init__(self):
+    def __init__(self, sysfs: str = "/sys"):
+        """
+        :param sysfs: sysfs 挂载点，用于读取 RDMA 端口的计数器，测试时可以替换
+        """
         super().__init__()
         self.last_net_io = psutil.net_io_counters()
         self.last_time = time.time()
@@ -42,6 +85,76 @@ class NetworkCollector(HardwareCollector):
 
         self.unit = 1024
 
+        # 类型 -> ((key 模板, 名称模板, 图表配置), ...)，依次对应发送与接收
+        self.per_device_metrics = {
+            "network": tuple(
+                (
+                    generate_key("network.{dev}." + direction),
+                    f"Network {{dev}} Traffic {title} (KB)",
+                    HardwareConfig(
+                        y_range=(0, None),
+                        chart_name=f"Network Traffic {title} per Interface (KB)",
+                        chart_index=random_index(),
+                    ),
+                )
+                for direction, title in (("sent", "Sent"), ("recv", "Received"))
+            ),
+            "rdma": tuple(
+                (
+                    generate_key("rdma.{dev}." + direction),
+                    f"RDMA {{dev}} Traffic {title} (MB)",
+                    HardwareConfig(
+                        y_range=(0, None),
+                        chart_name=f"RDMA Traffic {title} (MB)",
+                        chart_index=random_index(),
+                    ),
+                )
+                for direction, title in (("sent", "Sent"), ("recv", "Received"))
+            ),
+        }
+        # 类型 -> 单位
+        self.per_device_units = {"network": self.unit, "rdma": 1024**2}
+        # (类型, 设备名称) -> 每个指标的 (key, 名称, 配置)
+        self.per_device_infos: Dict[Tuple[str, str], List[Tuple[str, str, HardwareConfig]]] = {}
+        settings = get_settings()
+        self.device_filter = DeviceFilter(settings.hardware_device_include, settings.hardware_device_exclude)
+        self.sysfs = sysfs
+        self.per_device_deltas = {"network": CounterDelta(), "rdma": CounterDelta()}
+        for kind, counters in self.read_per_device_counters().items():
+            self.per_device_deltas[kind](counters, self.last_time)
+
+    def read_per_device_counters(self) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """
+        读取每个网卡与 RDMA 端口的累计发送与接收字节数
+        """
+        nics = psutil.net_io_counters(pernic=True) or {}
+        return {
+            "network": {name: (c.bytes_sent, c.bytes_recv) for name, c in nics.items() if self.device_filter(name)},
+            "rdma": {
+                name: c
+                for name, c in read_infiniband_counters(self.sysfs).items()
+                if self.device_filter(name.rsplit("-", 1)[0])
+            },
+        }
+
+    def get_per_device_speed(self, now: float) -> List[HardwareInfo]:
+        """
+        获取每个网卡的发送与接收速度 (KB/s)，以及每个 RDMA 端口的发送与接收速度 (MB/s)
+        """
+        result = []
+        for kind, counters in self.read_per_device_counters().items():
+            unit = self.per_device_units[kind]
+            for name, values in self.per_device_deltas[kind](counters, now).items():
+                infos = self.per_device_infos.get((kind, name))
+                if infos is None:
+                    infos = self.per_device_infos[(kind, name)] = [
+                        (key.format(dev=name), title.format(dev=name), config.clone(metric_name=name))
+                        for key, title, config in self.per_device_metrics[kind]
+                    ]
+                for (key, title, config), value in zip(infos, values):
+                    result.append({"key": key, "name": title, "value": value / unit, "config": config})
+        return result
+
     def collect(self) -> List[HardwareInfo]:
         current_net_io = psutil.net_io_counters()
         current_time = time.time()  # noqa
@@ -50,6 +163,7 @@ class NetworkCollector(HardwareCollector):
         results = [
             self.get_network_sent_speed(current_net_io.bytes_sent, time_diff),
             self.get_network_recv_speed(current_net_io.bytes_recv, time_diff),
+            *self.get_per_device_speed(current_time),
         ]
 
         # 更新上次的值
@@ -8,11 +8,13 @@
 import math
 import os
 import platform
+import re
 import subprocess
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
+from ..command import CommandCache
 from ..type import HardwareCollector as H
-from ..type import HardwareConfig, HardwareFuncResult, HardwareInfo, HardwareInfoList
+from ..type import HardwareConfig, HardwareFuncResult, HardwareInfoList
 from ..utils import generate_key, random_index
 
 
@@ -132,155 +134,163 @@ def get_chip_usage(npu_id: str, chip_id: str):
     return usage
 
 
+# npu-smi info 表格中形如 "3378 / 65536" 的用量
+USAGE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)")
+# npu-smi info 表格中芯片行的 Bus-Id，例如 0000:C1:00.0
+BUS_ID_PATTERN = re.compile(r"[0-9A-Fa-f]{4}:[0-9A-Fa-f]{2}:")
+
+ChipStats = Dict[str, float]
+"""
+芯片的采集结果，包括 util、hbm_rate、hbm_value、temp、power，缺失的指标不存在于字典中
+"""
+
+
+def to_float(value: str) -> float:
+    """
+    解析数值，NA 等无法解析的值返回 NaN
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+def parse_npu_smi_info(output: str) -> Dict[Tuple[str, str], ChipStats]:
+    """
+    解析 npu-smi info 的表格输出，一次调用即可得到所有芯片的利用率、显存、温度与功耗
+    每个 NPU 占据一行 NPU 行与若干芯片行：
+    | NPU   Name     | Health       | Power(W)    Temp(C)           Hugepages-Usage(page)|
+    | Chip           | Bus-Id       | AICore(%)   Memory-Usage(MB)  HBM-Usage(MB)        |
+    | 0     910B3    | OK           | 88.4        42                0    / 0             |
+    | 0              | 0000:C1:00.0 | 0           0    / 0          3378 / 65536         |
+    温度与功耗只在 NPU 行中，属于同一 NPU 的芯片共享；显存优先使用 HBM，没有 HBM 的设备（例如 310P）使用 Memory-Usage
+    :return: (npu_id, chip_id) -> ChipStats，无法解析时返回空字典
+    """
+    table: Dict[Tuple[str, str], ChipStats] = {}
+    npu_id, npu_stats = None, {}
+    for line in output.splitlines():
+        # 进程表格不包含芯片信息，其中的行与 NPU 行格式相同，需要在此停止解析
+        if "process id" in line.lower():
+            break
+        columns = [c.strip() for c in line.strip().strip("|").split("|")]
+        if len(columns) < 3 or not columns[0][:1].isdigit():
+            continue
+        first, values = columns[0].split()[0], columns[2].split()
+        if not BUS_ID_PATTERN.match(columns[1]):
+            # NPU 行：Power(W) Temp(C) ...
+            npu_id = first
+            npu_stats = {}
+            if len(values) >= 2:
+                npu_stats = {"power": to_float(values[0]), "temp": to_float(values[1])}
+            continue
+        if npu_id is None:
+            continue
+        # 芯片行：AICore(%) Memory-Usage(MB) [HBM-Usage(MB)]
+        stats = {**npu_stats}
+        if values:
+            stats["util"] = to_float(values[0])
+        usages = USAGE_PATTERN.findall(columns[2])
+        if usages:
+            used, total = map(float, usages[-1])
+            stats["hbm_value"] = used
+            if total > 0:
+                stats["hbm_rate"] = used / total * 100
+        table[(npu_id, first)] = stats
+    return table
+
+
+def parse_chip_usages(output: str) -> ChipStats:
+    """
+    解析 npu-smi info -t usages -i {npu_id} -c {chip_id} 的输出，得到芯片的利用率与 HBM 占用率
+    """
+    stats = {}
+    for line in output.split("\n"):
+        if "aicore usage rate" in line.lower():
+            # 利用率的值在最后一个
+            util = line.split(":")[-1].strip()
+            if util.isdigit():
+                stats["util"] = float(util)
+            continue
+        if "hbm usage rate" in line.lower():
+            hbm = line.split(":")[-1].strip()
+            if hbm.isdigit():
+                stats["hbm_rate"] = float(hbm)
+    return stats
+
+
+def parse_chip_value(output: str) -> float:
+    """
+    解析 npu-smi info -t temp/power -i {npu_id} -c {chip_id} 的输出，值在最后一个冒号之后
+    """
+    return to_float(output.strip().split(":")[-1].strip())
+
+
 class AscendCollector(H):
-    def __init__(self, npu_map, max_hbm_value: int):
+    def __init__(self, npu_map, max_hbm_value: int, cli: Optional[CommandCache] = None):
+        """
+        :param npu_map: npu_id -> chip_id -> 芯片信息，见 map_npu
+        :param max_hbm_value: 单个芯片的 HBM 容量，单位 MB
+        :param cli: npu-smi 命令的执行与缓存，默认直接执行命令
+        """
         super().__init__()
         self.npu_map = npu_map
         self.max_hbm_value = max_hbm_value
-        # NPU Utilization (%)
-        self.util_key = generate_key("npu.{npu_index}.ptc")
-        util_config = HardwareConfig(
-            y_range=(0, 100),
-            chart_index=random_index(),
-            chart_name="NPU Utilization (%)",
-        )
-        self.per_util_configs = {}
-        # NPU Memory Allocated (%)
-        self.hbm_rate_key = generate_key("npu.{npu_index}.mem.ptc")
-        hbm_rate_config = HardwareConfig(
-            y_range=(0, 100),
-            chart_index=random_index(),
-            chart_name="NPU Memory Allocated (%)",
-        )
-        self.per_hbm_configs = {}
-        # NPU Memory Allocated (MB)
-        self.hbm_value_key = generate_key("npu.{npu_index}.mem.value")
-        hbm_value_config = HardwareConfig(
-            y_range=(0, max_hbm_value),
-            chart_index=random_index(),
-            chart_name="NPU Memory Allocated (MB)",
-        )
-        self.per_hbm_value_configs = {}
-
-        # NPU Temperature (℃)
-        self.temp_key = generate_key("npu.{npu_index}.temp")
-        temp_config = HardwareConfig(
-            y_range=(0, None),
-            chart_index=random_index(),
-            chart_name="NPU Temperature (℃)",
-        )
-        self.per_temp_configs = {}
-        # NPU Power Usage (W)
-        self.power_key = generate_key("npu.{npu_index}.power")
-        power_config = HardwareConfig(
-            y_range=(0, None),
-            chart_index=random_index(),
-            chart_name="NPU Power Usage (W)",
-        )
-        self.per_power_config = {}
-
-        for npu_id in npu_map:
-            for chip_id in npu_map[npu_id]:
-                metric_name = f"NPU {npu_id}-{chip_id}"
-                self.per_util_configs[metric_name] = util_config.clone(metric_name=metric_name)
-                self.per_hbm_configs[metric_name] = hbm_rate_config.clone(metric_name=metric_name)
-                self.per_hbm_value_configs[metric_name] = hbm_value_config.clone(metric_name=metric_name)
-                self.per_temp_configs[metric_name] = temp_config.clone(metric_name=metric_name)
-                self.per_power_config[metric_name] = power_config.clone(metric_name=metric_name)
+        self.cli = cli or CommandCache()
+        # 指标名称 -> (key, 图表名称后缀, 图表配置)
+        self.metrics = {
+            # NPU Utilization (%)
+            "util": (generate_key("npu.{npu_index}.ptc"), "Utilization (%)", (0, 100)),
+            # NPU Memory Allocated (%)
+            "hbm_rate": (generate_key("npu.{npu_index}.mem.ptc"), "Memory Allocated (%)", (0, 100)),
+            # NPU Memory Allocated (MB)
+            "hbm_value": (generate_key("npu.{npu_index}.mem.value"), "Memory Allocated (MB)", (0, max_hbm_value)),
+            # NPU Temperature (℃)
+            "temp": (generate_key("npu.{npu_index}.temp"), "Temperature (℃)", (0, None)),
+            # NPU Power Usage (W)
+            "power": (generate_key("npu.{npu_index}.power"), "Power Usage (W)", (0, None)),
+        }
+        # 指标名称 -> 芯片标签 -> 图表配置
+        self.per_configs: Dict[str, Dict[str, HardwareConfig]] = {}
+        for metric, (_, suffix, y_range) in self.metrics.items():
+            config = HardwareConfig(y_range=y_range, chart_index=random_index(), chart_name=f"NPU {suffix}")
+            self.per_configs[metric] = {}
+            for npu_id in npu_map:
+                for chip_id in npu_map[npu_id]:
+                    metric_name = self.get_label(npu_id, chip_id)[1]
+                    self.per_configs[metric][metric_name] = config.clone(metric_name=metric_name)
 
     def collect(self) -> HardwareInfoList:
+        # 每次采集只执行一次 npu-smi info，所有芯片的指标从同一张表格中解析
+        self.cli.clear()
+        table = parse_npu_smi_info(self.cli.run("npu-smi", "info"))
         result: HardwareInfoList = []
         for npu_id in self.npu_map:
             for chip_id in self.npu_map[npu_id]:
-                result.extend(self.get_usage(npu_id, chip_id))
-                result.append(self.get_chip_temp(npu_id, chip_id))
-                result.append(self.get_chip_power(npu_id, chip_id))
+                stats = table.get((npu_id, chip_id))
+                if stats is None:
+                    stats = self.query_chip(npu_id, chip_id)
+                _id, metric_name = self.get_label(npu_id, chip_id)
+                for metric, (key, suffix, _) in self.metrics.items():
+                    result.append(
+                        {
+                            "key": key.format(npu_index=_id),
+                            "name": f"{metric_name} {suffix}",
+                            "value": stats.get(metric, math.nan),
+                            "config": self.per_configs[metric][metric_name],
+                        }
+                    )
         return result
 
-    def get_usage(self, npu_id: str, chip_id: str) -> HardwareInfoList:
-        """
-        获取指定NPU设备的芯片HBM的用量信息和利用率
-        """
-        output = subprocess.run(
-            ["npu-smi", "info", "-t", "usages", "-i", npu_id, "-c", chip_id],
-            capture_output=True,
-            text=True,
-        ).stdout
-        # 格式化获取NPU ID和芯片ID
-        _id, metric_name = self.get_label(npu_id, chip_id)
-        # 获取信息
-        util_info = {
-            "key": self.util_key.format(npu_index=_id),
-            "name": f"{metric_name} Utilization (%)",
-            "value": math.nan,
-            "config": self.per_util_configs[metric_name],
-        }
-        hbm_info = {
-            "key": self.hbm_rate_key.format(npu_index=_id),
-            "name": f"{metric_name} Memory Allocated (%)",
-            "value": math.nan,
-            "config": self.per_hbm_configs[metric_name],
-        }
-        hbm_value_info = {
-            "key": self.hbm_value_key.format(npu_index=_id),
-            "name": f"{metric_name} Memory Allocated (MB)",
-            "value": math.nan,
-            "config": self.per_hbm_value_configs[metric_name],
-        }
-        for line in output.split("\n"):
-            if "aicore usage rate" in line.lower():
-                line = line.split(":")
-                # 利用率的值在最后一个
-                util = line[-1].strip()
-                if util.isdigit():
-                    util_info["value"] = float(util)
-                continue
-
-            if "hbm usage rate" in line.lower():
-                line = line.split(":")
-                # HBM Capacity的值在最后一个
-                hbm = line[-1].strip()
-                if hbm.isdigit():
-                    hbm_info["value"] = float(hbm)
-                    hbm_value_info["value"] = float(hbm) * self.max_hbm_value * 0.01
-                continue
-        return [util_info, hbm_info, hbm_value_info]
-
-    def get_chip_temp(self, npu_id: str, chip_id: str) -> HardwareInfo:
+    def query_chip(self, npu_id: str, chip_id: str) -> ChipStats:
         """
-        获取芯片温度
+        表格中没有此芯片时（例如未知的表格格式），逐项查询芯片信息
         """
-        output = subprocess.run(
-            ["npu-smi", "info", "-t", "temp", "-i", npu_id, "-c", chip_id],
-            capture_output=True,
-            text=True,
-        ).stdout.strip()
-        temp = float(output.split(":")[-1].strip())
-        _id, metric_name = self.get_label(npu_id, chip_id)
-        return {
-            "key": self.temp_key.format(npu_index=_id),
-            "name": f"{metric_name} Temperature (℃)",
-            "value": temp,
-            "config": self.per_temp_configs[metric_name],
-        }
-
-    def get_chip_power(self, npu_id: str, chip_id: str) -> HardwareInfo:
-        """
-        获取芯片功耗信息
-        """
-        output = subprocess.run(
-            ["npu-smi", "info", "-t", "power", "-i", npu_id, "-c", chip_id],
-            capture_output=True,
-            text=True,
-        ).stdout.strip()
-        power = float(output.split(":")[-1].strip())
-        _id, metric_name = self.get_label(npu_id, chip_id)
-        return {
-            "key": self.power_key.format(npu_index=_id),
-            "name": f"{metric_name} Power Usage (W)",
-            "value": power,
-            "config": self.per_power_config[metric_name],
-        }
+        stats = parse_chip_usages(self.cli.run("npu-smi", "info", "-t", "usages", "-i", npu_id, "-c", chip_id))
+        if "hbm_rate" in stats:
+            stats["hbm_value"] = stats["hbm_rate"] * self.max_hbm_value * 0.01
+        stats["temp"] = parse_chip_value(self.cli.run("npu-smi", "info", "-t", "temp", "-i", npu_id, "-c", chip_id))
+        stats["power"] = parse_chip_value(self.cli.run("npu-smi", "info", "-t", "power", "-i", npu_id, "-c", chip_id))
+        return stats
 
     @staticmethod
     def get_label(npu_id: str, chip_id: str):
@@ -0,0 +1,75 @@
+"""
+@author: cunyue
+@file: process.py
+@time: 2025/7/15 10:10
+@description: 训练进程树
+用于将 GPU 等设备上的进程级用量归属到训练进程，包括训练进程本身与它的所有子进程（DataLoader worker、DDP 子进程等）
+"""
+
+import os
+import time
+from typing import Dict, Optional, Set
+
+import psutil
+
+_root_pid = os.getpid()
+
+
+def get_root_pid() -> int:
+    """
+    获取训练进程的 PID，默认为当前进程
+    """
+    return _root_pid
+
+
+def set_root_pid(pid: int):
+    """
+    设置训练进程的 PID，在监控子进程中设置为父进程
+    """
+    global _root_pid
+    _root_pid = pid
+
+
+class ProcessTree:
+    """
+    训练进程树的 PID 集合
+    遍历进程树需要读取系统中所有进程的信息（psutil 通过扫描所有进程的父进程建立进程树），
+    因此缓存结果，每 refresh_interval 秒刷新一次
+    刷新时已知且仍在运行的进程沿用原来的 psutil.Process 对象，通过创建时间识别 PID 复用
+    """
+
+    def __init__(self, root_pid: Optional[int] = None, refresh_interval: float = 10):
+        """
+        :param root_pid: 进程树的根进程，为 None 时使用 get_root_pid
+        :param refresh_interval: 刷新间隔，单位秒
+        """
+        self.root_pid = root_pid or get_root_pid()
+        self.refresh_interval = refresh_interval
+        self._processes: Dict[int, psutil.Process] = {}
+        self._pids: Set[int] = set()
+        self._refreshed: Optional[float] = None
+
+    def refresh(self):
+        try:
+            root = self._processes.get(self.root_pid) or psutil.Process(self.root_pid)
+            children = root.children(recursive=True)
+        except psutil.Error:
+            # 根进程已退出
+            self._processes, self._pids = {}, set()
+            return
+        processes = {self.root_pid: root}
+        for child in children:
+            known = self._processes.get(child.pid)
+            processes[child.pid] = known if known is not None and known.is_running() else child
+        self._processes = processes
+        self._pids = set(processes)
+
+    def pids(self) -> Set[int]:
+        """
+        获取进程树中所有进程的 PID，距离上次刷新超过 refresh_interval 时刷新
+        """
+        now = time.monotonic()
+        if self._refreshed is None or now - self._refreshed >= self.refresh_interval:
+            self.refresh()
+            self._refreshed = now
+        return self._pids
@@ -0,0 +1,140 @@
+"""
+@author: cunyue
+@file: sampler.py
+@time: 2025/7/13 10:30
+@description: 硬件信息高频采样
+硬件信息的上报间隔为 10~60 秒，只在上报时采集一次会错过两次上报之间的变化，例如数据加载阻塞导致的 GPU 利用率骤降
+HardwareSampler 以较高的频率（默认每秒一次）调用采集器，在本地按上报窗口聚合，每个窗口只上报聚合结果：
+1. 平均值使用原来的 key 上报，与未开启高频采样时的图表保持一致
+2. 开启后，最小值、最大值、95 分位数分别上报为 {key}.min、{key}.max、{key}.p95
+   名称与图表名称均加上 [min] 等后缀，图例（metric_name）与颜色与原指标一致
+非数值的采集结果不参与聚合，上报窗口内的最后一个值
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .type import HardwareCollector, HardwareConfig, HardwareInfo, HardwareInfoList
+
+AGGREGATES = ("min", "max", "p95")
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    最近秩法计算分位数
+    :param values: 已排序的数值
+    :param p: 百分位，0~100
+    """
+    rank = max(math.ceil(p / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class HardwareSampler(HardwareCollector):
+    """
+    高频采样聚合器，本身也是一个采集器，每次调用采样一次，上报窗口结束时返回聚合结果，否则返回空列表
+    """
+
+    def __init__(
+        self,
+        collector: HardwareCollector,
+        sample_interval: float,
+        report_interval: Optional[float] = None,
+        aggregates: Sequence[str] = (),
+    ):
+        """
+        :param collector: 被采样的采集器，将被设置为常驻模式
+        :param sample_interval: 采样间隔，单位秒
+        :param report_interval: 上报间隔，单位秒，为 None 时按照上报次数自适应，见 adaptive_interval
+        :param aggregates: 除平均值外额外上报的聚合方式，可选 AGGREGATES 中的值，默认只上报平均值
+        """
+        super().__init__()
+        for aggregate in aggregates:
+            assert aggregate in AGGREGATES, f"Unknown aggregate: {aggregate}"
+        self.aggregates = tuple(aggregates)
+        collector.persistent = True
+        self.collector = collector
+        self.interval = sample_interval
+        # 上报结果只在窗口的最后一次采样中返回，超时会丢失整个窗口，因此超时时间不小于 10 秒
+        self.timeout = collector.timeout or max(sample_interval, 10)
+        self.report_interval = report_interval
+        self.report_num = 0
+        # key -> 窗口内的采样值
+        self._values: Dict[str, List[float]] = {}
+        # key -> 窗口内最后一次采集结果，用于生成聚合结果的名称与配置
+        self._latest: Dict[str, HardwareInfo] = {}
+        # (key, 聚合方式) -> 聚合结果的配置
+        self._configs: Dict[Tuple[str, str], Optional[HardwareConfig]] = {}
+        self._window_start = time.monotonic()
+
+    def __repr__(self):
+        return f"HardwareSampler({self.collector.__class__.__name__})"
+
+    @property
+    def window(self) -> float:
+        if self.report_interval is not None:
+            return self.report_interval
+        # 避免循环引用
+        from swanlab.data.run.helper import adaptive_interval
+
+        return adaptive_interval(self.report_num)
+
+    def _aggregate_config(self, key: str, aggregate: str, config: Optional[HardwareConfig]):
+        cache_key = (key, aggregate)
+        if cache_key not in self._configs:
+            if config is None:
+                self._configs[cache_key] = None
+            else:
+                chart_index = f"{config.chart_index}-{aggregate}" if config.chart_index else None
+                chart_name = f"{config.chart_name} [{aggregate}]" if config.chart_name else None
+                self._configs[cache_key] = config.clone(
+                    chart_name=chart_name,
+                    chart_index=chart_index,
+                    metric_color=config.metric_color,
+                )
+        return self._configs[cache_key]
+
+    def aggregate(self) -> HardwareInfoList:
+        """
+        聚合窗口内的采样值并开始新的窗口
+        """
+        result: HardwareInfoList = []
+        for key, info in self._latest.items():
+            values = self._values.get(key)
+            if not values:
+                result.append(info)
+                continue
+            result.append({**info, "value": sum(values) / len(values)})
+            if not self.aggregates:
+                continue
+            values.sort()
+            stats = {
+                "min": values[0],
+                "max": values[-1],
+                "p95": percentile(values, 95),
+            }
+            for aggregate in self.aggregates:
+                result.append(
+                    {
+                        "key": f"{key}.{aggregate}",
+                        "name": f"{info['name']} [{aggregate}]",
+                        "value": stats[aggregate],
+                        "config": self._aggregate_config(key, aggregate, info["config"]),
+                    }
+                )
+        self._values.clear()
+        self._latest.clear()
+        self.report_num += 1
+        self._window_start = time.monotonic()
+        return result
+
+    def collect(self) -> HardwareInfoList:
+        sample = self.collector()
+        for info in sample or []:
+            key, value = info["key"], info["value"]
+            self._latest[key] = info
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                self._values.setdefault(key, []).append(value)
+        if time.monotonic() - self._window_start < self.window:
+            return []
+        return self.aggregate()
@@ -13,6 +13,7 @@ import psutil
 
 from swanlab.toolkit import is_macos
 from ..type import HardwareFuncResult, HardwareInfoList, HardwareCollector as H
+from ..process import get_root_pid
 from ..utils import CpuBaseCollector as C, MemoryBaseCollector as M
 
 
@@ -47,12 +48,14 @@ def get_apple_chip_info() -> HardwareFuncResult:
 class AppleChipCollector(H, C, M):
     def __init__(self):
         super().__init__()
-        self.current_process = psutil.Process()
+        # 统计训练进程，在监控子进程中不是当前进程
+        self.current_process = psutil.Process(get_root_pid())
 
     def collect(self) -> HardwareInfoList:
+        percents = self.get_cpu_percents()
         return [
-            self.get_cpu_usage(),
-            # *self.get_per_cpu_usage(),
+            self.get_cpu_usage(percents),
+            # *self.get_per_cpu_usage(percents),
             self.get_cur_proc_thds_num(self.current_process),
             self.get_mem_usage(),
             *self.get_cur_proc_mem(self.current_process),
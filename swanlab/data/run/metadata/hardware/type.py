@@ -83,11 +83,19 @@ class CollectGuard:
     这与任务的采集间隔有关，即此类适配了 MonitorCron 的采集间隔
     """
 
+    persistent = False
+    """
+    常驻模式，只在第一次采集前执行一次 before_collect_impl，不执行 after_collect_impl
+    用于高频采样，避免每次采样都重复初始化、释放资源
+    """
+
     def __init__(self):
         self.collect_num = 0
 
     def before_collect(self):
         try:
+            if self.persistent:
+                return self.before_collect_impl() if self.collect_num == 0 else None
             # count=0，执行一次
             if self.collect_num == 0:
                 return self.before_collect_impl()
@@ -100,6 +108,8 @@ class CollectGuard:
             self.collect_num += 1
 
     def after_collect(self):
+        if self.persistent:
+            return
         # 60>count>0, 不执行
         if self.collect_num < 60:
             return
@@ -117,6 +127,19 @@ class CollectGuard:
 
 
 class HardwareCollector(CollectGuard, ABC):
+    sampling = False
+    """
+    是否支持高频采样，开销较小的采集器（例如 NVML、psutil）可以高频采样后在本地聚合，见 HardwareSampler
+    """
+    interval: Optional[float] = None
+    """
+    采集间隔，单位秒，为 None 时使用全局的采集间隔，见 MonitorCron
+    """
+    timeout: Optional[float] = None
+    """
+    采集超时时间，单位秒，超时完成的采集结果会被丢弃，为 None 时等于采集间隔
+    """
+
     @abstractmethod
     def collect(self) -> HardwareInfoList:
         """
@@ -5,7 +5,10 @@
 @description: 硬件信息采集工具函数
 """
 
+import fnmatch
+import os
 import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import psutil
 
@@ -28,6 +31,66 @@ def generate_key(suffix: str) -> str:
     return "__swanlab__." + suffix
 
 
+class DeviceFilter:
+    """
+    按照名称筛选单独上报的设备（磁盘、网卡、RDMA 端口），支持通配符
+    """
+
+    MAX_DEVICES = 32
+    """
+    单独上报的设备数量上限，避免图表过多
+    """
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None):
+        """
+        :param include: 单独上报的设备，为 None 时包含所有设备
+        :param exclude: 不单独上报的设备，优先级高于 include
+        """
+        self.include = None if include is None else list(include)
+        self.exclude = list(exclude or [])
+        self._cache: Dict[str, bool] = {}
+
+    def __call__(self, name: str) -> bool:
+        matched = self._cache.get(name)
+        if matched is None:
+            matched = not any(fnmatch.fnmatchcase(name, p) for p in self.exclude) and (
+                self.include is None or any(fnmatch.fnmatchcase(name, p) for p in self.include)
+            )
+            # 超出数量上限的新设备不再上报
+            if matched and sum(self._cache.values()) >= self.MAX_DEVICES:
+                matched = False
+            self._cache[name] = matched
+        return matched
+
+
+class CounterDelta:
+    """
+    累计计数器的速率计算，一次计算所有设备所有计数器与上一次采集的差值
+    计数器回绕或设备重置时差值按 0 计算，新出现的设备在下一次采集时才有速率
+    """
+
+    def __init__(self):
+        self._last: Dict[str, Sequence[float]] = {}
+        self._last_time: Optional[float] = None
+
+    def __call__(self, counters: Dict[str, Sequence[float]], now: float) -> Dict[str, List[float]]:
+        """
+        :param counters: 设备名称 -> 计数器
+        :param now: 当前时间，单位秒
+        :return: 设备名称 -> 每秒的增量
+        """
+        last, last_time = self._last, self._last_time
+        self._last, self._last_time = counters, now
+        if last_time is None or now <= last_time:
+            return {}
+        elapsed = now - last_time
+        return {
+            name: [max(c - p, 0) / elapsed for c, p in zip(values, last[name])]
+            for name, values in counters.items()
+            if name in last
+        }
+
+
 # CPU 使用率
 CPU_PCT_KEY = generate_key("cpu.pct")
 CPU_PCT_CONFIG = HardwareConfig(
@@ -52,33 +115,85 @@ CPU_THDS_CONFIG = HardwareConfig(
 ).clone()
 
 
+PROC_STAT = "/proc/stat"
+
+
+def read_cpu_times() -> List[Tuple[float, float]]:
+    """
+    读取 CPU 的累计时间，只读取一次，同时得到所有核心的汇总值与每个核心的值
+    :return: [(忙碌时间, 总时间)]，第一项为所有核心的汇总值，之后依次为每个核心的值
+    """
+    if os.path.exists(PROC_STAT):
+        result = []
+        with open(PROC_STAT, "r") as f:
+            for line in f:
+                if not line.startswith("cpu"):
+                    break
+                # user nice system idle iowait irq softirq steal，guest 与 guest_nice 已经计入 user 与 nice
+                fields = [float(v) for v in line.split()[1:9]]
+                total = sum(fields)
+                result.append((total - fields[3] - (fields[4] if len(fields) > 4 else 0), total))
+        return result
+    result = []
+    for times in [psutil.cpu_times()] + psutil.cpu_times(percpu=True):
+        total = sum(times)
+        result.append((total - times.idle - getattr(times, "iowait", 0), total))
+    return result
+
+
 class CpuBaseCollector:
     """
     cpu采集基类，为子类赋予cpu采集的能力
+    CPU 使用率为与上一次采集之间的差值，不会阻塞采集线程；第一次采集没有可以比较的值，不上报使用率
+    每次采集调用一次 get_cpu_percents，汇总值与每个核心的使用率都由这一次读取计算
     """
 
     __per_cpu_configs = []
 
+    # 上一次采集的 CPU 累计时间
+    _last_cpu_times: Optional[List[Tuple[float, float]]] = None
+
+    def get_cpu_percents(self) -> Optional[List[float]]:
+        """
+        读取一次 CPU 累计时间，计算与上一次采集之间的 CPU 使用率
+        :return: 第一项为所有核心的使用率，之后依次为每个核心的使用率；第一次采集或核心数量变化时返回 None
+        """
+        current = read_cpu_times()
+        last, self._last_cpu_times = self._last_cpu_times, current
+        if last is None or len(last) != len(current):
+            return None
+        percents = []
+        for (busy, total), (last_busy, last_total) in zip(current, last):
+            percent = (busy - last_busy) / (total - last_total) * 100 if total > last_total else 0.0
+            percents.append(round(min(max(percent, 0.0), 100.0), 1))
+        return percents
+
     @staticmethod
-    def get_cpu_usage() -> HardwareInfo:
+    def get_cpu_usage(percents: Optional[List[float]]) -> Optional[HardwareInfo]:
         """
         获取当前 CPU 使用率
+        :param percents: get_cpu_percents 的结果
         """
+        if not percents:
+            return None
         return {
             "key": CPU_PCT_KEY,
             "name": "CPU Utilization (%)",
-            "value": psutil.cpu_percent(interval=1),
+            "value": percents[0],
             "config": CPU_PCT_CONFIG,
         }
 
     @staticmethod
-    def get_per_cpu_usage() -> HardwareInfoList:
+    def get_per_cpu_usage(percents: Optional[List[float]]) -> HardwareInfoList:
         """
         获取每个 CPU 核心的使用率
+        :param percents: get_cpu_percents 的结果
         """
-        per_cpu_usages = psutil.cpu_percent(interval=1, percpu=True)
+        if not percents:
+            return []
+        per_cpu_usages = percents[1:]
         result: HardwareInfoList = []
-        for idx, value in enumerate(per_cpu_usages):
+        for idx, value in enumerate(per_cpu_usages[: len(CPU_INDEX_PER_CONFIGS)]):
             info: HardwareInfo = {
                 "key": CPU_INDEX_PER_KEY.format(idx=idx),
                 "name": f"CPU {idx} Utilization (%)",
@@ -3,25 +3,134 @@
 @file: requirements.py
 @time: 2024/11/18 15:48
 @description: 依赖包信息采集
+依赖列表通过 importlib.metadata 在进程内生成，格式与 pip list --format=freeze 一致，不再启动 pip、uv 子进程
+生成结果缓存在 swanlab 全局文件夹中，缓存以解释器路径与各个 site-packages 目录的路径、修改时间为键
+安装、卸载、升级依赖都会增删 site-packages 下的 dist-info 目录，从而改变目录的修改时间，使缓存失效
+每次生成新的缓存后只保留最近的 MAX_CACHE_FILES 个缓存文件
 """
 
+import hashlib
+import json
+import os
 import subprocess
+import sys
+from importlib import metadata as importlib_metadata
+from typing import Optional
+
+from swanlab.env import get_save_dir
+from swanlab.log import swanlog
+
+CACHE_FOLDER = "requirements"
+"""
+依赖列表缓存所在的文件夹，位于 swanlab 全局文件夹下
+"""
+
+MAX_CACHE_FILES = 8
+"""
+保留的缓存文件数量，每次安装依赖都会生成新的缓存，超出的旧缓存被删除
+"""
+
+
+def get_site_dirs():
+    """
+    获取 sys.path 中安装依赖包的目录
+    只有这些目录参与缓存键的计算，脚本所在目录等其他路径的修改时间经常变化，不参与计算
+    """
+    return [p for p in sys.path if os.path.basename(p) in ("site-packages", "dist-packages") and os.path.isdir(p)]
+
+
+def get_cache_key() -> str:
+    """
+    计算当前环境的缓存键
+    """
+    site_dirs = [(p, os.stat(p).st_mtime_ns) for p in get_site_dirs()]
+    key = json.dumps([sys.executable, site_dirs])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def prune_cache(cache_dir: str, keep: int = MAX_CACHE_FILES):
+    """
+    删除旧的缓存文件，只保留修改时间最新的 keep 个
+    """
+    files = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".txt"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            files.append((os.stat(path).st_mtime_ns, path))
+        except OSError:
+            # 已被其他进程删除
+            pass
+    for _, path in sorted(files, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def freeze() -> str:
+    """
+    在进程内生成依赖列表，与 pip 一致，同名的包以 sys.path 中靠前的为准，按名称排序
+    """
+    packages = {}
+    for dist in importlib_metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name:
+            continue
+        # 包名不区分大小写，且 -、_、. 等价
+        normalized = name.lower().replace("_", "-").replace(".", "-")
+        if normalized not in packages:
+            packages[normalized] = f"{name}=={dist.version}"
+    return "".join(f"{packages[k]}\n" for k in sorted(packages))
+
+
+def get_cached_requirements(cache_dir: str = None) -> Optional[str]:
+    """
+    获取依赖列表，优先读取缓存，缓存不存在时生成并写入缓存
+    :param cache_dir: 缓存文件夹，为 None 时使用 swanlab 全局文件夹下的 requirements 文件夹
+    """
+    path = None
+    try:
+        cache_dir = cache_dir or os.path.join(get_save_dir(), CACHE_FOLDER)
+        path = os.path.join(cache_dir, f"{get_cache_key()}.txt")
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        pass
+    requirements = freeze()
+    if path is None:
+        return requirements
+    # 先写入临时文件再替换，避免多个进程同时写入时读到不完整的缓存
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(requirements)
+        os.replace(tmp, path)
+        prune_cache(cache_dir)
+    except OSError as e:
+        swanlog.debug(f"Failed to cache requirements: {e}")
+    return requirements
 
 
 def get_requirements():
     """获取当前环境依赖"""
-    try:
-        # 运行pixi命令获取当前环境下的环境目录
-        result = subprocess.run(["pixi", "list"], capture_output=True, text=True, timeout=0.5)
-        if result.returncode == 0:
-            return result.stdout
+    # pixi 环境中同时包含 conda 包，使用 pixi 命令获取
+    if os.getenv("PIXI_PROJECT_ROOT"):
+        try:
+            result = subprocess.run(["pixi", "list"], capture_output=True, text=True, timeout=5)
+            if result.returncode == 0:
+                return result.stdout
+        except (OSError, subprocess.SubprocessError):
+            pass
 
-        # 运行uv命令获取当前环境下的环境目录
-        result = subprocess.run(["uv", "pip", "list", "--format=freeze"], capture_output=True, text=True, timeout=0.5)
-        if result.returncode == 0:
-            return result.stdout
-    except (FileNotFoundError, PermissionError):
-        pass
+    try:
+        requirements = get_cached_requirements()
+        if requirements:
+            return requirements
+    except Exception as e:  # noqa: 捕获所有异常，避免因环境问题导致程序崩溃
+        swanlog.debug(f"Failed to collect requirements in process: {e}")
 
     try:
         result = subprocess.run(["pip", "list", "--format=freeze"], capture_output=True, text=True, timeout=15)
@@ -13,8 +13,10 @@ import sys
 
 from swanlab.core_python import get_client
 from swanlab.error import KeyFileError
+from swanlab.log import swanlog
 from swanlab.package import get_key
 from swanlab.swanlab_settings import get_settings
+from .git import find_git_repo, get_git_diff
 
 
 def get_runtime_info():
@@ -84,13 +86,46 @@ def _get_command() -> str:
 
 
 def get_git_info():
-    """获取git信息"""
+    """
+    获取git信息，优先直接读取 .git 目录，读取失败时回退到 git 命令
+    """
+    try:
+        repo = find_git_repo()
+        if repo is None:
+            return {"git_remote": None, "git_info": (None, None)}
+        url = repo.remote_url()
+        return {
+            "git_remote": None if url is None else parse_git_url(url),
+            "git_info": repo.head(),
+        }
+    except Exception as e:  # noqa
+        swanlog.debug(f"Failed to read git repository, fallback to git command: {e}")
     return {
         "git_remote": get_remote_url(),
         "git_info": get_git_branch_and_commit(),
     }
 
 
+def get_git_diff_info():
+    """
+    获取git工作区的修改状态与diff，需要启动 git diff 子进程，在实验初始化之后异步采集
+    """
+    settings = get_settings()
+    if not settings.metadata_collect or not settings.collect_runtime or not settings.git_diff_collect:
+        return {}
+    try:
+        repo = find_git_repo()
+        if repo is None or repo.work_tree is None:
+            return {}
+        diff, truncated = get_git_diff(repo.work_tree, settings.git_diff_max_size * 1024)
+    except Exception as e:  # noqa
+        swanlog.debug(f"Failed to get git diff: {e}")
+        return {}
+    if diff is None:
+        return {}
+    return {"git_dirty": len(diff) > 0, "git_diff": diff, "git_diff_truncated": truncated}
+
+
 def get_os_pretty_name():
     """获取操作系统pretty name"""
     try:
@@ -0,0 +1,32 @@
+"""
+@author: cunyue
+@file: monitor.py
+@time: 2025/7/17 15:00
+@description: 硬件监控子进程入口，由 swanlab.data.run.helper.MonitorProcess 通过 python -m 启动
+父进程通过 stdin 发送 pickle 序列化的 (配置, 采集任务工厂函数, 训练进程 PID)，之后发送 None 或关闭 stdin 表示停止
+子进程通过 stdout 发送采集结果，其他写入 stdout 的内容被重定向到 stderr，避免破坏数据流
+"""
+
+import os
+import pickle
+import sys
+
+
+def main():
+    # 采集结果独占原来的 stdout
+    stdout = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    stdin = sys.stdin.buffer
+    try:
+        settings, factory, root_pid = pickle.load(stdin)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return
+    # 避免循环引用
+    from swanlab.data.run.helper import run_monitor_process
+
+    run_monitor_process(stdin, stdout, settings, factory, root_pid)
+
+
+if __name__ == "__main__":
+    main()
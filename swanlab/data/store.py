@@ -0,0 +1,167 @@
+"""
+@author: cunyue
+@file: store.py
+@time: 2025/7/9 10:15
+@description: 本地模式下标量指标的列式存储
+JSON 分片日志便于 swanboard 读取，但是写入和读取都需要逐行编解码，长时间训练时加载一张图表需要解析数百万行 JSON
+因此标量指标同时以列式格式追加写入到该列的目录下，每一列为一个定长小端序数组文件：
+1. scalar.step：步数，int64
+2. scalar.value：指标值，float64
+3. scalar.time：创建时间的 Unix 时间戳（秒），float64
+三个文件的第 i 个元素组成第 i 个数据点，读取时以最短的文件为准，忽略未写入完整的数据点
+文件没有文件头，可以直接使用 np.memmap 映射读取
+"""
+
+import json
+import os
+import sys
+from array import array
+from datetime import datetime
+from typing import NamedTuple, Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STEP_FILE = "scalar.step"
+VALUE_FILE = "scalar.value"
+TIME_FILE = "scalar.time"
+
+# 文件名 -> (array 类型码, numpy 数据类型)
+COLUMNS = {
+    STEP_FILE: ("q", "<i8"),
+    VALUE_FILE: ("d", "<f8"),
+    TIME_FILE: ("d", "<f8"),
+}
+ITEM_SIZE = 8
+# 标量指标数据中用于表示 NaN 与无穷大的字符串，见 swanlab.data.modules.line
+SPECIAL_VALUES = ("NaN", "INF")
+
+
+class ScalarColumns(NamedTuple):
+    """
+    一个标量指标的全部数据点，安装了 numpy 时为 np.memmap（只读），否则为 array
+    """
+
+    steps: Any
+    values: Any
+    timestamps: Any
+
+    def __len__(self):
+        return len(self.steps)
+
+
+class ScalarBuffer:
+    """
+    标量数据点的写入缓冲区，调用 dump 后以字节的形式取出
+    """
+
+    def __init__(self):
+        self.steps = array("q")
+        self.values = array("d")
+        self.timestamps = array("d")
+
+    def append(self, metric: dict):
+        """
+        追加一个标量数据点
+        :param metric: 指标数据，格式为 {"index": 步数, "data": 指标值, "create_time": ISO 格式的创建时间}
+            NaN 与无穷大在指标数据中以 "NaN"、"INF" 字符串表示
+        """
+        self.steps.append(metric["index"])
+        self.values.append(float(metric["data"]))
+        self.timestamps.append(datetime.fromisoformat(metric["create_time"]).timestamp())
+
+    def __len__(self):
+        return len(self.steps)
+
+    def dump(self) -> Dict[str, bytes]:
+        """
+        取出所有数据点并清空缓冲区
+        :return: 文件名 -> 需要追加到该文件的字节
+        """
+        data = {}
+        for name, column in ((STEP_FILE, self.steps), (VALUE_FILE, self.values), (TIME_FILE, self.timestamps)):
+            if sys.byteorder == "big":
+                column.byteswap()
+            data[name] = column.tobytes()
+        self.steps, self.values, self.timestamps = array("q"), array("d"), array("d")
+        return data
+
+
+def has_scalars(column_dir: str) -> bool:
+    """
+    列目录下是否存在列式标量数据
+    """
+    return all(os.path.exists(os.path.join(column_dir, name)) for name in COLUMNS)
+
+
+def read_scalars(column_dir: str) -> ScalarColumns:
+    """
+    读取列目录下的列式标量数据
+    :param column_dir: 列目录，即 logs/{kid}
+    :raises FileNotFoundError: 不存在列式标量数据，可以先调用 convert_scalars 从分片日志转换
+    """
+    if not has_scalars(column_dir):
+        raise FileNotFoundError(f"Scalar store not found in {column_dir}")
+    paths = {name: os.path.join(column_dir, name) for name in COLUMNS}
+    count = min(os.stat(path).st_size for path in paths.values()) // ITEM_SIZE
+    columns = []
+    for name, (typecode, dtype) in COLUMNS.items():
+        if np is not None:
+            # 空文件无法映射
+            column = np.memmap(paths[name], dtype=dtype, mode="r", shape=(count,)) if count else np.empty(0, dtype)
+        else:
+            column = array(typecode)
+            with open(paths[name], "rb") as f:
+                column.fromfile(f, count)
+            if sys.byteorder == "big":
+                column.byteswap()
+        columns.append(column)
+    return ScalarColumns(*columns)
+
+
+def _read_slices(column_dir: str) -> Optional[List[dict]]:
+    """
+    按顺序读取列目录下的分片日志，如果不是标量指标返回 None
+    """
+    slices = [name for name in os.listdir(column_dir) if name.endswith(".log") and name[:-4].isdigit()]
+    metrics = []
+    for name in sorted(slices, key=lambda n: int(n[:-4])):
+        with open(os.path.join(column_dir, name), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                metric = json.loads(line)
+                data = metric["data"]
+                if isinstance(data, bool) or not (isinstance(data, (int, float)) or data in SPECIAL_VALUES):
+                    return None
+                metrics.append(metric)
+    return metrics
+
+
+def convert_scalars(log_dir: str) -> List[str]:
+    """
+    将已有实验的标量分片日志转换为列式存储，已经存在列式数据的列会被跳过
+    :param log_dir: 实验的指标目录，即 {run_dir}/logs
+    :return: 转换的列目录列表
+    """
+    converted = []
+    for kid in sorted(os.listdir(log_dir)):
+        column_dir = os.path.join(log_dir, kid)
+        if not os.path.isdir(column_dir) or has_scalars(column_dir):
+            continue
+        metrics = _read_slices(column_dir)
+        if not metrics:
+            continue
+        buffer = ScalarBuffer()
+        for metric in metrics:
+            buffer.append(metric)
+        # 先写入临时文件再替换，避免转换中断时留下不完整的数据
+        for name, data in buffer.dump().items():
+            path = os.path.join(column_dir, name)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        converted.append(column_dir)
+    return converted
@@ -15,4 +15,7 @@ start_proxy = swanlog.start_proxy
 
 reset = swanlog.reset
 
-__all__ = ["start_proxy", "reset", "swanlog"]
+# 依赖 swanlog，必须在 swanlog 创建之后导入
+from .handler import SwanLabLoggingHandler
+
+__all__ = ["start_proxy", "reset", "swanlog", "SwanLabLoggingHandler"]
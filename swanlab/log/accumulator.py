@@ -0,0 +1,91 @@
+"""
+@author: cunyue
+@file: accumulator.py
+@time: 2025/7/11 10:20
+@description: 终端日志累积器
+部分第三方库每秒会输出数千行日志，如果每一行都立即写入文件、放入上传队列，处理终端输出的开销会远大于训练本身
+累积器将同一类型的日志合并为一个 LogData，满足以下任一条件时才交给处理函数：
+1. 累积的行数达到上限
+2. 距离第一行日志被累积的时间超过最大延迟，由后台线程定期检查，保证输出停止后日志也能及时写入
+3. 手动调用 flush 或 close
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .type import LogHandler, LogData, LogType, LogLevel
+
+
+class LogAccumulator:
+    """
+    终端日志累积器，本身也是一个 LogHandler，线程安全
+    """
+
+    MAX_LINES = 1000
+    """
+    单次交给处理函数的最大行数
+    """
+
+    def __init__(self, handler: LogHandler, max_latency: float = 1):
+        """
+        :param handler: 日志处理函数
+        :param max_latency: 日志被累积的最长时间，单位秒，为 0 时不累积，直接交给处理函数
+        """
+        self.handler = handler
+        self.max_latency = max_latency
+        # 处理函数中可能再次输出日志（例如打印警告），因此使用可重入锁
+        self._lock = threading.RLock()
+        # (日志类型, 日志级别) -> 累积的日志，按照第一次累积的顺序排列
+        self._buffers: Dict[Tuple[LogType, Optional[LogLevel]], LogData] = {}
+        # 第一行日志被累积的时间
+        self._since: Optional[float] = None
+        self._closed = max_latency <= 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if not self._closed:
+            self._thread = threading.Thread(target=self._loop, name="SwanLabLogAccumulator", daemon=True)
+            self._thread.start()
+
+    def __call__(self, log_data: LogData):
+        if self._closed:
+            return self.handler(log_data)
+        key = (log_data['type'], log_data.get('level'))
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = LogData(type=log_data['type'], contents=[])
+                if key[1] is not None:
+                    buffer['level'] = key[1]
+            buffer['contents'].extend(log_data['contents'])
+            if self._since is None:
+                self._since = time.monotonic()
+            if len(buffer['contents']) >= self.MAX_LINES:
+                self.flush()
+
+    def flush(self):
+        """
+        将累积的日志交给处理函数
+        """
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            self._since = None
+            for log_data in buffers.values():
+                self.handler(log_data)
+
+    def _loop(self):
+        while not self._stop.wait(self.max_latency / 2):
+            with self._lock:
+                if self._since is not None and time.monotonic() - self._since >= self.max_latency:
+                    self.flush()
+
+    def close(self):
+        """
+        交出剩余的日志并停止后台线程，此后的日志直接交给处理函数
+        """
+        with self._lock:
+            self._closed = True
+            self.flush()
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
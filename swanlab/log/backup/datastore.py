@@ -11,6 +11,7 @@ DataStore 大致代码借鉴自 W&B
 
 import os
 import struct
+import time
 import zlib
 from typing import Optional, Any, IO, Tuple
 
@@ -40,15 +41,45 @@ def bytestostr(x):
     return str(x, 'utf-8')
 
 
+class IncompleteRecordError(Exception):
+    """
+    文件末尾的记录尚未完整写入，常见于读取正在写入的备份文件
+    """
+
+    pass
+
+
+class CorruptRecordError(Exception):
+    """
+    记录校验失败，数据已损坏
+    """
+
+    def __init__(self, message: str, orphan: bool = False, dtype: Optional[int] = None):
+        """
+        :param message: 错误信息
+        :param orphan: 是否为孤立的分片，即读取到了一个不以起始分片开头的记录，常见于跳过损坏数据后
+        :param dtype: 孤立分片的类型
+        """
+        super().__init__(message)
+        self.orphan = orphan
+        self.dtype = dtype
+
+
 class DataStore:
 
-    def __init__(self):
+    def __init__(self, flush_interval: Optional[float] = None):
+        """
+        :param flush_interval: 写入模式下的最长刷写间隔，单位秒，为 None 时由文件缓冲区决定刷写时机
+            设置后其他进程（例如 swanlab sync --follow）能够及时读取到新写入的记录
+        """
         self._filename: Optional[str] = None
         self._fp: Optional[IO[Any]] = None
         # 当前文件的偏移量
         self._index: int = 0
         # 当前文件的已刷写偏移量
         self._flush_offset = 0
+        self._flush_interval = flush_interval
+        self._flush_time = time.monotonic()
         # 日志系统预计算并缓存CRC32校验值，缓存每一个数据类型的CRC32值，分别存在各自的索引位置
         self._crc = [0] * (LEVELDBLOG_LAST + 1)
         for x in range(1, LEVELDBLOG_LAST + 1):
@@ -58,12 +89,25 @@ class DataStore:
         self._opened_for_scan = False
         # 当前文件大小（仅在扫描模式下有效）
         self._size_bytes: int = 0
+        # 是否以恢复模式扫描，恢复模式下遇到损坏的数据会跳转到下一个数据块继续扫描
+        self._recover = False
+        # 当前正在扫描的分片的起始偏移量，用于在恢复模式下定位下一个数据块
+        self._fragment_start: int = 0
+        # 恢复模式下丢失的记录数（估计值）与字节数
+        self.lost_records: int = 0
+        self.lost_bytes: int = 0
 
     # ---------------------------------- 读取 ----------------------------------
 
-    def open_for_scan(self, filename: str):
+    def open_for_scan(self, filename: str, recover: bool = False):
+        """
+        以扫描模式打开文件
+        :param filename: 文件路径
+        :param recover: 是否以恢复模式扫描，遇到损坏的数据时跳过并记录丢失的记录数与字节数，而不是抛出异常
+        """
         self._filename = filename
-        self._fp = open(filename, "r+b")
+        self._recover = recover
+        self._fp = open(filename, "rb")
         self._index = 0
         self._size_bytes = os.stat(filename).st_size
         self._opened_for_scan = True
@@ -90,19 +134,26 @@ class DataStore:
         扫描一条记录
         """
         assert self._opened_for_scan, "file not open for scanning"
+        self._fragment_start = self._index
         # 1. 读取数据头
         header = self._fp.read(LEVELDBLOG_HEADER_LEN)
         if len(header) == 0:
             return None
-        assert (
-            len(header) == LEVELDBLOG_HEADER_LEN
-        ), f"record header is {len(header)} bytes instead of the expected {LEVELDBLOG_HEADER_LEN}"
+        if len(header) < LEVELDBLOG_HEADER_LEN:
+            raise IncompleteRecordError(
+                f"record header is {len(header)} bytes instead of the expected {LEVELDBLOG_HEADER_LEN}"
+            )
         # 2. 解析数据头并校验数据完整性
         checksum, data_length, data_type = struct.unpack("<IHB", header)
+        if not LEVELDBLOG_FULL <= data_type <= LEVELDBLOG_LAST:
+            raise CorruptRecordError(f"invalid record type {data_type}, data may be corrupt")
         self._index += LEVELDBLOG_HEADER_LEN
         data = self._fp.read(data_length)
+        if len(data) < data_length:
+            raise IncompleteRecordError(f"record data is {len(data)} bytes instead of the expected {data_length}")
         checksum_computed = zlib.crc32(data, self._crc[data_type]) & 0xFFFFFFFF
-        assert checksum == checksum_computed, "record checksum is invalid, data may be corrupt"
+        if checksum != checksum_computed:
+            raise CorruptRecordError("record checksum is invalid, data may be corrupt")
         self._index += data_length
         # 3. 返回数据
         return int(data_type), data
@@ -111,14 +162,23 @@ class DataStore:
         """
         扫描日志文件，返回一条记录
         """
+        if self._recover:
+            return self._scan_recover()
+        return self._scan()
+
+    def _scan(self) -> Optional[str]:
         # 1. 一次读取一条记录，如果剩余空间不足存储数据头，校验并跳过，此为写入的逆操作
         offset = self._index % LEVELDBLOG_BLOCK_LEN
         space_left = LEVELDBLOG_BLOCK_LEN - offset
         if space_left < LEVELDBLOG_HEADER_LEN:
+            self._fragment_start = self._index
             pad_check = strtobytes("\x00" * space_left)
             pad = self._fp.read(space_left)
+            if len(pad) < space_left:
+                raise IncompleteRecordError(f"padding is {len(pad)} bytes instead of the expected {space_left}")
             # 校验必须为0
-            assert pad == pad_check, "invalid padding"
+            if pad != pad_check:
+                raise CorruptRecordError("invalid padding")
             self._index += space_left
         # 2. 扫描一条记录
         record = self._scan_record()
@@ -128,19 +188,65 @@ class DataStore:
         if dtype == LEVELDBLOG_FULL:
             return bytestostr(data)
         # 3. 如果是第一条记录，则继续扫描直到找到最后一条记录
-        assert dtype == LEVELDBLOG_FIRST, f"expected record to be type {LEVELDBLOG_FIRST} but found {dtype}"
+        if dtype != LEVELDBLOG_FIRST:
+            raise CorruptRecordError(
+                f"expected record to be type {LEVELDBLOG_FIRST} but found {dtype}", orphan=True, dtype=dtype
+            )
         while True:
             record = self._scan_record()
             if record is None:  # eof
-                return None
+                raise IncompleteRecordError(f"expected record to be type {LEVELDBLOG_LAST} but reached end of file")
             dtype, new_data = record
             if dtype == LEVELDBLOG_LAST:
                 data += new_data
                 break
-            assert dtype == LEVELDBLOG_MIDDLE, f"expected record to be type {LEVELDBLOG_MIDDLE} but found {dtype}"
+            if dtype != LEVELDBLOG_MIDDLE:
+                raise CorruptRecordError(f"expected record to be type {LEVELDBLOG_MIDDLE} but found {dtype}")
             data += new_data
         return bytestostr(data)
 
+    def _scan_recover(self) -> Optional[str]:
+        """
+        以恢复模式扫描一条记录，遇到损坏的数据时跳转到下一个数据块的起始位置重新同步
+        分片不会跨越数据块边界，每个数据块都以一个分片的数据头开始，因此可以从下一个数据块继续扫描
+        重新同步后读取到的中间、末尾分片属于已经丢失的记录，逐个跳过
+        跳过的数据计入 lost_records 与 lost_bytes，损坏区域内的记录边界无法确定，因此 lost_records 只是一个下限
+        """
+        # 重新同步后第一个孤立的末尾分片视为损坏记录的结尾，不重复计数
+        resynced = False
+        while True:
+            record_start = self._index
+            try:
+                return self._scan()
+            except (CorruptRecordError, IncompleteRecordError) as e:
+                if getattr(e, "orphan", False):
+                    # 孤立的分片本身校验通过，只需跳过该分片
+                    self.lost_bytes += self._index - record_start
+                    if e.dtype == LEVELDBLOG_LAST:
+                        self.lost_records += 0 if resynced else 1
+                        resynced = False
+                    continue
+                resynced = True
+                size = os.fstat(self._fp.fileno()).st_size
+                resync = min((self._fragment_start // LEVELDBLOG_BLOCK_LEN + 1) * LEVELDBLOG_BLOCK_LEN, size)
+                self.lost_bytes += resync - record_start
+                self.lost_records += 1
+                self._fp.seek(resync)
+                self._index = resync
+
+    def scan_available(self) -> Optional[str]:
+        """
+        扫描一条已经完整写入的记录，用于读取正在写入的备份文件
+        如果末尾的记录尚未完整写入，回退到该记录的起始位置并返回 None，待写入完成后可以再次扫描
+        """
+        position, index = self._fp.tell(), self._index
+        try:
+            return self._scan()
+        except IncompleteRecordError:
+            self._fp.seek(position)
+            self._index = index
+            return None
+
     def __iter__(self):
         """
         实现迭代器接口，允许使用 for 循环遍历日志文件，仅在文件已打开并且处于扫描模式时有效
@@ -231,13 +337,25 @@ class DataStore:
             self._fp.flush()
             os.fsync(self._fp.fileno())
             self._flush_offset = self._index
+            self._flush_time = time.monotonic()
+        # 5. 距离上次刷写超过刷写间隔，刷写到文件
+        if self._flush_interval is not None and time.monotonic() - self._flush_time >= self._flush_interval:
+            self.ensure_flushed()
 
         return start_offset, self._index, self._flush_offset
 
     # ---------------------------------- 辅助函数 ----------------------------------
 
+    @property
+    def offset(self) -> int:
+        """
+        当前文件的偏移量，写入模式下即为已写入的字节数
+        """
+        return self._index
+
     def ensure_flushed(self) -> None:
         self._fp.flush()
+        self._flush_time = time.monotonic()
 
     def close(self):
         # 关闭文件句柄
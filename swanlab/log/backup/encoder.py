@@ -0,0 +1,68 @@
+"""
+@author: cunyue
+@file: encoder.py
+@time: 2025/7/8 11:02
+@description: 高频备份记录的快速编码器
+标量、媒体与终端日志在训练过程中会被频繁写入，逐条构建 pydantic 模型并校验的开销较大，会导致备份线程积压
+这里直接从 MetricInfo、LogData 拼接 JSON 字符串，输出与对应模型的 to_record 完全一致，可以被 BaseModel.from_record 解析
+头部、项目、运行时等低频记录依旧使用 pydantic 模型
+"""
+
+import json
+from typing import List, Optional
+
+from swanlab.log.type import LogData, get_log_level
+from swanlab.toolkit import MetricInfo
+
+# 预先创建编码器，避免 json.dumps 每次调用都重新创建
+# 指标数据由 swanlab 自身生成，不存在循环引用，因此关闭循环引用检查
+_encode = json.JSONEncoder(ensure_ascii=False, check_circular=False).encode
+
+_SCALAR_TEMPLATE = '{"model_type": "Scalar", "data": {"metric": %s, "key": %s, "step": %d, "epoch": %d}}\n'
+_MEDIA_TEMPLATE = (
+    '{"model_type": "Media", "data": {"metric": %s, "key": %s, "kid": %d, "key_encoded": %s, '
+    '"step": %d, "epoch": %d, "buffers_name": %s}}\n'
+)
+_LOG_TEMPLATE = '{"model_type": "Log", "data": {"create_time": %s, "message": %s, "epoch": %s, "level": "%s"}}\n'
+
+
+def encode_metric(metric_info: MetricInfo) -> Optional[str]:
+    """
+    将指标信息编码为备份记录，与 Metric.from_metric_info(metric_info).to_record() 的结果一致
+    有错误的指标没有数据，不需要备份，返回 None
+    """
+    if metric_info.is_error:
+        return None
+    column_info = metric_info.column_info
+    # 标量类型
+    if column_info.chart_type == column_info.chart_type.LINE:
+        return _SCALAR_TEMPLATE % (
+            _encode(metric_info.metric),
+            _encode(column_info.key),
+            metric_info.metric_step,
+            metric_info.metric_epoch,
+        )
+    # 媒体类型
+    buffers_name = None
+    if metric_info.metric_buffers is not None and len(metric_info.metric["data"]):
+        buffers_name = list(metric_info.metric["data"])
+    return _MEDIA_TEMPLATE % (
+        _encode(metric_info.metric),
+        _encode(column_info.key),
+        int(column_info.kid),
+        _encode(column_info.key_encode),
+        metric_info.metric_step,
+        metric_info.metric_epoch,
+        _encode(buffers_name),
+    )
+
+
+def encode_logs(log_data: LogData) -> List[str]:
+    """
+    将终端输出编码为备份记录，与 Log.from_log_data(log_data) 中每个模型的 to_record() 结果一致
+    """
+    level = get_log_level(log_data)
+    return [
+        _LOG_TEMPLATE % (_encode(item["create_time"]), _encode(item["message"]), _encode(item.get("epoch")), level)
+        for item in log_data['contents']
+    ]
@@ -6,13 +6,15 @@
 """
 
 import os
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 import wrapt
 
-from swanlab.log.backup.datastore import DataStore
-from swanlab.log.backup.models import Experiment, Log, Project, Column, Runtime, Metric, Header, Footer
+from swanlab.log.backup.encoder import encode_logs, encode_metric
+from swanlab.log.backup.models import Experiment, Log, Project, Column, Runtime, Header, Footer
+from swanlab.log.backup.segment import SegmentedDataStore
 from swanlab.log.backup.writer import write_media_buffer, write_runtime_info
 from swanlab.log.type import LogData
 from swanlab.toolkit import ColumnInfo, MetricInfo, RuntimeInfo, create_time
@@ -64,8 +66,25 @@ class BackupHandler:
     """
 
     BACKUP_FILE = "backup.swanlab"
+    FLUSH_INTERVAL = 1
+    """
+    备份文件的最长刷写间隔，单位秒，保证 swanlab sync --follow 能够及时读取到新的记录
+    写入时超过间隔会立即刷写，此外后台线程每隔此间隔刷写一次，避免写入停止后最后的记录一直留在缓冲区中
+    """
 
-    def __init__(self, enable: bool = True, backup_type: str = "DEFAULT", save_file: bool = True):
+    def __init__(
+        self,
+        enable: bool = True,
+        backup_type: str = "DEFAULT",
+        save_file: bool = True,
+        segment_size: Optional[int] = None,
+    ):
+        """
+        :param enable: 是否启用备份
+        :param backup_type: 备份类型
+        :param save_file: 是否保存运行时文件与媒体文件
+        :param segment_size: 备份文件单个分段的最大字节数，为 None 时不分段
+        """
         super().__init__()
         # 是否启用备份
         self.enable = enable
@@ -73,10 +92,13 @@ class BackupHandler:
         # 线程执行器
         self.executor: Optional[ThreadPoolExecutor] = None
         # 日志文件写入句柄
-        self.f = DataStore()
+        self.f = SegmentedDataStore(segment_size=segment_size, flush_interval=self.FLUSH_INTERVAL)
         # 运行时文件备份目录
         self.files_dir: Optional[str] = None
         self.save_file: bool = save_file
+        # 定时刷写线程
+        self._flush_stop = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
 
         # 动态设置包括项目名在内的一些属性，因为在 on_run 之前句柄还未创建，所以需要先缓存，等执行对应的函数的时候再使用
         self.cache_proj_name = None
@@ -110,6 +132,12 @@ class BackupHandler:
         )
         self.backup_proj()
         self.backup_exp(exp_name, description, tags)
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="SwanLabBackupFlush", daemon=True)
+        self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._flush_stop.wait(self.FLUSH_INTERVAL):
+            self.flush()
 
     @enable_check()
     def stop(self, epoch: int, error: str = None):
@@ -118,7 +146,10 @@ class BackupHandler:
         :param epoch: int, 日志行数
         :param error: str, 如果有错误信息，则在日志中记录
         """
-        # 同步停止
+        # 同步停止，先停止定时刷写，保证此后只有当前线程写入
+        self._flush_stop.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
         self.executor.shutdown(wait=True)
         # 如果有错误信息则在日志中记录
         if error is not None:
@@ -132,14 +163,20 @@ class BackupHandler:
         self.f.close()
         self.f = None
 
+    @async_io()
+    def flush(self):
+        """
+        刷写备份文件，与写入在同一个线程中执行
+        """
+        self.f.ensure_flushed()
+
     @async_io()
     def backup_terminal(self, log_data: LogData):
         """
-        备份终端输出
+        备份终端输出，使用快速编码器而非 pydantic 模型
         """
-        logs = Log.from_log_data(log_data)
-        for log in logs:
-            self.f.write(log.to_record())
+        for record in encode_logs(log_data):
+            self.f.write(record)
 
     @async_io()
     def backup_proj(self):
@@ -183,19 +220,23 @@ class BackupHandler:
         备份运行时信息
         """
         runtime = Runtime.from_runtime_info(runtime_info)
-        self.f.write(runtime.to_record())
+        # 先写入文件再写入记录，保证读取到记录时对应的文件已经存在
         if self.save_file:
             write_runtime_info(self.files_dir, runtime_info)
+        self.f.write(runtime.to_record())
 
     @async_io()
     def backup_metric(self, metric_info: MetricInfo):
         """
-        备份指标信息
+        备份指标信息，指标写入频繁，使用快速编码器而非 pydantic 模型
         """
-        metric = Metric.from_metric_info(metric_info)
-        self.f.write(metric.to_record())
+        record = encode_metric(metric_info)
+        if record is None:
+            return
+        # 先写入媒体文件再写入记录，保证读取到记录时对应的媒体文件已经存在
         if self.save_file:
             write_media_buffer(metric_info)
+        self.f.write(record)
 
 
 def backup(method: str):
@@ -13,7 +13,7 @@ import yaml
 from pydantic import BaseModel as PydanticBaseModel
 
 from swanlab.core_python import FileModel, ScalarModel, ColumnModel, LogModel, MediaModel
-from swanlab.log.type import LogData
+from swanlab.log.type import LogData, get_log_level
 from swanlab.toolkit import ChartReference, MediaBuffer
 from swanlab.toolkit import ColumnInfo, ColumnConfig, RuntimeInfo, MetricInfo, ColumnClass, SectionType, YRange
 
@@ -84,7 +84,7 @@ class Log(BaseModel):
         """
         从 LogData 对象创建 Log 实例
         """
-        level = 'INFO' if log_data['type'] == 'stdout' else 'WARN'
+        level = get_log_level(log_data)
         l = []
         for item in log_data['contents']:
             l.append(
@@ -0,0 +1,47 @@
+"""
+@author: cunyue
+@file: repair.py
+@time: 2025/7/7 10:45
+@description: 备份文件修复，以恢复模式读取损坏的备份文件，将完好的记录重新写入一个干净的备份文件
+"""
+
+import os
+from typing import Tuple
+
+from .datastore import DataStore
+from .segment import SegmentedDataStore, segment_filename, manifest_filename
+
+
+def repair(filename: str, output: str) -> Tuple[int, int, int]:
+    """
+    修复备份文件，所有分段会被合并写入同一个文件
+    :param filename: 待修复的备份文件（第 0 个分段）路径
+    :param output: 修复后的备份文件路径，不能已经存在
+    :return: 保留的记录数、丢失的记录数、丢失的字节数
+    """
+    reader = SegmentedDataStore()
+    reader.open_for_scan(filename, recover=True)
+    writer = DataStore()
+    writer.open_for_write(output)
+    count = 0
+    for record in reader:
+        writer.write(record)
+        count += 1
+    writer.ensure_flushed()
+    writer.close()
+    reader.close()
+    return count, reader.lost_records, reader.lost_bytes
+
+
+def backup_files(filename: str):
+    """
+    列出备份文件对应的所有文件，包括所有分段与清单
+    """
+    files = []
+    index = 0
+    while os.path.exists(segment_filename(filename, index)):
+        files.append(segment_filename(filename, index))
+        index += 1
+    if os.path.exists(manifest_filename(filename)):
+        files.append(manifest_filename(filename))
+    return files
@@ -0,0 +1,233 @@
+"""
+@author: cunyue
+@file: segment.py
+@time: 2025/7/4 15:06
+@description: 分段备份文件
+单个备份文件可能达到数十 GB，不便于拷贝、扫描和部分同步，因此支持按大小切分为多个分段：
+1. 第 0 个分段即为原始的备份文件（backup.swanlab），后续分段在扩展名前插入序号（backup.1.swanlab、backup.2.swanlab...）
+2. 每个分段都是一个完整的 DataStore 文件，记录不会跨分段存储
+3. 清单文件（backup.manifest.json）记录分段的顺序以及每个分段包含的记录范围，在切换分段和关闭时更新
+读取时所有分段被视为一个连续的日志，未开启分段的备份文件同样可以使用 SegmentedDataStore 读取
+"""
+
+import json
+import os
+from typing import Optional, List
+
+from .datastore import DataStore, LEVELDBLOG_HEADER_LEN
+
+MANIFEST_FILE = "backup.manifest.json"
+MANIFEST_VERSION = 0
+
+
+def segment_filename(filename: str, index: int) -> str:
+    """
+    获取第 index 个分段的文件路径
+    :param filename: 第 0 个分段（原始备份文件）的路径
+    :param index: 分段序号
+    """
+    if index == 0:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{index}{ext}"
+
+
+def manifest_filename(filename: str) -> str:
+    """
+    获取清单文件路径，与备份文件位于同一目录
+    """
+    return os.path.join(os.path.dirname(filename), MANIFEST_FILE)
+
+
+def read_manifest(filename: str) -> Optional[dict]:
+    """
+    读取备份文件对应的清单，未开启分段时不存在清单，返回 None
+    """
+    path = manifest_filename(filename)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise Exception(
+            f"Invalid backup manifest version: {manifest.get('version')}, "
+            "please update your swanlab: pip install --upgrade swanlab"
+        )
+    return manifest
+
+
+class SegmentedDataStore:
+    """
+    分段备份文件读写器，接口与 DataStore 保持一致
+    """
+
+    def __init__(self, segment_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        """
+        :param segment_size: 单个分段的最大字节数，超过后切换到下一个分段，为 None 时不分段
+        :param flush_interval: 写入模式下的最长刷写间隔，见 DataStore
+        """
+        self.segment_size = segment_size
+        self._flush_interval = flush_interval
+        self._filename: Optional[str] = None
+        # 当前分段
+        self._store: Optional[DataStore] = None
+        self._segment = 0
+        # 每个分段包含的记录范围，写入模式下用于生成清单
+        self._segments: List[dict] = []
+        # 已经写入或读取的记录总数
+        self._count = 0
+        self._opened_for_write = False
+        # 是否以恢复模式扫描，以及已经扫描完毕的分段中丢失的记录数与字节数
+        self._recover = False
+        self._lost_records = 0
+        self._lost_bytes = 0
+
+    @property
+    def segment(self) -> int:
+        """
+        当前分段序号
+        """
+        return self._segment
+
+    @property
+    def lost_records(self) -> int:
+        """
+        恢复模式下丢失的记录数
+        """
+        return self._lost_records + (self._store.lost_records if self._store else 0)
+
+    @property
+    def lost_bytes(self) -> int:
+        """
+        恢复模式下丢失的字节数
+        """
+        return self._lost_bytes + (self._store.lost_bytes if self._store else 0)
+
+    # ---------------------------------- 读取 ----------------------------------
+
+    def open_for_scan(self, filename: str, recover: bool = False):
+        """
+        打开备份文件用于扫描
+        :param filename: 第 0 个分段（原始备份文件）的路径
+        :param recover: 是否以恢复模式扫描，见 DataStore.open_for_scan
+        """
+        self._filename = filename
+        self._recover = recover
+        manifest = read_manifest(filename)
+        if manifest is not None:
+            # 清单中记录的分段必须全部存在，否则说明备份文件拷贝不完整
+            for segment in manifest["segments"]:
+                path = os.path.join(os.path.dirname(filename), segment["file"])
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Backup segment {segment['file']} listed in {MANIFEST_FILE} not found")
+            self._segments = manifest["segments"]
+        self._open_segment_for_scan(0)
+
+    def _open_segment_for_scan(self, index: int):
+        if self._store is not None:
+            self._lost_records += self._store.lost_records
+            self._lost_bytes += self._store.lost_bytes
+            self._store.close()
+        self._segment = index
+        self._store = DataStore()
+        self._store.open_for_scan(segment_filename(self._filename, index), recover=self._recover)
+
+    def _next_segment_ready(self) -> bool:
+        """
+        下一个分段是否已经创建并写入文件头
+        写入时只有在当前分段关闭后才会创建下一个分段，因此下一个分段存在时当前分段不会再有新的记录
+        """
+        path = segment_filename(self._filename, self._segment + 1)
+        return os.path.exists(path) and os.stat(path).st_size >= LEVELDBLOG_HEADER_LEN
+
+    def scan(self) -> Optional[str]:
+        """
+        扫描一条记录，当前分段读取完毕后自动切换到下一个分段
+        """
+        while True:
+            record = self._store.scan()
+            if record is not None:
+                self._count += 1
+                return record
+            if not self._next_segment_ready():
+                return None
+            self._open_segment_for_scan(self._segment + 1)
+
+    def scan_available(self) -> Optional[str]:
+        """
+        扫描一条已经完整写入的记录，见 DataStore.scan_available
+        """
+        while True:
+            record = self._store.scan_available()
+            if record is not None:
+                self._count += 1
+                return record
+            if not self._next_segment_ready():
+                return None
+            # 下一个分段已经创建，当前分段不会再写入，再次读取确认没有遗漏的记录
+            record = self._store.scan_available()
+            if record is not None:
+                self._count += 1
+                return record
+            self._open_segment_for_scan(self._segment + 1)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        record = self.scan()
+        if record is None:
+            raise StopIteration("End of file reached")
+        return record
+
+    # ---------------------------------- 写入 ----------------------------------
+
+    def open_for_write(self, filename: str):
+        """
+        打开备份文件用于写入
+        :param filename: 第 0 个分段（原始备份文件）的路径
+        """
+        self._filename = filename
+        self._opened_for_write = True
+        self._open_segment_for_write(0)
+
+    def _open_segment_for_write(self, index: int):
+        path = segment_filename(self._filename, index)
+        self._segment = index
+        self._store = DataStore(flush_interval=self._flush_interval)
+        self._store.open_for_write(path)
+        self._segments.append({"file": os.path.basename(path), "start": self._count, "count": 0})
+
+    def write(self, s: str):
+        """
+        写入一条记录，当前分段超过分段大小后切换到下一个分段
+        """
+        result = self._store.write(s)
+        self._count += 1
+        self._segments[-1]["count"] += 1
+        if self.segment_size is not None and self._store.offset >= self.segment_size:
+            self._store.ensure_flushed()
+            self._store.close()
+            self._write_manifest(complete=False)
+            self._open_segment_for_write(self._segment + 1)
+        return result
+
+    def _write_manifest(self, complete: bool):
+        """
+        写入清单文件，先写入临时文件再替换，避免读取到不完整的清单
+        """
+        path = manifest_filename(self._filename)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "complete": complete, "segments": self._segments}, f)
+        os.replace(path + ".tmp", path)
+
+    # ---------------------------------- 辅助函数 ----------------------------------
+
+    def ensure_flushed(self) -> None:
+        self._store.ensure_flushed()
+
+    def close(self):
+        self._store.close()
+        # 只有开启分段的写入需要生成清单
+        if self._opened_for_write and self.segment_size is not None:
+            self._write_manifest(complete=True)
@@ -0,0 +1,56 @@
+"""
+@author: cunyue
+@file: handler.py
+@time: 2025/7/12 15:20
+@description: Python logging 集成
+通过 logging 输出的日志原本经由 StreamHandler 写入标准错误流，再被代理重新分行、清理控制字符、打上时间戳，日志级别全部变为 WARN
+SwanLabLoggingHandler 用于替代 StreamHandler：
+1. 格式化后的日志写入原始的输出流，只输出到终端，不会被代理再次捕获
+2. 日志以结构化的形式直接交给代理处理函数，保留日志级别与 LogRecord 的创建时间
+使用方式：
+    logging.getLogger().addHandler(SwanLabLoggingHandler())
+"""
+
+import logging
+from datetime import datetime, timezone
+
+from swanlab.log import swanlog
+from .type import LogLevel, LogType
+
+
+def record_level(levelno: int) -> LogLevel:
+    """
+    将 logging 日志级别转换为上传的日志级别
+    """
+    if levelno >= logging.ERROR:
+        return 'ERROR'
+    if levelno >= logging.WARNING:
+        return 'WARN'
+    return 'INFO'
+
+
+class SwanLabLoggingHandler(logging.Handler):
+    """
+    将 LogRecord 转发到 SwanLab 的 logging 处理器，未开启实验时只输出到终端
+    """
+
+    def __init__(self, level=logging.NOTSET, echo: bool = True, write_type: LogType = 'stderr'):
+        """
+        :param level: 处理器的日志级别
+        :param echo: 是否同时输出到终端
+        :param write_type: 日志所属的输出流，与 logging.StreamHandler 默认一致，为标准错误流
+        """
+        super().__init__(level)
+        self.echo = echo
+        self.write_type = write_type
+        self.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            message = self.format(record)
+            if self.echo:
+                swanlog.origin_write(self.write_type)(message + '\n')
+            now = datetime.fromtimestamp(record.created, timezone.utc).isoformat()
+            swanlog.emit(self.write_type, message.split('\n'), record_level(record.levelno), now)
+        except Exception:  # noqa
+            self.handleError(record)
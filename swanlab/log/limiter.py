@@ -0,0 +1,182 @@
+"""
+@author: cunyue
+@file: limiter.py
+@time: 2025/7/12 10:40
+@description: 终端日志限流器
+部分任务会成千上万次地输出同一条警告，或者在短时间内输出海量日志，全部写入备份、上传云端的开销没有上限
+限流器在代理处理终端输出时过滤日志（终端本身的输出不受影响）：
+1. 去重：同一输出流中重复的日志只保留第一条，即使中间夹杂着其他日志（例如多个 worker 交替输出的警告）
+   每个输出流保存最近出现过的日志的指纹（哈希值）与被去重的次数，指纹表有上限，超出时淘汰最久未出现的日志
+   被去重的日志以一条 "message repeated N times: <日志>" 提示代替，提示在日志被淘汰、重复持续超过提示间隔或输出流结束时输出
+2. 限速：所有输出流共享两个令牌桶，分别限制每秒的行数与字节数，令牌不足的日志被丢弃
+   令牌恢复后先补充一条提示，说明被丢弃的行数
+3. 实验结束时输出一条统计，记录被去重与被限速丢弃的总行数
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .type import LogType
+
+
+class TokenBucket:
+    """
+    令牌桶，令牌以固定速率恢复，桶的容量为 burst 秒内恢复的令牌数
+    """
+
+    def __init__(self, rate: float, burst: float = 1):
+        """
+        :param rate: 每秒恢复的令牌数
+        :param burst: 允许的突发时长，单位秒
+        """
+        assert rate > 0, "rate must be greater than 0"
+        self.rate = rate
+        self.capacity = rate * burst
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def consume(self, amount: float) -> bool:
+        """
+        消耗令牌，令牌不足时不消耗并返回 False
+        """
+        if amount > self.tokens:
+            return False
+        self.tokens -= amount
+        return True
+
+
+class LogLimiter:
+    """
+    终端日志限流器，非线程安全，由 SwanLog 在处理锁中调用
+    """
+
+    REPEAT_INTERVAL = 30
+    """
+    重复的日志持续输出时，每隔多少秒输出一次重复提示，单位秒
+    """
+
+    MAX_FINGERPRINTS = 1024
+    """
+    每个输出流最多记录的日志指纹数
+    """
+
+    NOTE_LENGTH = 80
+    """
+    重复提示中保留的日志长度
+    """
+
+    def __init__(
+        self,
+        dedup: bool = True,
+        max_lines_per_second: Optional[float] = None,
+        max_bytes_per_second: Optional[float] = None,
+        burst: float = 10,
+    ):
+        """
+        :param dedup: 是否对重复的日志去重
+        :param max_lines_per_second: 每秒最多保留的行数，为 None 时不限制
+        :param max_bytes_per_second: 每秒最多保留的字节数（UTF-8 编码），为 None 时不限制
+        :param burst: 允许的突发时长，单位秒，即令牌桶最多积累 burst 秒的令牌
+        """
+        self.dedup = dedup
+        self._lines = TokenBucket(max_lines_per_second, burst) if max_lines_per_second else None
+        self._bytes = TokenBucket(max_bytes_per_second, burst) if max_bytes_per_second else None
+        # 输出流 -> 日志指纹 -> [提示中的日志, 尚未提示的重复次数, 第一次重复的时间]，最后一个为最近出现的日志
+        self._seen: Dict[LogType, "OrderedDict[int, list]"] = {}
+        # 尚未提示的限速丢弃行数
+        self._dropped = 0
+        self.repeated_lines = 0
+        """
+        被去重的总行数
+        """
+        self.dropped_lines = 0
+        """
+        被限速丢弃的总行数
+        """
+
+    def _admit(self, message: str, output: List[str]):
+        """
+        限速，两个令牌桶的令牌都充足时将日志加入输出
+        """
+        size = len(message.encode("utf-8")) if self._bytes is not None else 0
+        if (self._lines is not None and self._lines.tokens < 1) or (
+            self._bytes is not None and self._bytes.tokens < size
+        ):
+            self._dropped += 1
+            self.dropped_lines += 1
+            return
+        if self._lines is not None:
+            self._lines.consume(1)
+        if self._bytes is not None:
+            self._bytes.consume(size)
+        if self._dropped:
+            # 提示本身不消耗令牌
+            output.append(f"[swanlab] {self._dropped} lines suppressed by rate limit")
+            self._dropped = 0
+        output.append(message)
+
+    def filter(self, log_type: LogType, messages: List[str]) -> List[str]:
+        """
+        过滤一批日志
+        :param log_type: 输出流类型
+        :param messages: 按顺序排列的日志
+        :return: 需要保留的日志，可能包含重复与限速提示
+        """
+        now = time.monotonic()
+        for bucket in (self._lines, self._bytes):
+            if bucket is not None:
+                bucket.refill(now)
+        output = []
+        seen = self._seen.setdefault(log_type, OrderedDict())
+        for message in messages:
+            # 空行通常用于排版，不参与去重
+            if not self.dedup or not message:
+                self._admit(message, output)
+                continue
+            fingerprint = hash(message)
+            entry = seen.get(fingerprint)
+            if entry is None:
+                if len(seen) >= self.MAX_FINGERPRINTS:
+                    _, evicted = seen.popitem(last=False)
+                    if evicted[1]:
+                        self._admit(self._repeated(evicted), output)
+                seen[fingerprint] = [message[: self.NOTE_LENGTH], 0, now]
+                self._admit(message, output)
+                continue
+            seen.move_to_end(fingerprint)
+            if not entry[1]:
+                entry[2] = now
+            entry[1] += 1
+            self.repeated_lines += 1
+            # 重复持续太久时先输出一次提示，继续去重
+            if now - entry[2] >= self.REPEAT_INTERVAL:
+                self._admit(self._repeated(entry), output)
+                entry[1] = 0
+        return output
+
+    @staticmethod
+    def _repeated(entry: list) -> str:
+        return f"[swanlab] message repeated {entry[1]} times: {entry[0]}"
+
+    def finish(self, log_type: LogType) -> List[str]:
+        """
+        结束一个输出流，返回尚未输出的重复提示
+        """
+        seen = self._seen.pop(log_type, {})
+        return [self._repeated(entry) for entry in seen.values() if entry[1]]
+
+    def summary(self) -> Optional[str]:
+        """
+        被抑制的日志统计，没有日志被抑制时返回 None
+        """
+        if not self.repeated_lines and not self.dropped_lines:
+            return None
+        return (
+            f"[swanlab] terminal log capture suppressed {self.repeated_lines} repeated lines "
+            f"and {self.dropped_lines} lines exceeding the rate limit"
+        )
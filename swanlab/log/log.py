@@ -3,15 +3,20 @@
 @file: log.py
 @time: 2025/5/15 18:35
 @description: 标准输出、标准错误流拦截代理，支持外界设置/取消回调，基础作用为输出日志
+代理的 write 只负责输出到终端并将内容追加到队列，控制字符清理、分行、计数等操作由后台线程定期批量处理
+进度条（例如 tqdm）使用回车符不断重绘同一行，批量处理时未完成的行只保留最后一个回车符之后的内容，因此每个处理周期只保留进度条的最终状态
 """
 
 import re
 import sys
-from typing import List, Tuple, Callable
+import threading
+from collections import deque
+from typing import List, Tuple, Callable, Deque, Optional
 
 from swanlab.toolkit import SwanKitLogger, create_time
 from .counter import AtomicCounter
-from .type import LogHandler, LogType, WriteHandler, LogData, LogContent, ProxyType
+from .limiter import LogLimiter
+from .type import LogHandler, LogType, WriteHandler, LogData, LogContent, ProxyType, LogLevel
 
 
 class SwanLog(SwanKitLogger):
@@ -20,6 +25,11 @@ class SwanLog(SwanKitLogger):
     继承自 SwanKitLogger 的同时增加标准输出、标准错误留拦截代理功能
     """
 
+    PROCESS_INTERVAL = 0.1
+    """
+    后台线程处理代理输出的间隔，单位秒
+    """
+
     def __init__(self, name=__name__.lower(), level="info"):
         super().__init__(name=name, level=level)
         self.__original_level = level
@@ -28,9 +38,20 @@ class SwanLog(SwanKitLogger):
         # 保存原始的标准输出和标准错误流
         self.__origin_stdout_write = None
         self.__origin_stderr_write = None
-        # 代理缓冲区
+        # 代理缓冲区，存储尚未完成的行
         self.__stdout_buffer = ""
         self.__stderr_buffer = ""
+        # 尚未处理的输出，deque 的 append 与 popleft 是线程安全的
+        self.__stdout_chunks: Deque[str] = deque()
+        self.__stderr_chunks: Deque[str] = deque()
+        # 代理处理函数
+        self.__handler: Optional[LogHandler] = None
+        # 日志限流器
+        self.__limiter: Optional[LogLimiter] = None
+        # 处理线程，处理过程需要加锁，保证日志顺序与计数正确
+        self.__process_lock = threading.RLock()
+        self.__processor: Optional[threading.Thread] = None
+        self.__processor_stop = threading.Event()
         # 上传到云端的最大长度
         self.__max_upload_len = None
         # 当前的代理类型
@@ -38,24 +59,16 @@ class SwanLog(SwanKitLogger):
 
     @property
     def epoch(self):
+        # 先处理尚未处理的输出，保证计数准确
+        self.flush_proxy()
         return self.__counter.value
 
-    def __create_write_handler(self, write_type: LogType, handler: LogHandler) -> WriteHandler:
+    def __create_write_handler(self, write_type: LogType) -> WriteHandler:
         """
         创建一个新的处理器
         """
         origin_write_handler = self.__origin_stdout_write if write_type == 'stdout' else self.__origin_stderr_write
-
-        def get_buffer():
-            return self.__stdout_buffer if write_type == 'stdout' else self.__stderr_buffer
-
-        def set_buffer(buffer):
-            if write_type == 'stdout':
-                self.__stdout_buffer = buffer
-            else:
-                self.__stderr_buffer = buffer
-
-        max_output_len = self.__max_upload_len
+        chunks = self.__stdout_chunks if write_type == 'stdout' else self.__stderr_chunks
 
         def write_handler(message: str):
             """
@@ -70,32 +83,125 @@ class SwanLog(SwanKitLogger):
                 if "I/O operation on closed file" in str(e):
                     # 遇到文件已关闭问题，直接pass，此时表现为终端不输出
                     pass
+            chunks.append(message)
+
+        return write_handler
 
-            # 进行缓冲处理，主要目的是处理进度条输出：
-            # 1. 如果 message 不包含换行符，则加入缓冲区，否则跳转步骤2
-            # 2. 如果 message 包含换行符，则将换行符之前的内容和当前缓冲区合并，进入步骤3，准备上传
-            # 3. 根据换行符分隔为一个个 message，解析 message，如果 message 包含\r
-            messages, new_buffer = clean_control_chars(get_buffer() + message)
-            set_buffer(new_buffer)
-            # 4. 遍历 messages，上传到云端
-            if len(messages):
-                log_data = LogData(
-                    type=write_type,
-                    contents=[],
+    def __process(self, write_type: LogType):
+        """
+        处理队列中的输出，调用前必须持有处理锁：
+        1. 将缓冲区与队列中的内容合并，根据换行符分隔为一个个 message，最后一个未完成的行作为新的缓冲区
+        2. 每个 message 只保留最后一个回车符之后的内容并清理控制字符
+        3. 新的缓冲区只保留最后一个回车符及之后的内容，之前的内容已经被覆盖
+        4. 截断过长的 message，经过限流器过滤后交给处理函数
+        """
+        chunks = self.__stdout_chunks if write_type == 'stdout' else self.__stderr_chunks
+        if not chunks:
+            return
+        buffer = self.__stdout_buffer if write_type == 'stdout' else self.__stderr_buffer
+        # 只取出当前已有的内容，处理期间新写入的内容留给下一次处理
+        parts = [buffer] + [chunks.popleft() for _ in range(len(chunks))]
+        messages, buffer = clean_control_chars("".join(parts))
+        r = buffer.rfind('\r')
+        if r > 0:
+            buffer = buffer[r:]
+        if write_type == 'stdout':
+            self.__stdout_buffer = buffer
+        else:
+            self.__stderr_buffer = buffer
+        self.__submit(write_type, messages)
+
+    def __submit(self, write_type: LogType, messages: List[str], level: LogLevel = None, now: str = None):
+        """
+        截断过长的 message，经过限流器过滤后交给处理函数
+        """
+        max_output_len = self.__max_upload_len
+        messages = [message[:max_output_len] for message in messages]
+        if self.__limiter is not None:
+            dropped = self.__limiter.dropped_lines
+            messages = self.__limiter.filter(write_type, messages)
+            if not dropped and self.__limiter.dropped_lines:
+                # 第一次丢弃日志时在终端中提示，提示本身不会被代理捕获
+                self.origin_write('stderr')(
+                    "swanlab: Terminal output exceeds the log rate limit, "
+                    "excess lines will not be backed up or uploaded\n"
                 )
-                with self.__counter as counter:
-                    for message in messages:
-                        log_data['contents'].append(
-                            LogContent(
-                                message=message[:max_output_len],
-                                create_time=create_time(),
-                                epoch=counter.increment(),
-                            )
-                        )
-                # 设置回调
-                handler(log_data)
+        self.__emit(write_type, messages, level, now)
 
-        return write_handler
+    def __emit(self, write_type: LogType, messages: List[str], level: LogLevel = None, now: str = None):
+        """
+        为 message 分配 epoch 并交给处理函数
+        """
+        if not len(messages):
+            return
+        log_data = LogData(type=write_type, contents=[])
+        if level is not None:
+            log_data['level'] = level
+        now = now or create_time()
+        with self.__counter as counter:
+            for message in messages:
+                log_data['contents'].append(LogContent(message=message, create_time=now, epoch=counter.increment()))
+        self.__handler(log_data)
+
+    def flush_proxy(self):
+        """
+        立即处理所有尚未处理的代理输出
+        """
+        with self.__process_lock:
+            if self.__origin_stdout_write is not None:
+                self.__process('stdout')
+            if self.__origin_stderr_write is not None:
+                self.__process('stderr')
+
+    def emit(self, write_type: LogType, messages: List[str], level: LogLevel, now: str = None) -> bool:
+        """
+        不经过终端输出解析，直接将日志交给代理处理函数，用于 logging 集成
+        日志与终端输出共享 epoch 计数与限流器，在此之前写入终端的输出会先被处理，保证顺序
+        :param write_type: 日志所属的输出流
+        :param messages: 日志，每一项为一行
+        :param level: 日志级别
+        :param now: 日志创建时间，为 None 时使用当前时间
+        :return: 是否已经交给处理函数，未开启代理时返回 False
+        """
+        with self.__process_lock:
+            if not self.proxied:
+                return False
+            self.flush_proxy()
+            self.__submit(write_type, messages, level, now)
+            return True
+
+    def origin_write(self, write_type: LogType) -> WriteHandler:
+        """
+        获取输出流未被代理的写入函数，写入的内容只输出到终端，不会被代理捕获
+        """
+        origin = self.__origin_stdout_write if write_type == 'stdout' else self.__origin_stderr_write
+        if origin is not None:
+            return origin
+        return sys.stdout.write if write_type == 'stdout' else sys.stderr.write
+
+    def finish_proxy(self):
+        """
+        处理所有尚未处理的代理输出，并输出限流器尚未输出的重复提示与被抑制的日志统计
+        应该在实验结束、读取 epoch 之前调用，此后代理仍然有效
+        """
+        with self.__process_lock:
+            self.flush_proxy()
+            if self.__limiter is None:
+                return
+            streams = [
+                t for t, w in (('stdout', self.__origin_stdout_write), ('stderr', self.__origin_stderr_write)) if w
+            ]
+            for write_type in streams:
+                self.__emit(write_type, self.__limiter.finish(write_type))
+            summary = self.__limiter.summary()
+            if summary is not None and streams:
+                self.__emit(streams[0], [summary])
+            # 统计只输出一次
+            self.__limiter = None
+
+    def __process_loop(self):
+        while not self.__processor_stop.wait(self.PROCESS_INTERVAL):
+            self.flush_proxy()
 
     def __exec_fun_by_type(self, stdout_func: Callable, stderr_func: Callable):
         """
@@ -119,31 +225,47 @@ class SwanLog(SwanKitLogger):
         """
         return self.__origin_stderr_write is not None or self.__origin_stdout_write is not None
 
-    def start_proxy(self, proxy_type: ProxyType, max_log_length: int, handler: LogHandler):
+    def start_proxy(
+        self,
+        proxy_type: ProxyType,
+        max_log_length: int,
+        handler: LogHandler,
+        limiter: Optional[LogLimiter] = None,
+    ):
         """
         启动代理
         :param max_log_length: 一行日志的最大长度，超过这个长度的日志将被截断，-1 表示不限制
         :param proxy_type: 代理类型，支持 "stdout", "stderr", "all"
         :param handler: 代理处理函数
+        :param limiter: 日志限流器，为 None 时不去重、不限速
         """
         if self.proxied:
             raise RuntimeError("Std Proxy is already started")
         # 设置一些状态
         self.__max_upload_len = max_log_length
         self.__proxy_type = proxy_type
+        self.__handler = handler
+        self.__limiter = limiter
 
         # 设置代理
         def set_stdout():
             self.__stdout_buffer = ""
+            self.__stdout_chunks.clear()
             self.__origin_stdout_write = sys.stdout.write
-            sys.stdout.write = self.__create_write_handler('stdout', handler)
+            sys.stdout.write = self.__create_write_handler('stdout')
 
         def set_stderr():
             self.__stderr_buffer = ""
+            self.__stderr_chunks.clear()
             self.__origin_stderr_write = sys.stderr.write
-            sys.stderr.write = self.__create_write_handler('stderr', handler)
+            sys.stderr.write = self.__create_write_handler('stderr')
 
         self.__exec_fun_by_type(set_stdout, set_stderr)
+        # 启动处理线程
+        if self.proxied:
+            self.__processor_stop.clear()
+            self.__processor = threading.Thread(target=self.__process_loop, name="SwanLabLogProxy", daemon=True)
+            self.__processor.start()
 
     def stop_proxy(self):
         """
@@ -152,22 +274,34 @@ class SwanLog(SwanKitLogger):
         # 如果没有开启代理，则直接返回
         if not self.proxied:
             return
+        # 停止处理线程，剩余的输出在当前线程中处理
+        self.__processor_stop.set()
+        if self.__processor is not None and self.__processor is not threading.current_thread():
+            self.__processor.join()
+        self.__processor = None
+        self.finish_proxy()
 
         # 清理标准输出
         def clean_stdout():
-            if self.__stdout_buffer:
-                sys.stdout.write(self.__stdout_buffer + '\n')
-            self.__stdout_buffer = ""
-            sys.stdout.write = self.__origin_stdout_write
-            self.__origin_stdout_write = None
+            with self.__process_lock:
+                self.__process('stdout')
+                if self.__stdout_buffer:
+                    sys.stdout.write(self.__stdout_buffer + '\n')
+                    self.__process('stdout')
+                self.__stdout_buffer = ""
+                sys.stdout.write = self.__origin_stdout_write
+                self.__origin_stdout_write = None
 
         # 清理标准错误
         def clean_stderr():
-            if self.__stderr_buffer:
-                sys.stderr.write(self.__stderr_buffer + '\n')
-            self.__stderr_buffer = ""
-            sys.stderr.write = self.__origin_stderr_write
-            self.__origin_stderr_write = None
+            with self.__process_lock:
+                self.__process('stderr')
+                if self.__stderr_buffer:
+                    sys.stderr.write(self.__stderr_buffer + '\n')
+                    self.__process('stderr')
+                self.__stderr_buffer = ""
+                sys.stderr.write = self.__origin_stderr_write
+                self.__origin_stderr_write = None
 
         self.__exec_fun_by_type(clean_stdout, clean_stderr)
         self.__counter = AtomicCounter(0)
@@ -30,7 +30,16 @@ ProxyType = Literal['all', 'stdout', 'stderr', 'none']
 LogType = Literal['stdout', 'stderr']
 
 
-class LogData(TypedDict):
+# 日志级别，与上传模型中的日志级别一致
+LogLevel = Literal['INFO', 'WARN', 'ERROR']
+
+
+class _LogData(TypedDict):
+    type: LogType
+    contents: List[LogContent]
+
+
+class LogData(_LogData, total=False):
     """日志数据字典类型
 
     结构示例:
@@ -40,12 +49,25 @@ class LogData(TypedDict):
             "message": "hello world",
             "create_time": "2025-05-15 18:35:00",
             "epoch": 1
-        }]
+        }],
+        "level": "ERROR"  # 可选
     }
     """
 
-    type: LogType
-    contents: List[LogContent]
+    level: LogLevel
+    """
+    日志级别，只有通过 logging 集成写入的日志才会设置，否则由 type 决定：stdout 为 INFO，stderr 为 WARN
+    """
+
+
+def get_log_level(log_data: LogData) -> LogLevel:
+    """
+    获取日志数据的日志级别
+    """
+    level = log_data.get('level')
+    if level is not None:
+        return level
+    return 'INFO' if log_data['type'] == 'stdout' else 'WARN'
 
 
 # 日志写入器类型
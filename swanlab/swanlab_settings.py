@@ -9,6 +9,7 @@ r"""
 import json
 import os
 from pathlib import Path
+from typing import List
 
 from swanlab.toolkit import is_windows
 
@@ -17,7 +18,16 @@ try:
 except ImportError:
     from typing_extensions import Annotated, Literal, Optional  # Python 3.8
 
-from pydantic import BaseModel, ConfigDict, PositiveInt, StrictBool, DirectoryPath, Field
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    PositiveInt,
+    StrictBool,
+    DirectoryPath,
+    Field,
+    NonNegativeFloat,
+    PositiveFloat,
+)
 
 
 class Settings(BaseModel):
@@ -42,6 +52,15 @@ class Settings(BaseModel):
     requirements_collect: StrictBool = True
     # 是否采集conda环境信息
     conda_collect: StrictBool = False
+    git_diff_collect: StrictBool = Field(
+        default=False,
+        description="Record whether the git working tree has uncommitted changes, together with the diff against HEAD. "
+        "Collected asynchronously after init.",
+    )
+    git_diff_max_size: PositiveInt = Field(
+        default=256,
+        description="Maximum size of the recorded git diff, in KB. Larger diffs are truncated.",
+    )
     # ---------------------------------- 硬件监控部分 ----------------------------------
     # 是否开启硬件监控，如果元信息的相关采集被关闭，则此项无效
     hardware_monitor: StrictBool = True
@@ -54,15 +73,81 @@ class Settings(BaseModel):
         ge=5,
         description="Hardware monitoring collection interval, in seconds, minimum value is 5 seconds.",
     )
+    hardware_sample_interval: Optional[PositiveFloat] = Field(
+        default=1,
+        description="Sampling interval, in seconds, of lightweight hardware collectors such as NVML and psutil. "
+        "Samples are averaged locally per reporting interval. Set to None to sample only once per reporting interval.",
+    )
+    hardware_sample_aggregates: List[Literal["min", "max", "p95"]] = Field(
+        default_factory=list,
+        description="Extra aggregates of the samples reported per reporting interval besides the mean, "
+        "e.g. ['min', 'max', 'p95']. Each aggregate is reported as {key}.{aggregate} in its own chart.",
+    )
+    hardware_device_include: Optional[List[str]] = Field(
+        default=None,
+        description="Glob patterns of disks, network interfaces and RDMA ports that are reported individually, "
+        "e.g. ['nvme*', 'ib*', 'mlx5_*']. None means all devices not matched by hardware_device_exclude.",
+    )
+    hardware_device_exclude: List[str] = Field(
+        default_factory=lambda: [
+            "lo",
+            "loop*",
+            "ram*",
+            "zram*",
+            "sr*",
+            "docker*",
+            "veth*",
+            "br-*",
+            "virbr*",
+            "cni*",
+            "flannel*",
+            "cali*",
+            "tun*",
+            "ifb*",
+            "dummy*",
+        ],
+        description="Glob patterns of disks, network interfaces and RDMA ports that are never reported individually, "
+        "by default virtual and loopback devices.",
+    )
+    hardware_monitor_process: StrictBool = Field(
+        default=False,
+        description="Run hardware collectors in a separate child process and stream the results back through a pipe, "
+        "so that monitoring does not compete with training for the GIL and keeps running when the main thread hangs.",
+    )
     # ---------------------------------- 日志上传部分 ----------------------------------
     # 是否开启日志备份功能
     backup: StrictBool = True
+    backup_segment_size: Optional[PositiveInt] = Field(
+        default=None,
+        description="Maximum size of a single backup file segment, in MB. "
+        "If set, the backup file rolls over to a new numbered segment when it exceeds this size.",
+    )
     # 日志上传间隔
     upload_interval: PositiveInt = 3
     # 终端日志上传单行最大字符数
     max_log_length: int = Field(ge=500, le=4096, default=1024)
     # 终端日志代理类型，"all"、"stdout"、"stderr"、"none"
     log_proxy_type: Literal["all", "stdout", "stderr", "none"] = "all"
+    log_max_latency: NonNegativeFloat = Field(
+        default=1,
+        description="Maximum time in seconds that captured terminal output is batched before being written and "
+        "uploaded. Set to 0 to handle every write immediately.",
+    )
+    # 是否对终端日志中重复的行去重（不要求连续），以 "message repeated N times: <日志>" 代替
+    log_dedup: StrictBool = False
+    log_max_lines_per_second: Optional[PositiveInt] = Field(
+        default=None,
+        description="Maximum number of captured terminal lines written and uploaded per second, "
+        "bursts of up to 10 seconds are allowed, e.g. 1000. None (default) means no limit.",
+    )
+    log_max_bytes_per_second: Optional[PositiveInt] = Field(
+        default=None,
+        description="Maximum number of captured terminal bytes written and uploaded per second, "
+        "bursts of up to 10 seconds are allowed, e.g. 1048576. None (default) means no limit.",
+    )
+    # ---------------------------------- 本地索引部分 ----------------------------------
+    # 是否将实验信息、列信息与指标摘要写入 swanlog 目录下的索引数据库，用于跨实验查询，见 swanlab.data.index
+    local_index: StrictBool = False
 
     def filter_changed_fields(self):
         """
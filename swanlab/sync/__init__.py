@@ -9,12 +9,12 @@ from .wandb import sync_wandb
 
 __all__ = ["sync_wandb", "sync_tensorboardX", "sync_tensorboard_torch", "sync_mlflow", "sync"]
 
-from ..core_python import get_client, uploader
-from ..data.namer import generate_colors
+from ..core_python import get_client
 from ..log import swanlog
 from ..log.backup import BackupHandler
-from ..log.backup.datastore import DataStore
-from ..log.backup.models import ModelsParser
+from ..log.backup.segment import SegmentedDataStore
+from ..swanlab_settings import get_settings
+from .pipeline import SyncPipeline, follow_records, wait_for_backup
 
 
 def sync(
@@ -23,20 +23,30 @@ def sync(
     project_name: str = None,
     raise_error: bool = True,
     login_required: bool = True,
+    follow: bool = False,
+    follow_timeout: float = None,
 ):
     """
     Syncs backup files to the cloud. Before syncing, you must log in.
+    Records are streamed from the backup file and uploaded in bounded chunks, so memory usage does not grow with the
+    size of the run.
     :param dir_path: The directory path to sync.
     :param workspace: The workspace to sync the logs to. If not specified, it will use the default workspace.
     :param project_name: The project to sync the logs to. If not specified, it will use the default project.
     :param raise_error: Whether to raise an error if error occurs when syncing.
     :param login_required: Whether login is required before syncing, just for debugging.
+    :param follow: Whether to follow a backup file that is still being written, uploading new records as they appear
+        until the run finishes. Useful for syncing a running offline experiment from another machine.
+    :param follow_timeout: When following, stop if no new records appear within this many seconds and mark the run
+        as crashed. If not specified, wait until the run finishes.
     """
-    # 第一部分，处理备份文件，读取备份信息到内存中
+    # 第一部分，打开备份文件，解析头部信息
     try:
         with Status("🛠️Parsing...", spinner="dots"):
             assert os.path.exists(dir_path), f"Directory {dir_path} does not exist."
             file_path = os.path.join(dir_path, BackupHandler.BACKUP_FILE)
+            if follow:
+                wait_for_backup(file_path, timeout=follow_timeout)
             assert os.path.exists(file_path), f"Can not find backup file {BackupHandler.BACKUP_FILE} in {dir_path}."
             try:
                 client = get_client()
@@ -44,72 +54,52 @@ def sync(
                 client = None
                 assert not login_required, "Please log in first, use `swanlab login` to log in."
             stdout.flush()
-            ds = DataStore()
-            ds.open_for_scan(file_path)
-            # 根据类型分类日志文件
-            with ModelsParser() as models_parser:
-                for record in ds:
-                    if record is None:
-                        continue
-                    models_parser.parse_record(record)
-            header, project, experiment, logs, runtime, columns, scalars, medias, footer = models_parser.get_parsed()
-            # 0. 检查备份文件
-            assert (
-                header.backup_type == "DEFAULT"
-            ), f"Backup type mismatch: {header.backup_type}, please update your swanlab package."
-            # 1. 聚合信息
-            # 1.1 聚合日志
-            log_model_dict = {"INFO": [], "WARN": [], "ERROR": []}
-            for log in logs:
-                log_model = log.to_log_model()
-                log_model_dict[log_model['level']].append(log_model)
-            # 1.2 生成运行时
-            runtime_model = runtime.to_file_model(os.path.join(dir_path, "files"))
-            # 1.3 集合列
-            column_models = [c.to_column_model() for c in columns]
-            # 1.4 集合指标
-            scalar_models = [scalar.to_scalar_model() for scalar in scalars]
-            # 1.5 集合媒体
-            media_models = [media.to_media_model(os.path.join(dir_path, "media")) for media in medias]
+            ds = SegmentedDataStore()
+            # 跳过损坏的数据块，崩溃的实验末尾常常存在未写入完整的记录；跟随模式下末尾的记录可能正在写入，不能跳过
+            ds.open_for_scan(file_path, recover=not follow)
+            pipeline = SyncPipeline(dir_path, workspace=workspace, project_name=project_name)
+            records = ds
+            if follow:
+                records = follow_records(
+                    ds,
+                    finished=lambda: pipeline.footer is not None,
+                    # 暂时没有新记录时上传已经缓存的数据，保证云端数据接近实时
+                    on_idle=pipeline.flush,
+                    timeout=follow_timeout,
+                )
+            pipeline.parse_head(records)
             assert client is not None, "Please log in first, use `swanlab login` to log in."
     except Exception as e:
         if raise_error:
             raise e
         else:
             return swanlog.error(f"❌  Error parsing backup file: {e}")
-    # 第二部分，上传数据到云端
+    # 第二部分，边解析边上传数据到云端
     try:
-        # 3. 上传数据
-        # 3.1 创建项目与实验
-        client.mount_project(
-            name=project_name or project.name,
-            username=workspace or project.workspace,
-            public=project.public,
-        )
-        colors = generate_colors(client.history_exp_count)
-        client.mount_exp(
-            exp_name=experiment.name,
-            colors=colors,
-            description=experiment.description,
-            tags=experiment.tags,
-        )
-        with Status("🔁 Syncing...", spinner="dots"):
-            # 3.2 上传日志
-            for key in log_model_dict:
-                if len(log_model_dict[key]) > 0:
-                    uploader.upload_logs(log_model_dict[key])
-            # 3.3 上传运行时
-            uploader.upload_files([runtime_model])
-            # 3.4 上传列、标量、媒体
-            uploader.upload_columns(column_models)
-            uploader.upload_scalar_metrics(scalar_models)
-            uploader.upload_media_metrics(media_models)
-            # 3.5 更新实验状态
-            client.update_state(success=footer.success if footer else False)
+        # 1. 创建项目与实验
+        pipeline.mount(client)
+        # 2. 流式解析剩余记录，缓存满时分块上传
+        with Status("🔁 Syncing...", spinner="dots") as status:
+            for record in records:
+                pipeline.feed(record)
+                if pipeline.count % 10000 == 0:
+                    status.update(f"🔁 Syncing... {pipeline.count} records")
+            # 3. 上传剩余数据，更新实验状态
+            pipeline.finish()
+        # 4. 写入本地索引
+        if get_settings().local_index:
+            pipeline.write_index()
+        if ds.lost_bytes:
+            swanlog.warning(
+                f"Skipped at least {ds.lost_records} corrupted records ({ds.lost_bytes} bytes) in the backup file, "
+                "use `swanlab backup repair` to rewrite a clean backup file."
+            )
     except Exception as e:
         if raise_error:
             raise e
         else:
             swanlog.error(f"❌  Error uploading data: {e}")
             return
+    finally:
+        ds.close()
     swanlog.info("🚀 Sync completed, View run at ", client.web_exp_url)
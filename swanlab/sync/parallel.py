@@ -0,0 +1,89 @@
+"""
+@author: cunyue
+@file: parallel.py
+@time: 2025/7/3 10:12
+@description: 多实验并行同步，所有实验共享同一次登录
+客户端对象在进程内全局唯一，同步时会在其上挂载项目与实验，因此并行同步使用进程池而非线程池
+"""
+
+import contextlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Callable
+
+from swanlab.core_python import auth, create_client, get_client
+from . import sync
+
+
+class SyncResult:
+    """
+    单个实验的同步结果
+    """
+
+    def __init__(self, path: str, url: Optional[str] = None, error: Optional[str] = None):
+        self.path = path
+        self.url = url
+        self.error = error
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def _init_worker(login_info: auth.LoginInfo):
+    """
+    子进程初始化函数，复用主进程的登录信息创建客户端
+    子进程的终端输出（进度指示、日志）会互相覆盖，因此统一屏蔽，同步进度由主进程汇总展示
+    """
+    sys.stdout = open(os.devnull, "w")
+    create_client(login_info)
+
+
+def _sync_one(path: str, kwargs: dict) -> SyncResult:
+    """
+    同步单个实验，捕获所有错误并记录在结果中
+    """
+    try:
+        sync(path, raise_error=True, **kwargs)
+    except Exception as e:
+        return SyncResult(path, error=str(e) or type(e).__name__)
+    return SyncResult(path, url=get_client().web_exp_url)
+
+
+def sync_runs(
+    paths: List[str],
+    login_info: auth.LoginInfo,
+    jobs: int = 1,
+    callback: Callable[[SyncResult], None] = None,
+    **kwargs,
+) -> List[SyncResult]:
+    """
+    同步多个实验，单个实验同步失败不会影响其他实验
+    :param paths: 实验目录列表
+    :param login_info: 登录信息，所有实验共享
+    :param jobs: 并行进程数，为 1 时在当前进程中依次同步
+    :param callback: 每个实验同步完成后在当前进程中调用
+    :param kwargs: 传递给 sync 的其他参数，例如 workspace、project_name、follow
+    :return: 与 paths 顺序一致的同步结果
+    """
+    results: List[Optional[SyncResult]] = [None] * len(paths)
+    if jobs <= 1:
+        create_client(login_info)
+        for index, path in enumerate(paths):
+            # 与子进程一致，屏蔽每个实验自身的终端输出，同步进度由调用方汇总展示
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results[index] = _sync_one(path, kwargs)
+            callback and callback(results[index])
+        return results
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(login_info,)) as executor:
+        futures = {executor.submit(_sync_one, path, kwargs): i for i, path in enumerate(paths)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                # 子进程异常退出等情况
+                results[index] = SyncResult(paths[index], error=str(e) or type(e).__name__)
+            callback and callback(results[index])
+    return results
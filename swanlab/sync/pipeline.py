@@ -0,0 +1,274 @@
+"""
+@author: cunyue
+@file: pipeline.py
+@time: 2025/7/2 11:20
+@description: 备份文件流式同步管线
+逐条接收备份记录并按类型缓存，缓存达到块大小后立即上传并清空，内存占用只与块大小有关，与实验规模无关
+"""
+
+import os
+import time
+from typing import List, Optional, Iterable, Iterator, Callable, Dict
+
+from swanlab.core_python import uploader, Client, ColumnModel, ScalarModel, MediaModel, LogModel
+from swanlab.data.index import IndexWriter, index_path, merge_summary
+from swanlab.data.namer import generate_colors
+from swanlab.log import swanlog
+from swanlab.log.backup.datastore import LEVELDBLOG_HEADER_LEN
+from swanlab.log.backup.segment import SegmentedDataStore
+from swanlab.log.backup.models import (
+    BaseModel,
+    Header,
+    Project,
+    Experiment,
+    Log,
+    Runtime,
+    Column,
+    Scalar,
+    Media,
+    Footer,
+)
+
+SCALAR_CHUNK_SIZE = 5000
+"""
+单次上传的最大标量数量
+"""
+MEDIA_CHUNK_SIZE = 100
+"""
+单次上传的最大媒体数量，媒体需要读取文件内容到内存中，因此块大小较小
+"""
+LOG_CHUNK_SIZE = 1000
+"""
+单次上传的最大日志数量
+"""
+COLUMN_CHUNK_SIZE = 3000
+"""
+单次上传的最大列数量，与 upload_columns 的单次请求上限保持一致
+"""
+
+
+def wait_for_backup(file_path: str, poll_interval: float = 1, timeout: Optional[float] = None):
+    """
+    等待备份文件创建并写入文件头，用于跟随正在运行的实验
+    """
+    start = time.time()
+    while not os.path.exists(file_path) or os.stat(file_path).st_size < LEVELDBLOG_HEADER_LEN:
+        if timeout is not None and time.time() - start > timeout:
+            raise TimeoutError(f"Backup file {file_path} was not created in {timeout} seconds.")
+        time.sleep(poll_interval)
+
+
+def follow_records(
+    ds: SegmentedDataStore,
+    finished: Callable[[], bool],
+    on_idle: Callable[[], None] = None,
+    poll_interval: float = 1,
+    timeout: Optional[float] = None,
+) -> Iterator[str]:
+    """
+    跟随读取正在写入的备份文件，末尾尚未写入完整的记录会在写入完成后再读取
+    :param ds: 以扫描模式打开的 SegmentedDataStore
+    :param finished: 是否已经读取到结束记录，每读取一条记录后检查一次
+    :param on_idle: 暂时没有新记录时的回调，可以用来上传已经缓存的数据
+    :param poll_interval: 没有新记录时的轮询间隔，单位秒
+    :param timeout: 超过此时间没有新记录则认为实验已经异常退出，停止跟随；为 None 时一直等待
+    """
+    idle_since = time.time()
+    while not finished():
+        record = ds.scan_available()
+        if record is not None:
+            idle_since = time.time()
+            yield record
+            continue
+        on_idle and on_idle()
+        if timeout is not None and time.time() - idle_since > timeout:
+            return swanlog.warning(f"No new records in {timeout} seconds, the run may have been terminated.")
+        time.sleep(poll_interval)
+
+
+def check_upload(result):
+    """
+    检查上传结果，上传函数被 sync_error_handler 包裹，错误以返回值的形式给出，在这里重新抛出
+    """
+    _, e = result
+    if e is not None:
+        raise e
+
+
+class SyncPipeline:
+    """
+    流式同步管线，使用方式为：
+    1. 调用 feed 依次传入备份记录，Header、Project、Experiment 位于备份文件头部
+    2. 头部记录解析完毕后调用 mount 挂载项目与实验，此后缓存满时即刻上传
+    3. 所有记录传入完毕后调用 finish 上传剩余数据与运行时信息，并更新实验状态
+    """
+
+    def __init__(self, dir_path: str, workspace: str = None, project_name: str = None):
+        self.dir_path = dir_path
+        self.workspace = workspace
+        self.project_name = project_name
+        self.client: Optional[Client] = None
+        # 头部与尾部记录
+        self.header: Optional[Header] = None
+        self.project: Optional[Project] = None
+        self.experiment: Optional[Experiment] = None
+        self.footer: Optional[Footer] = None
+        # 运行时信息体量很小，合并后在结束时上传
+        self.runtime = Runtime(
+            conda_filename=None,
+            requirements_filename=None,
+            metadata_filename=None,
+            config_filename=None,
+        )
+        # 待上传的缓存
+        self._columns: List[ColumnModel] = []
+        self._scalars: List[ScalarModel] = []
+        self._medias: List[MediaModel] = []
+        self._logs: List[LogModel] = []
+        # 已经处理的记录数量
+        self.count = 0
+        # 列信息与标量指标摘要，用于写入本地索引，列名 -> 列信息/摘要
+        self.columns: Dict[str, Column] = {}
+        self.summaries: Dict[str, dict] = {}
+
+    @property
+    def head_parsed(self) -> bool:
+        """
+        头部记录是否已经全部解析
+        """
+        return self.header is not None and self.project is not None and self.experiment is not None
+
+    @property
+    def mounted(self) -> bool:
+        return self.client is not None
+
+    def parse_head(self, records: Iterable[str]):
+        """
+        从记录迭代器中解析头部记录，解析完毕后立即返回，迭代器中剩余的记录交由 feed 处理
+        """
+        for record in records:
+            self.feed(record)
+            if self.head_parsed:
+                break
+        assert self.header is not None, "Header not parsed"
+        assert self.project is not None, "Project not parsed"
+        assert self.experiment is not None, "Experiment not parsed"
+        assert (
+            self.header.backup_type == "DEFAULT"
+        ), f"Backup type mismatch: {self.header.backup_type}, please update your swanlab package."
+
+    def mount(self, client: Client):
+        """
+        创建项目与实验，此后缓存满时将立即上传
+        """
+        assert self.head_parsed, "Must parse head records before mounting"
+        client.mount_project(
+            name=self.project_name or self.project.name,
+            username=self.workspace or self.project.workspace,
+            public=self.project.public,
+        )
+        client.mount_exp(
+            exp_name=self.experiment.name,
+            colors=generate_colors(client.history_exp_count),
+            description=self.experiment.description,
+            tags=self.experiment.tags,
+        )
+        self.client = client
+        # 挂载前可能已经缓存了部分数据
+        self.flush(force=False)
+
+    def feed(self, data: str):
+        """
+        传入一条备份记录
+        """
+        record = BaseModel.from_record(data)
+        self.count += 1
+        if isinstance(record, Header):
+            assert self.header is None, "Header already parsed"
+            self.header = record
+        elif isinstance(record, Project):
+            assert self.project is None, "Project already parsed"
+            self.project = record
+        elif isinstance(record, Experiment):
+            assert self.experiment is None, "Experiment already parsed"
+            self.experiment = record
+        elif isinstance(record, Log):
+            self._logs.append(record.to_log_model())
+        elif isinstance(record, Runtime):
+            for name in ("conda_filename", "requirements_filename", "metadata_filename", "config_filename"):
+                if getattr(record, name) is not None:
+                    setattr(self.runtime, name, getattr(record, name))
+        elif isinstance(record, Column):
+            self.columns[record.key] = record
+            self._columns.append(record.to_column_model())
+        elif isinstance(record, Scalar):
+            summary = merge_summary(self.summaries.get(record.key), record.step, record.metric["data"])
+            self.summaries[record.key] = summary
+            self._scalars.append(record.to_scalar_model())
+        elif isinstance(record, Media):
+            self._medias.append(record.to_media_model(os.path.join(self.dir_path, "media")))
+        elif isinstance(record, Footer):
+            assert self.footer is None, "Footer already parsed"
+            self.footer = record
+        else:
+            raise TypeError("Unsupported record type: {}".format(type(record).__name__))
+        self.flush(force=False)
+
+    def flush(self, force: bool = True):
+        """
+        上传缓存数据
+        :param force: 是否强制上传所有缓存，为 False 时只上传已经达到块大小的缓存
+        """
+        if not self.mounted:
+            return
+        flush_scalars = len(self._scalars) >= SCALAR_CHUNK_SIZE or (force and self._scalars)
+        flush_medias = len(self._medias) >= MEDIA_CHUNK_SIZE or (force and self._medias)
+        flush_logs = len(self._logs) >= LOG_CHUNK_SIZE or (force and self._logs)
+        flush_columns = flush_scalars or flush_medias or force or len(self._columns) >= COLUMN_CHUNK_SIZE
+        # 指标上传前需要确保对应的列已经创建
+        if flush_columns and self._columns:
+            check_upload(uploader.upload_columns(self._columns, per_request_len=COLUMN_CHUNK_SIZE))
+            self._columns = []
+        if flush_scalars:
+            check_upload(uploader.upload_scalar_metrics(self._scalars))
+            self._scalars = []
+        if flush_medias:
+            check_upload(uploader.upload_media_metrics(self._medias))
+            self._medias = []
+        if flush_logs:
+            check_upload(uploader.upload_logs(self._logs))
+            self._logs = []
+
+    def finish(self):
+        """
+        上传剩余数据与运行时信息，更新实验状态
+        """
+        assert self.mounted, "Must mount before finishing"
+        self.flush()
+        check_upload(uploader.upload_files([self.runtime.to_file_model(os.path.join(self.dir_path, "files"))]))
+        self.client.update_state(success=self.footer.success if self.footer else False)
+
+    def write_index(self):
+        """
+        将已经同步的实验写入本地索引，索引位于实验目录的上级目录（即 swanlog 目录）
+        """
+        assert self.mounted, "Must mount before writing index"
+        run_dir = os.path.abspath(self.dir_path)
+        index = IndexWriter(index_path(os.path.dirname(run_dir)))
+        index.upsert_run(
+            run_dir,
+            run_id=os.path.basename(run_dir),
+            project=self.project_name or self.project.name,
+            workspace=self.workspace or self.project.workspace,
+            name=self.experiment.name,
+            description=self.experiment.description,
+            state=("FINISHED" if self.footer.success else "CRASHED") if self.footer else "CRASHED",
+            url=self.client.web_exp_url,
+            create_time=self.header.create_time,
+            finish_time=self.footer.create_time if self.footer else None,
+        )
+        for column in self.columns.values():
+            index.add_column(run_dir, column.key, column.kid, column.column_type, column.cls)
+        for key, summary in self.summaries.items():
+            index.update_summary(run_dir, key, summary)
+        index.close()
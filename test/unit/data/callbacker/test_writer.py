@@ -0,0 +1,160 @@
+"""
+@author: cunyue
+@file: test_writer.py
+@time: 2025/7/8 17:30
+@description: 测试本地模式下的指标写入器
+"""
+
+import builtins
+import json
+import os.path
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+import tutils as T
+from swanlab.data.callbacker import writer as writer_module
+from swanlab.data.callbacker.writer import MetricWriter
+from swanlab.data.store import read_scalars
+from swanlab.toolkit import ColumnInfo, MetricInfo, ChartType, create_time
+
+
+def make_metric(key: str, step: int) -> MetricInfo:
+    column_info = ColumnInfo(
+        key=key,
+        kid=key,
+        name=None,
+        cls="CUSTOM",
+        chart_type=ChartType.LINE,
+        chart_reference="STEP",
+        section_name=None,
+        section_type="PUBLIC",
+    )
+    return MetricInfo(
+        column_info=column_info,
+        metric={"index": step, "data": step * 0.1, "create_time": create_time()},
+        metric_buffers=None,
+        metric_summary={"max": step * 0.1, "num": step + 1},
+        metric_step=step,
+        metric_epoch=step + 1,
+        metric_file_name="1000.log",
+        swanlab_logdir=T.TEMP_PATH,
+        swanlab_media_dir=None,
+    )
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """
+    统计写入器打开文件的次数
+    """
+    count = {"open": 0, "paths": Counter()}
+
+    def counting_open(path, *args, **kwargs):
+        count["open"] += 1
+        count["paths"][path] += 1
+        return builtins.open(path, *args, **kwargs)
+
+    monkeypatch.setattr(writer_module, "open", counting_open, raising=False)
+    return count
+
+
+def read_metrics(key: str):
+    with open(os.path.join(T.TEMP_PATH, key, "1000.log"), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def read_summary(key: str):
+    with open(os.path.join(T.TEMP_PATH, key, "_summary.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("max_open_files", [1, 10, 128])
+def test_write(opened, max_open_files):
+    keys, steps = [f"key{i}" for i in range(20)], 50
+    writer = MetricWriter(max_open_files=max_open_files, flush_interval=float("inf"))
+    for step in range(steps):
+        for key in keys:
+            writer.write(make_metric(key, step))
+    # 刷写前不会打开任何文件
+    assert opened["open"] == 0
+    writer.close()
+    for key in keys:
+        assert [m["index"] for m in read_metrics(key)] == list(range(steps))
+        assert read_summary(key) == {"max": (steps - 1) * 0.1, "num": steps}
+    # 每个指标打开一次分片日志、一次摘要文件与三个列式存储文件
+    assert opened["open"] == len(keys) * 5
+    for key in keys:
+        assert list(read_scalars(os.path.join(T.TEMP_PATH, key)).steps) == list(range(steps))
+
+
+def test_flush_interval(opened):
+    """
+    句柄在多次刷写之间复用，超过最大句柄数时关闭最久未使用的句柄
+    """
+    keys = [f"key{i}" for i in range(10)]
+    writer = MetricWriter(max_open_files=5, flush_interval=0)
+    for step in range(3):
+        for key in keys:
+            writer.write(make_metric(key, step))
+            # 每次写入后立即刷写，数据可以被读取
+            assert read_metrics(key)[-1]["index"] == step
+            assert read_summary(key)["num"] == step + 1
+    assert len(writer._files) == 5
+    writer.close()
+    assert len(writer._files) == 0
+
+
+def test_open_calls(opened):
+    """
+    逐条写入时每条指标都要打开一次文件，而缓存句柄后即使每条指标都刷写，每个分片日志与列式存储文件也只打开一次
+    摘要文件每次刷写都会被重写
+    """
+    keys, steps = [f"key{i}" for i in range(10)], 20
+    writer = MetricWriter(flush_interval=0)
+    for step in range(steps):
+        for key in keys:
+            writer.write(make_metric(key, step))
+    writer.close()
+    appended = {path: n for path, n in opened["paths"].items() if not path.endswith("_summary.json")}
+    assert len(appended) == len(keys) * 4
+    assert set(appended.values()) == {1}
+    assert opened["open"] - sum(appended.values()) == len(keys) * steps
+
+
+def test_concurrent_write():
+    """
+    用户线程与硬件监控线程同时写入时不丢失数据
+    """
+    keys, steps = ["key0", "key1"], 3000
+    writer = MetricWriter(max_open_files=2, flush_interval=0)
+
+    def log(key):
+        for step in range(steps):
+            writer.write(make_metric(key, step))
+
+    threads = [threading.Thread(target=log, args=(key,)) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+    for key in keys:
+        assert [m["index"] for m in read_metrics(key)] == list(range(steps))
+
+
+def test_background_flush():
+    """
+    停止写入后，缓存的指标由后台线程刷写，不需要等到下一次写入或者关闭
+    """
+    writer = MetricWriter(flush_interval=0.05)
+    writer.write(make_metric("key", 0))
+    path = os.path.join(T.TEMP_PATH, "key", "1000.log")
+    start = time.time()
+    while not (os.path.exists(path) and os.path.getsize(path)) and time.time() - start < 10:
+        time.sleep(0.01)
+    assert [m["index"] for m in read_metrics("key")] == [0]
+    writer.close()
+    assert not getattr(writer, "_flush_thread")
@@ -5,12 +5,16 @@
 @description: 测试NVIDIA GPU信息采集
 """
 
+import os
+from collections import Counter
+from types import SimpleNamespace
+
 import pynvml
 import pytest
 
+from swanlab.data.run.metadata.hardware.gpu import nvidia
 from swanlab.data.run.metadata.hardware.gpu.nvidia import GpuCollector
 
-
 try:
     pynvml.nvmlInit()
     count = pynvml.nvmlDeviceGetCount()
@@ -19,88 +23,202 @@ except Exception:  # noqa
     count = 0
     max_gpu_mem = 0
 
-@pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-def test_before_impl():
-    collector = GpuCollector(count, max_gpu_mem)
-    collector.before_collect_impl()
-    assert len(collector.handles) == count
+
+class FakeNvml:
+    """
+    NVML 测试替身，记录每个接口的调用次数，可以在没有 GPU 的环境中测试与基准测试
+    """
+
+    NVMLError = pynvml.NVMLError
+    NVML_TEMPERATURE_GPU = pynvml.NVML_TEMPERATURE_GPU
+    NVML_ERROR_NOT_FOUND = pynvml.NVML_ERROR_NOT_FOUND
+
+    def __init__(self, count: int, power_supported: bool = True):
+        self.count = count
+        self.power_supported = power_supported
+        self.calls = Counter()
+        self.inited = False
+        # handle -> [(pid, 显存字节数)]
+        self.processes = {}
+        # handle -> [(pid, 时间戳, SM 利用率)]
+        self.samples = {}
+
+    def __getattribute__(self, name):
+        if name.startswith("nvml"):
+            object.__getattribute__(self, "calls")[name] += 1
+        return object.__getattribute__(self, name)
+
+    def nvmlInit(self):
+        self.inited = True
+
+    def nvmlShutdown(self):
+        self.inited = False
+
+    def nvmlDeviceGetCount(self):
+        return self.count
+
+    def nvmlDeviceGetHandleByIndex(self, idx):
+        return idx
+
+    def nvmlDeviceGetUtilizationRates(self, handle):
+        return SimpleNamespace(gpu=10 * handle, memory=5 * handle)
+
+    def nvmlDeviceGetMemoryInfo(self, handle):
+        return SimpleNamespace(used=(handle + 1) << 30, total=8 << 30)
+
+    def nvmlDeviceGetTemperature(self, handle, sensor):
+        assert sensor == self.NVML_TEMPERATURE_GPU
+        return 40 + handle
+
+    def nvmlDeviceGetPowerUsage(self, handle):
+        if not self.power_supported:
+            raise pynvml.NVMLError(pynvml.NVML_ERROR_NOT_SUPPORTED)
+        return 100000 + handle * 1000
+
+    def nvmlDeviceGetComputeRunningProcesses(self, handle):
+        return [SimpleNamespace(pid=pid, usedGpuMemory=mem) for pid, mem in self.processes.get(handle, [])]
+
+    def nvmlDeviceGetProcessUtilization(self, handle, timestamp):
+        samples = [
+            SimpleNamespace(pid=pid, timeStamp=ts, smUtil=util)
+            for pid, ts, util in self.samples.get(handle, [])
+            if ts > timestamp
+        ]
+        if not samples:
+            raise pynvml.NVMLError(pynvml.NVML_ERROR_NOT_FOUND)
+        return samples
+
+
+@pytest.fixture
+def fake_nvml(monkeypatch):
+    fake = FakeNvml(8)
+    monkeypatch.setattr(nvidia, "pynvml", fake)
+    return fake
+
+
+def test_collect(fake_nvml):
+    collector = GpuCollector(8, 8192)
+    result = {r["key"]: r for r in collector()}
+    assert len(result) == 8 * 6
+    assert result["__swanlab__.gpu.1.pct"]["value"] == 10
+    assert result["__swanlab__.gpu.1.mem.time"]["value"] == 5
+    assert result["__swanlab__.gpu.1.mem.pct"]["value"] == 25
+    assert result["__swanlab__.gpu.1.mem.value"]["value"] == 2048
+    assert result["__swanlab__.gpu.1.temp"]["value"] == 41
+    assert result["__swanlab__.gpu.1.power"]["value"] == 101
+    mem = result["__swanlab__.gpu.0.mem.value"]
+    assert mem["name"] == "GPU 0 Memory Allocated (MB)"
+    assert mem["config"].y_range == (0, 8192)
+    assert mem["config"].metric_name == "GPU 0"
+    # 同一指标的所有 GPU 在同一个图表中
+    assert (
+        result["__swanlab__.gpu.7.pct"]["config"].chart_index == result["__swanlab__.gpu.0.pct"]["config"].chart_index
+    )
+
+
+def test_snapshot_calls(fake_nvml):
+    """
+    每次采集每个 GPU 只调用一次各个查询接口，NVML 只初始化一次
+    """
+    collector = GpuCollector(8, 8192)
+    ticks = 100
+    for _ in range(ticks):
+        collector()
+    assert fake_nvml.calls["nvmlInit"] == 1
+    assert fake_nvml.calls["nvmlDeviceGetHandleByIndex"] == 8
+    assert fake_nvml.calls["nvmlShutdown"] == 0
+    for name in (
+        "nvmlDeviceGetUtilizationRates",
+        "nvmlDeviceGetMemoryInfo",
+        "nvmlDeviceGetTemperature",
+        "nvmlDeviceGetPowerUsage",
+        "nvmlDeviceGetComputeRunningProcesses",
+        "nvmlDeviceGetProcessUtilization",
+    ):
+        assert fake_nvml.calls[name] == 8 * ticks
+    assert len(collector.handles) == 8
+
+
+def test_unsupported(fake_nvml):
+    """
+    某一项不受支持时，其他指标照常采集
+    """
+    fake_nvml.power_supported = False
+    result = {r["key"] for r in GpuCollector(8, 8192)()}
+    assert len(result) == 8 * 5
+    assert "__swanlab__.gpu.0.power" not in result
+
+
+def test_calls_per_tick(fake_nvml):
+    """
+    每个 GPU 每次采集只调用 6 个查询接口，初始化与获取句柄只发生一次
+    """
+    collector = GpuCollector(8, 8192)
+    collector()
+    ticks = 1000
+    for _ in range(ticks):
+        collector()
+    calls = sum(fake_nvml.calls.values()) / (ticks + 1)
+    assert calls < 8 * 6 + 1
+
+
+def test_process(fake_nvml):
+    """
+    统计训练进程树的显存与利用率，其他进程不计入
+    """
+    me, other = os.getpid(), 1 << 30
+    fake_nvml.processes = {0: [(me, 1 << 30), (other, 4 << 30)], 1: [(other, 2 << 30)], 2: [(me, None)]}
+    fake_nvml.samples = {0: [(me, 1, 30), (me, 2, 50), (other, 2, 40)], 1: [(other, 2, 90)]}
+    collector = GpuCollector(8, 8192)
+    result = {r["key"]: r for r in collector()}
+    assert len(result) == 8 * 9
+    assert result["__swanlab__.gpu.0.proc.mem.value"]["value"] == 1024
+    assert result["__swanlab__.gpu.0.proc.mem.pct"]["value"] == 12.5
+    assert result["__swanlab__.gpu.0.proc.pct"]["value"] == 40
+    assert result["__swanlab__.gpu.0.proc.pct"]["name"] == "GPU 0 Process Utilization (%)"
+    assert result["__swanlab__.gpu.0.proc.pct"]["config"].chart_name == "GPU Process Utilization (%)"
+    assert result["__swanlab__.gpu.1.proc.mem.value"]["value"] == 0
+    assert result["__swanlab__.gpu.1.proc.pct"]["value"] == 0
+    # 只查询上次以来的新采样
+    assert collector.util_timestamps[:2] == [2, 2]
+    fake_nvml.samples[0].append((me, 3, 10))
+    result = {r["key"]: r for r in collector()}
+    assert result["__swanlab__.gpu.0.proc.pct"]["value"] == 10
+    assert result["__swanlab__.gpu.1.proc.pct"]["value"] == 0
+
+
+def test_process_not_found(fake_nvml):
+    """
+    训练进程不在任何 GPU 上时（例如容器中 PID 不一致）不上报进程级指标
+    """
+    fake_nvml.processes = {0: [(1 << 30, 1 << 30)]}
+    result = {r["key"] for r in GpuCollector(8, 8192)()}
+    assert len(result) == 8 * 6
+    assert "__swanlab__.gpu.0.proc.mem.value" not in result
+
+
+def test_process_memory_unavailable(fake_nvml):
+    """
+    没有权限查询进程显存时，只要找到训练进程仍然上报进程利用率
+    """
+    me = os.getpid()
+    fake_nvml.processes = {0: [(me, None)]}
+    fake_nvml.samples = {0: [(me, 1, 30)]}
+    result = {r["key"]: r for r in GpuCollector(8, 8192)()}
+    assert result["__swanlab__.gpu.0.proc.mem.value"]["value"] == 0
+    assert result["__swanlab__.gpu.0.proc.pct"]["value"] == 30
 
 
 @pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-def test_after_impl():
+def test_real_gpu():
     collector = GpuCollector(count, max_gpu_mem)
+    result = {r["key"]: r for r in collector()}
+    assert len(collector.handles) == count
+    util = result["__swanlab__.gpu.0.pct"]
+    assert util["name"] == "GPU 0 Utilization (%)"
+    assert util["config"].y_range == (0, 100)
+    assert 100 >= util["value"] >= 0
+    assert 100 >= result["__swanlab__.gpu.0.mem.pct"]["value"] >= 0
+    assert result["__swanlab__.gpu.0.mem.value"]["value"] >= 0
     collector.after_collect_impl()
     assert len(collector.handles) == 0
-
-
-class TestGpuCollector:
-    collector = GpuCollector(count, max_gpu_mem)
-
-    def setup_class(self):
-        self.collector.before_collect_impl()
-
-    def teardown_class(self):
-        self.collector.after_collect_impl()
-
-    @pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-    def test_get_mem(self):
-        # 获取handle
-        idx = 0
-        mem = self.collector.get_gpu_mem_pct(idx=idx)
-        assert mem['name'] == "GPU 0 Memory Allocated (%)"
-        assert mem['config'].y_range == (0, 100)
-        assert mem['config'].metric_name == "GPU 0"
-        assert 100 >= mem['value'] >= 0
-
-    @pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-    def test_get_mem_value(self):
-        # 获取handle
-        idx = 0
-        mem = self.collector.get_gpu_mem_value(idx=idx)
-        assert mem['name'] == "GPU 0 Memory Allocated (MB)"
-        assert mem['config'].y_range == (0, max_gpu_mem)
-        assert mem['config'].metric_name == "GPU 0"
-        assert mem['value'] >= 0
-
-    @pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-    def test_get_utils(self):
-        # 获取handle
-        idx = 0
-        utils = self.collector.get_gpu_util(idx=idx)
-        assert utils['name'] == "GPU 0 Utilization (%)"
-        assert utils['config'].y_range == (0, 100)
-        assert utils['config'].metric_name == "GPU 0"
-        assert 100 >= utils['value'] >= 0
-
-    @pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-    def test_get_temp(self):
-        # 获取handle
-        idx = 0
-        temp = self.collector.get_gpu_temp(idx=idx)
-        assert temp['name'] == "GPU 0 Temperature (℃)"
-        assert temp['config'].y_range is None
-        assert temp['config'].metric_name == "GPU 0"
-        assert temp['value'] >= 0
-        assert temp['config'].metric_name == "GPU 0"
-
-    @pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-    def test_get_power(self):
-        # 获取handle
-        idx = 0
-        power = self.collector.get_gpu_power(idx=idx)
-        assert power['name'] == "GPU 0 Power Usage (W)"
-        assert power['config'].y_range is None
-        assert power['config'].metric_name == "GPU 0"
-        assert power['value'] >= 0
-        assert power['config'].metric_name == "GPU 0"
-
-    @pytest.mark.skipif(count == 0, reason="No NVIDIA GPU found")
-    def test_get_mem_time(self):
-        # 获取handle
-        idx = 0
-        time = self.collector.get_gpu_mem_time(idx=idx)
-        assert time['name'] == "GPU 0 Time Spent Accessing Memory (%)"
-        assert time['config'].y_range == (0, 100)
-        assert time['config'].metric_name == "GPU 0"
-        assert 100 >= time['value'] >= 0
-        assert time['config'].metric_name == "GPU 0"
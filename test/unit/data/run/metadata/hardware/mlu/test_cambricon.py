@@ -1,6 +1,9 @@
+import math
+
 import pytest
 
-from swanlab.data.run.metadata.hardware.mlu.cambricon import CambriconCollector, map_mlu
+from swanlab.data.run.metadata.hardware.command import CommandCache
+from swanlab.data.run.metadata.hardware.mlu.cambricon import CNMON_QUERY, CambriconCollector, map_mlu
 
 try:
     driver, mlu_map = map_mlu()
@@ -21,3 +24,75 @@ def test_cambricon_mlu_info():
     collector = CambriconCollector(mlu_map, max_mem_value)
     collector()
     assert collector.collect_num == 1
+
+
+def cnmon_card(card: int, util: str, used: int, temp: int, power: int) -> str:
+    """
+    录制的 cnmon info -u -m -e -p 中一张卡的输出，MLU370-X8
+    """
+    return f"""Card {card}
+Utilization
+    MLU Average                 : {util} %
+    MLU 0-3                     : {util} %  {util} %  {util} %  {util} %
+    Device CPU Chip             : 1 %
+Physical Memory Usage
+    Total                       : 24576 MiB
+    Used                        : {used} MiB
+    Free                        : {24576 - used} MiB
+Temperature
+    Board                       : 33 C
+    Chip                        : {temp} C
+Power
+    Usage                       : {power} W
+    Cap                         : 250 W
+"""
+
+
+CNMON_INFO = "CNMON v5.10.22\n" + cnmon_card(0, "37", 6144, 41, 96) + cnmon_card(1, "N/A", 1150, 38, 75)
+
+
+class FakeCnmon:
+    """
+    返回录制输出的 cnmon，记录调用的命令
+    """
+
+    def __init__(self, combined: bool = True):
+        self.combined = combined
+        self.calls = []
+
+    def __call__(self, args):
+        self.calls.append(args)
+        if args == CNMON_QUERY and not self.combined:
+            return "Invalid option\n"
+        return CNMON_INFO
+
+
+def test_collect_once_per_tick():
+    fake = FakeCnmon()
+    cards = {"0": {"name": "MLU370-X8", "memory": "24"}, "1": {"name": "MLU370-X8", "memory": "24"}}
+    collector = CambriconCollector(cards, 24576, cli=CommandCache(runner=fake))
+    for _ in range(3):
+        result = {r["key"]: r for r in collector()}
+    assert fake.calls == [CNMON_QUERY] * 3
+    assert len(result) == 2 * 5
+    assert result["__swanlab__.mlu.0.ptc"]["value"] == 37
+    assert math.isnan(result["__swanlab__.mlu.1.ptc"]["value"])
+    assert result["__swanlab__.mlu.0.mem.ptc"]["value"] == 25
+    assert result["__swanlab__.mlu.1.mem.value"]["value"] == 1150
+    assert result["__swanlab__.mlu.1.temp"]["value"] == 38
+    assert result["__swanlab__.mlu.0.power"]["value"] == 96
+    power = result["__swanlab__.mlu.0.power"]
+    assert power["name"] == "MLU 0 Power (W)"
+    assert power["config"].metric_name == "MLU 0"
+
+
+def test_collect_fallback():
+    """
+    不支持合并查询时单独查询每个指标
+    """
+    fake = FakeCnmon(combined=False)
+    collector = CambriconCollector({"0": {"name": "MLU370-X8", "memory": "24"}}, 24576, cli=CommandCache(runner=fake))
+    result = {r["key"]: r["value"] for r in collector()}
+    assert fake.calls[0] == CNMON_QUERY
+    assert sorted(fake.calls[1:]) == [("cnmon", "info", flag) for flag in ("-e", "-m", "-p", "-u")]
+    assert result["__swanlab__.mlu.0.temp"] == 41
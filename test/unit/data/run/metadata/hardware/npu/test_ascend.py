@@ -1,11 +1,15 @@
+import math
+
 import pytest
 
+from swanlab.data.run.metadata.hardware.command import CommandCache
 from swanlab.data.run.metadata.hardware.npu.ascend import (
     AscendCollector,
     get_cann_version,
     get_chip_usage,
     get_version,
     map_npu,
+    parse_npu_smi_info,
 )
 
 try:
@@ -31,3 +35,111 @@ def test_ascend_collector():
     collector = AscendCollector(npu_map, hbm_value)
     collector()
     assert collector.collect_num == 1
+
+
+# 录制的 npu-smi info 输出，Atlas 800T A2（910B）
+NPU_SMI_INFO_910B = """
++------------------------------------------------------------------------------------------------+
+| npu-smi 23.0.rc2                 Version: 23.0.rc2                                             |
++---------------------------+---------------+----------------------------------------------------+
+| NPU   Name                | Health        | Power(W)    Temp(C)           Hugepages-Usage(page)|
+| Chip                      | Bus-Id        | AICore(%)   Memory-Usage(MB)  HBM-Usage(MB)        |
++===========================+===============+====================================================+
+| 0     910B3               | OK            | 88.4        42                0    / 0             |
+| 0                         | 0000:C1:00.0  | 35          0    / 0          16384/ 65536         |
++===========================+===============+====================================================+
+| 1     910B3               | OK            | 90.1        41                0    / 0             |
+| 0                         | 0000:C2:00.0  | 0           0    / 0          3375 / 65536         |
++===========================+===============+====================================================+
++---------------------------+---------------+----------------------------------------------------+
+| NPU     Chip              | Process id    | Process name             | Process memory(MB)      |
++===========================+===============+====================================================+
+| 0       0                 | 123456        | python                   | 13009                   |
++===========================+===============+====================================================+
+"""
+
+# 录制的 npu-smi info 输出，Atlas 300I Duo（310P），一个 NPU 包含两个芯片，功耗不可用
+NPU_SMI_INFO_310P = """
++--------------------------------------------------------------------------------------------------------+
+| npu-smi 23.0.0                                   Version: 23.0.0                                       |
++-------------------------------+-----------------+------------------------------------------------------+
+| NPU     Name                  | Health          | Power(W)     Temp(C)           Hugepages-Usage(page) |
+| Chip    Device                | Bus-Id          | AICore(%)    Memory-Usage(MB)                        |
++===============================+=================+======================================================+
+| 8       310P3                 | OK              | NA           45                0     / 0             |
+| 0       0                     | 0000:01:00.0    | 12           1402 / 21527                            |
+| 1       1                     | 0000:01:00.0    | 0            1296 / 21527                            |
++===============================+=================+======================================================+
+"""
+
+
+class FakeNpuSmi:
+    """
+    返回录制输出的 npu-smi，记录调用的命令
+    """
+
+    def __init__(self, info: str):
+        self.info = info
+        self.calls = []
+
+    def __call__(self, args):
+        self.calls.append(args)
+        if args == ("npu-smi", "info"):
+            return self.info
+        if "usages" in args:
+            return "Aicore Usage Rate(%)          : 20\nHBM Usage Rate(%)             : 50\n"
+        return "Current : 30\n"
+
+
+def test_parse_910b():
+    table = parse_npu_smi_info(NPU_SMI_INFO_910B)
+    assert table == {
+        ("0", "0"): {"power": 88.4, "temp": 42, "util": 35, "hbm_value": 16384, "hbm_rate": 25},
+        ("1", "0"): {"power": 90.1, "temp": 41, "util": 0, "hbm_value": 3375, "hbm_rate": 3375 / 65536 * 100},
+    }
+
+
+def test_parse_310p():
+    table = parse_npu_smi_info(NPU_SMI_INFO_310P)
+    assert list(table) == [("8", "0"), ("8", "1")]
+    assert math.isnan(table[("8", "1")]["power"])
+    assert table[("8", "1")]["temp"] == 45
+    assert table[("8", "0")]["util"] == 12
+    assert table[("8", "0")]["hbm_value"] == 1402
+
+
+def test_collect_once_per_tick():
+    """
+    每次采集只执行一次 npu-smi info
+    """
+    fake = FakeNpuSmi(NPU_SMI_INFO_910B)
+    chips = {"0": {"0": {"id": "0", "name": "910B3"}}, "1": {"0": {"id": "1", "name": "910B3"}}}
+    collector = AscendCollector(chips, 65536, cli=CommandCache(runner=fake))
+    for _ in range(3):
+        result = {r["key"]: r for r in collector()}
+    assert fake.calls == [("npu-smi", "info")] * 3
+    assert len(result) == 2 * 5
+    util = result["__swanlab__.npu.0-0.ptc"]
+    assert util["value"] == 35
+    assert util["name"] == "NPU 0-0 Utilization (%)"
+    assert util["config"].metric_name == "NPU 0-0"
+    assert result["__swanlab__.npu.1-0.mem.value"]["config"].y_range == (0, 65536)
+    assert result["__swanlab__.npu.0-0.mem.ptc"]["value"] == 25
+    assert result["__swanlab__.npu.1-0.power"]["value"] == 90.1
+
+
+def test_collect_fallback():
+    """
+    表格无法解析时逐项查询芯片信息
+    """
+    fake = FakeNpuSmi("unknown format")
+    collector = AscendCollector({"0": {"0": {"id": "0", "name": "910B3"}}}, 32768, cli=CommandCache(runner=fake))
+    result = {r["key"]: r["value"] for r in collector()}
+    assert len(fake.calls) == 4
+    assert result == {
+        "__swanlab__.npu.0-0.ptc": 20,
+        "__swanlab__.npu.0-0.mem.ptc": 50,
+        "__swanlab__.npu.0-0.mem.value": 16384,
+        "__swanlab__.npu.0-0.temp": 30,
+        "__swanlab__.npu.0-0.power": 30,
+    }
@@ -0,0 +1,156 @@
+"""
+@author: cunyue
+@file: test_cgroup.py
+@time: 2025/7/15 16:10
+@description: 测试 cgroup 资源限制与用量采集
+"""
+
+import os
+from types import SimpleNamespace
+from typing import Dict
+
+import pytest
+
+from swanlab.data.run.metadata.hardware import cgroup as C
+from swanlab.data.run.metadata.hardware.cgroup import CgroupCollector, detect_cgroup, get_cgroup_info, parse_pressure
+
+GB = 1 << 30
+
+
+def write(root, files: Dict[str, str]):
+    for path, content in files.items():
+        path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 原地覆盖文件内容，已经打开的文件描述符可以读到新的内容
+        with open(path, "w") as f:
+            f.write(content)
+
+
+@pytest.fixture
+def v2(tmp_path):
+    root = str(tmp_path)
+    write(
+        root,
+        {
+            "proc/self/cgroup": "0::/kubepods/pod1\n",
+            "sys/fs/cgroup/cgroup.controllers": "cpu memory\n",
+            "sys/fs/cgroup/kubepods/pod1/memory.max": f"{4 * GB}\n",
+            "sys/fs/cgroup/kubepods/pod1/memory.current": f"{3 * GB}\n",
+            "sys/fs/cgroup/kubepods/pod1/memory.stat": f"anon {2 * GB}\ninactive_file {GB}\n",
+            "sys/fs/cgroup/kubepods/pod1/memory.pressure": "some avg10=1.50 avg60=0.20 avg300=0.00 total=123\n"
+            "full avg10=0.50 avg60=0.00 avg300=0.00 total=45\n",
+            "sys/fs/cgroup/kubepods/pod1/cpu.max": "200000 100000\n",
+            "sys/fs/cgroup/kubepods/pod1/cpu.stat": "usage_usec 1000000\nnr_periods 100\nnr_throttled 10\n",
+        },
+    )
+    return root
+
+
+@pytest.fixture
+def v1(tmp_path):
+    root = str(tmp_path)
+    write(
+        root,
+        {
+            "proc/self/cgroup": "12:memory:/slurm/job1\n4:cpu,cpuacct:/slurm/job1\n1:name=systemd:/\n",
+            "sys/fs/cgroup/memory/slurm/job1/memory.limit_in_bytes": f"{8 * GB}\n",
+            "sys/fs/cgroup/memory/slurm/job1/memory.usage_in_bytes": f"{4 * GB}\n",
+            "sys/fs/cgroup/memory/slurm/job1/memory.stat": f"cache {GB}\ntotal_inactive_file {2 * GB}\n",
+            "sys/fs/cgroup/cpu,cpuacct/slurm/job1/cpu.cfs_quota_us": "-1\n",
+            "sys/fs/cgroup/cpu,cpuacct/slurm/job1/cpu.cfs_period_us": "100000\n",
+            "sys/fs/cgroup/cpu,cpuacct/slurm/job1/cpuacct.usage": "5000000000\n",
+            "sys/fs/cgroup/cpu,cpuacct/slurm/job1/cpu.stat": "nr_periods 0\nnr_throttled 0\nthrottled_time 0\n",
+        },
+    )
+    return root
+
+
+def test_parse_pressure():
+    assert parse_pressure("some avg10=12.34 avg60=0 avg300=0 total=1\n") == 12.34
+    assert parse_pressure("") is None
+
+
+def test_detect_v2(v2):
+    cgroup = detect_cgroup(v2)
+    assert cgroup.version == 2
+    assert cgroup.memory_dir.endswith(os.path.join("kubepods", "pod1"))
+    assert cgroup.memory_limit() == 4 * GB
+    assert cgroup.memory_usage() == 2 * GB
+    assert cgroup.memory_pressure() == 1.5
+    assert cgroup.cpu_limit() == 2
+    assert cgroup.cpu_usage() == 1
+    assert cgroup.cpu_throttling() == (100, 10)
+
+
+def test_detect_v1(v1):
+    cgroup = detect_cgroup(v1)
+    assert cgroup.version == 1
+    assert cgroup.cpu_dir == cgroup.cpuacct_dir
+    assert cgroup.memory_limit() == 8 * GB
+    assert cgroup.memory_usage() == 2 * GB
+    assert cgroup.memory_pressure() is None
+    assert cgroup.cpu_limit() is None
+    assert cgroup.cpu_usage() == 5
+    # 没有限制时的值
+    write(v1, {"sys/fs/cgroup/memory/slurm/job1/memory.limit_in_bytes": "9223372036854771712\n"})
+    assert cgroup.memory_limit() is None
+
+
+def test_detect_namespace(v2):
+    """
+    开启 cgroup 命名空间的容器中，/proc/self/cgroup 中的路径在挂载点下不存在，使用挂载点本身
+    """
+    write(v2, {"proc/self/cgroup": "0::/\n", "sys/fs/cgroup/memory.max": "max\n"})
+    cgroup = detect_cgroup(v2)
+    assert cgroup.memory_dir == os.path.join(v2, "sys", "fs", "cgroup")
+    assert cgroup.memory_limit() is None
+    assert detect_cgroup(os.path.join(v2, "not-exist")) is None
+
+
+def test_info(v2, monkeypatch):
+    monkeypatch.setattr(C.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(C.psutil, "cpu_count", lambda: 64)
+    monkeypatch.setattr(C.psutil, "virtual_memory", lambda: SimpleNamespace(total=256 * GB))
+    info, collector = get_cgroup_info(v2)
+    assert info == {"version": 2, "memory": "4", "cpu": 2}
+    assert collector.memory_limit == 4 * GB
+    # 限制不小于宿主机资源时不采集
+    write(v2, {"sys/fs/cgroup/kubepods/pod1/memory.max": "max\n", "sys/fs/cgroup/kubepods/pod1/cpu.max": "max\n"})
+    assert get_cgroup_info(v2) == (None, None)
+
+
+def test_collect(v2, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(C.time, "monotonic", lambda: now[0])
+    collector = CgroupCollector(detect_cgroup(v2), 4 * GB, 2)
+    result = {r["key"]: r for r in collector()}
+    # 第一次采集时没有 CPU 的差值
+    assert set(result) == {
+        "__swanlab__.cgroup.mem.value",
+        "__swanlab__.cgroup.mem.pct",
+        "__swanlab__.cgroup.mem.pressure",
+    }
+    assert result["__swanlab__.cgroup.mem.value"]["value"] == 2048
+    assert result["__swanlab__.cgroup.mem.value"]["config"].y_range == (0, 4096)
+    assert result["__swanlab__.cgroup.mem.pct"]["value"] == 50
+    assert result["__swanlab__.cgroup.mem.pct"]["name"] == "Cgroup Memory Utilization (%)"
+    # 2 秒内使用了 3 秒 CPU 时间，配额为 2 核，使用率 75%；20 个周期中 5 个被限流
+    now[0] += 2
+    write(v2, {"sys/fs/cgroup/kubepods/pod1/cpu.stat": "usage_usec 4000000\nnr_periods 120\nnr_throttled 15\n"})
+    result = {r["key"]: r["value"] for r in collector()}
+    assert result["__swanlab__.cgroup.cpu.pct"] == 75
+    assert result["__swanlab__.cgroup.cpu.throttled"] == 25
+
+
+def test_collect_reuses_files(v2, monkeypatch):
+    """
+    每个文件只打开一次
+    """
+    opened = []
+    origin_open = os.open
+    monkeypatch.setattr(C.os, "open", lambda path, flags: opened.append(path) or origin_open(path, flags))
+    collector = CgroupCollector(detect_cgroup(v2), 4 * GB, 2)
+    for _ in range(10):
+        collector()
+    assert len(opened) == len(set(opened)) == 4
+    collector.cgroup.close()
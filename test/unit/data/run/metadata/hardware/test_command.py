@@ -0,0 +1,29 @@
+"""
+@author: cunyue
+@file: test_command.py
+@time: 2025/7/14 10:40
+@description: 测试厂商命令行工具查询
+"""
+
+import sys
+
+from swanlab.data.run.metadata.hardware.command import CommandCache, run_command
+
+
+def test_cache():
+    calls = []
+    cli = CommandCache(runner=lambda args: calls.append(args) or " ".join(args))
+    assert cli.run("npu-smi", "info") == "npu-smi info"
+    assert cli.run("npu-smi", "info") == "npu-smi info"
+    assert cli.run("npu-smi", "info", "-m") == "npu-smi info -m"
+    assert len(calls) == 2
+    cli.clear()
+    cli.run("npu-smi", "info")
+    assert len(calls) == 3
+
+
+def test_run_command():
+    assert run_command([sys.executable, "-c", "print('ok')"], timeout=10) == "ok\n"
+    # 命令不存在或超时时返回空字符串
+    assert run_command(["swanlab-command-not-found"], timeout=10) == ""
+    assert run_command([sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.1) == ""
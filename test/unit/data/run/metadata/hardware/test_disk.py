@@ -1,7 +1,10 @@
+import os
 import time
+from types import SimpleNamespace
 
 import psutil
 
+from swanlab.data.run.metadata.hardware import disk
 from swanlab.data.run.metadata.hardware.disk import (
     DiskCollector,
 )
@@ -42,3 +45,40 @@ class TestDiskCollector:
         assert result['name'] == "Disk Utilization (%)"
         assert result['value'] >= 0
         assert result['config'].chart_name == 'Disk Utilization (%)'
+
+
+def test_per_disk(tmp_path, monkeypatch):
+    """
+    每块磁盘单独上报，分区与被排除的设备不上报
+    """
+    for name in ("nvme0n1", "nvme1n1", "loop0"):
+        os.makedirs(tmp_path / "block" / name)
+    counters = {
+        "nvme0n1": SimpleNamespace(read_bytes=0, write_bytes=0, busy_time=0),
+        "nvme0n1p1": SimpleNamespace(read_bytes=0, write_bytes=0, busy_time=0),
+        "nvme1n1": SimpleNamespace(read_bytes=0, write_bytes=0, busy_time=0),
+        "loop0": SimpleNamespace(read_bytes=0, write_bytes=0, busy_time=0),
+    }
+    monkeypatch.setattr(disk.psutil, "disk_io_counters", lambda perdisk=False: counters)
+    monkeypatch.setattr(disk.psutil, "LINUX", True)
+    collector = DiskCollector(sysfs=str(tmp_path))
+    counters["nvme0n1"] = SimpleNamespace(read_bytes=200 << 20, write_bytes=20 << 20, busy_time=1800)
+    counters["nvme0n1p1"] = SimpleNamespace(read_bytes=200 << 20, write_bytes=20 << 20, busy_time=1800)
+    counters["nvme1n1"] = SimpleNamespace(read_bytes=2 << 20, write_bytes=0, busy_time=20)
+    result = {r["key"]: r for r in collector.get_per_disk_speed(collector.last_time + 2)}
+    assert sorted(result) == [
+        "__swanlab__.disk.nvme0n1.busy",
+        "__swanlab__.disk.nvme0n1.read",
+        "__swanlab__.disk.nvme0n1.write",
+        "__swanlab__.disk.nvme1n1.busy",
+        "__swanlab__.disk.nvme1n1.read",
+        "__swanlab__.disk.nvme1n1.write",
+    ]
+    assert result["__swanlab__.disk.nvme0n1.read"]["value"] == 100
+    assert result["__swanlab__.disk.nvme0n1.write"]["value"] == 10
+    assert result["__swanlab__.disk.nvme0n1.busy"]["value"] == 90
+    assert result["__swanlab__.disk.nvme1n1.busy"]["value"] == 1
+    config = result["__swanlab__.disk.nvme1n1.read"]["config"]
+    assert config.chart_name == "Disk Read per Device (MB)"
+    assert config.metric_name == "nvme1n1"
+    assert config.chart_index == result["__swanlab__.disk.nvme0n1.read"]["config"].chart_index
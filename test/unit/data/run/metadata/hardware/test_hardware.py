@@ -0,0 +1,33 @@
+"""
+@author: cunyue
+@file: test_hardware.py
+@time: 2025/7/16 10:30
+@description: 测试硬件信息采集
+"""
+
+import threading
+
+from swanlab.data.run.metadata import hardware
+from swanlab.data.run.metadata.hardware import get_hardware_info
+
+
+def test_parallel(monkeypatch):
+    """
+    各个采集函数并行执行，采集结果与监控任务的顺序与采集函数的顺序一致
+    每个采集函数都等待其他采集函数开始执行，串行执行时屏障超时，采集失败
+    """
+    barrier = threading.Barrier(len(hardware.HARDWARE_FUNCS), timeout=10)
+
+    def probe(idx):
+        def func():
+            barrier.wait()
+            return f"info-{idx}", f"collector-{idx}" if idx % 2 == 0 else None
+
+        return func
+
+    funcs = [probe(idx) for idx in range(len(hardware.HARDWARE_FUNCS))]
+    monkeypatch.setattr(hardware, "HARDWARE_FUNCS", funcs)
+    info, monitor_funcs = get_hardware_info()
+    assert monitor_funcs == [f"collector-{idx}" for idx in range(0, len(funcs), 2)]
+    assert info["gpu"]["nvidia"] == "info-0"
+    assert info["network"] == f"info-{len(funcs) - 1}"
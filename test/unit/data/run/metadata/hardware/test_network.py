@@ -1,10 +1,15 @@
+import os
 import time
+from types import SimpleNamespace
 
 import psutil
 
+from swanlab.data.run.metadata.hardware import network
 from swanlab.data.run.metadata.hardware.network import (
     NetworkCollector,
+    read_infiniband_counters,
 )
+from swanlab.swanlab_settings import Settings, reset_settings, set_settings
 
 
 class TestNetworkCollector:
@@ -35,3 +40,60 @@ class TestNetworkCollector:
         assert result['name'] == "Network Traffic Received (KB)"
         assert result['value'] >= 0
         assert result['config'].chart_name == 'Network Traffic (KB)'
+
+
+def write_ib_counters(sysfs, device: str, port: str, xmit: int, rcv: int):
+    """
+    在 sysfs 中写入 RDMA 端口的计数器，单位为 4 字节
+    """
+    counters = os.path.join(sysfs, "class", "infiniband", device, "ports", port, "counters")
+    os.makedirs(counters, exist_ok=True)
+    for name, value in (("port_xmit_data", xmit), ("port_rcv_data", rcv)):
+        with open(os.path.join(counters, name), "w") as f:
+            f.write(f"{value}\n")
+
+
+def test_read_infiniband_counters(tmp_path):
+    assert read_infiniband_counters(str(tmp_path)) == {}
+    write_ib_counters(str(tmp_path), "mlx5_0", "1", 10, 20)
+    write_ib_counters(str(tmp_path), "mlx5_1", "1", 1, 2)
+    os.makedirs(tmp_path / "class" / "infiniband" / "mlx5_2" / "ports" / "1")
+    assert read_infiniband_counters(str(tmp_path)) == {"mlx5_0-1": (40, 80), "mlx5_1-1": (4, 8)}
+
+
+def test_per_device(tmp_path, monkeypatch):
+    """
+    每个网卡与 RDMA 端口单独上报，按照配置筛选设备
+    """
+    sysfs = str(tmp_path)
+    nics = {
+        "lo": SimpleNamespace(bytes_sent=0, bytes_recv=0),
+        "eth0": SimpleNamespace(bytes_sent=0, bytes_recv=0),
+        "ib0": SimpleNamespace(bytes_sent=0, bytes_recv=0),
+    }
+    monkeypatch.setattr(network.psutil, "net_io_counters", lambda pernic=False: nics)
+    write_ib_counters(sysfs, "mlx5_0", "1", 0, 0)
+    write_ib_counters(sysfs, "mlx5_1", "1", 0, 0)
+    set_settings(Settings(hardware_device_include=["ib*", "mlx5_0", "eth*"], hardware_device_exclude=["eth*"]))
+    try:
+        collector = NetworkCollector(sysfs=sysfs)
+    finally:
+        reset_settings()
+    nics["ib0"] = SimpleNamespace(bytes_sent=4096, bytes_recv=2048)
+    write_ib_counters(sysfs, "mlx5_0", "1", 25 << 20, 50 << 20)
+    write_ib_counters(sysfs, "mlx5_1", "1", 25 << 20, 50 << 20)
+    result = {r["key"]: r for r in collector.get_per_device_speed(collector.last_time + 2)}
+    assert {k: r["value"] for k, r in result.items()} == {
+        "__swanlab__.network.ib0.sent": 2,
+        "__swanlab__.network.ib0.recv": 1,
+        "__swanlab__.rdma.mlx5_0-1.sent": 50,
+        "__swanlab__.rdma.mlx5_0-1.recv": 100,
+    }
+    rdma = result["__swanlab__.rdma.mlx5_0-1.recv"]
+    assert rdma["name"] == "RDMA mlx5_0-1 Traffic Received (MB)"
+    assert rdma["config"].chart_name == "RDMA Traffic Received (MB)"
+    assert rdma["config"].metric_name == "mlx5_0-1"
+    # 计数器重置时不会出现负数
+    write_ib_counters(sysfs, "mlx5_0", "1", 0, 0)
+    result = {r["key"]: r["value"] for r in collector.get_per_device_speed(collector.last_time + 3)}
+    assert result["__swanlab__.rdma.mlx5_0-1.sent"] == 0
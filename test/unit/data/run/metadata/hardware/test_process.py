@@ -0,0 +1,72 @@
+"""
+@author: cunyue
+@file: test_process.py
+@time: 2025/7/15 10:40
+@description: 测试训练进程树
+"""
+
+import os
+import subprocess
+import sys
+
+from swanlab.data.run.metadata.hardware.cpu import CpuCollector
+from swanlab.data.run.metadata.hardware.memory import MemoryCollector
+from swanlab.data.run.metadata.hardware.process import ProcessTree, get_root_pid, set_root_pid
+from swanlab.data.run.metadata.hardware.soc.apple import AppleChipCollector
+
+
+def sleep_process():
+    return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+
+
+def test_tree():
+    tree = ProcessTree(refresh_interval=3600)
+    assert tree.root_pid == get_root_pid() == os.getpid()
+    assert os.getpid() in tree.pids()
+    child = sleep_process()
+    try:
+        # 缓存未过期，不会发现新的子进程
+        assert child.pid not in tree.pids()
+        tree.refresh()
+        assert child.pid in tree.pids()
+    finally:
+        child.kill()
+        child.wait()
+    tree.refresh()
+    assert child.pid not in tree.pids()
+
+
+def test_refresh_interval():
+    tree = ProcessTree(refresh_interval=0)
+    tree.pids()
+    child = sleep_process()
+    try:
+        assert child.pid in tree.pids()
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_root_exited():
+    child = sleep_process()
+    tree = ProcessTree(root_pid=child.pid)
+    assert tree.pids() == {child.pid}
+    child.kill()
+    child.wait()
+    tree.refresh()
+    assert tree.pids() == set()
+
+
+def test_collectors_use_root_pid():
+    """
+    监控子进程中设置训练进程的 PID 后，进程级指标统计的是训练进程而不是当前进程
+    """
+    child = sleep_process()
+    set_root_pid(child.pid)
+    try:
+        for collector in (MemoryCollector(), CpuCollector(), AppleChipCollector()):
+            assert collector.current_process.pid == child.pid
+    finally:
+        set_root_pid(os.getpid())
+        child.kill()
+        child.wait()
@@ -0,0 +1,82 @@
+"""
+@author: cunyue
+@file: test_sampler.py
+@time: 2025/7/13 11:20
+@description: 测试硬件信息高频采样
+"""
+
+import time
+
+from swanlab.data.run.metadata.hardware.sampler import AGGREGATES, HardwareSampler, percentile
+from swanlab.data.run.metadata.hardware.type import HardwareCollector, HardwareConfig, HardwareInfoList
+
+
+class FakeCollector(HardwareCollector):
+    def __init__(self, values):
+        super().__init__()
+        self.values = iter(values)
+        self.config = HardwareConfig(chart_name="GPU Utilization (%)", chart_index="abc").clone(metric_name="GPU 0")
+        self.inited = 0
+
+    def before_collect_impl(self):
+        self.inited += 1
+
+    def collect(self) -> HardwareInfoList:
+        return [
+            {"key": "gpu.0.pct", "name": "GPU 0 Utilization (%)", "value": next(self.values), "config": self.config},
+            {"key": "gpu.0.name", "name": "GPU 0 Name", "value": "A100", "config": None},
+        ]
+
+
+def test_percentile():
+    assert percentile([1], 95) == 1
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile(list(range(1, 101)), 50) == 50
+
+
+def test_aggregate():
+    collector = FakeCollector([100, 100, 0, 100, 50])
+    sampler = HardwareSampler(collector, sample_interval=0.01, report_interval=3600, aggregates=AGGREGATES)
+    for _ in range(5):
+        assert sampler() == []
+    result = {r["key"]: r for r in sampler.aggregate()}
+    assert result["gpu.0.pct"]["value"] == 70
+    assert result["gpu.0.pct.min"]["value"] == 0
+    assert result["gpu.0.pct.max"]["value"] == 100
+    assert result["gpu.0.pct.p95"]["value"] == 100
+    assert result["gpu.0.pct.min"]["name"] == "GPU 0 Utilization (%) [min]"
+    assert result["gpu.0.name"]["value"] == "A100"
+    assert "gpu.0.name.max" not in result
+    # 聚合结果显示在单独的图表中，图例与颜色与原指标一致，配置只生成一次
+    config = result["gpu.0.pct.max"]["config"]
+    assert config.chart_name == "GPU Utilization (%) [max]"
+    assert config.chart_index == "abc-max"
+    assert config.metric_name == "GPU 0"
+    assert config.metric_color == collector.config.metric_color
+    # 常驻模式下只初始化一次
+    assert collector.inited == 1
+    assert sampler.report_num == 1
+
+
+def test_mean_only():
+    """
+    默认只上报平均值
+    """
+    sampler = HardwareSampler(FakeCollector([100, 0]), sample_interval=0.01, report_interval=3600)
+    sampler()
+    sampler()
+    result = {r["key"]: r["value"] for r in sampler.aggregate()}
+    assert result == {"gpu.0.pct": 50, "gpu.0.name": "A100"}
+
+
+def test_report_window():
+    sampler = HardwareSampler(FakeCollector(range(100)), sample_interval=0.01, report_interval=0.05)
+    reports = []
+    for _ in range(20):
+        result = sampler()
+        if result:
+            reports.append(result)
+        time.sleep(0.01)
+    assert 2 <= len(reports) <= 4
+    assert sampler.interval == 0.01
+    assert sampler.timeout == 10
@@ -5,7 +5,18 @@
 @description: 测试硬件信息采集工具
 """
 
-from swanlab.data.run.metadata.hardware.utils import random_index, CpuBaseCollector, generate_key
+import time
+
+from swanlab.data.run.metadata.hardware import utils
+from swanlab.data.run.metadata.hardware.cpu import CpuCollector
+from swanlab.data.run.metadata.hardware.memory import MemoryCollector
+from swanlab.data.run.metadata.hardware.utils import (
+    random_index,
+    CpuBaseCollector,
+    CounterDelta,
+    DeviceFilter,
+    generate_key,
+)
 
 
 def test_random_index():
@@ -22,9 +33,32 @@ def test_generate_key():
     assert s == "__swanlab__.test"
 
 
+def test_device_filter(monkeypatch):
+    f = DeviceFilter(exclude=["lo", "veth*"])
+    assert f("eth0") and f("nvme0n1")
+    assert not f("lo") and not f("veth1234")
+    f = DeviceFilter(include=["nvme*", "veth*"], exclude=["veth*"])
+    assert f("nvme0n1")
+    assert not f("sda") and not f("veth0")
+    # 超出数量上限的新设备不再上报，已经上报的设备不受影响
+    monkeypatch.setattr(DeviceFilter, "MAX_DEVICES", 2)
+    f = DeviceFilter()
+    assert f("a") and f("b") and not f("c") and f("a")
+
+
+def test_counter_delta():
+    delta = CounterDelta()
+    assert delta({"a": (0, 10)}, 100) == {}
+    assert delta({"a": (20, 5), "b": (1, 1)}, 102) == {"a": [10, 0]}
+    assert delta({"a": (40, 5), "b": (3, 5)}, 104) == {"a": [10, 0], "b": [1, 2]}
+    # 时间没有前进时不计算
+    assert delta({"a": (40, 5)}, 104) == {}
+
+
 def test_cpu_usage():
     c = CpuBaseCollector()
-    usage = c.get_cpu_usage()
+    c.get_cpu_percents()
+    usage = c.get_cpu_usage(c.get_cpu_percents())
     assert usage is not None
     assert 0 <= usage["value"] <= 100
     assert usage["key"].endswith("cpu.pct")
@@ -36,7 +70,9 @@ def test_cpu_usage():
 
 def test_per_cpu_usage():
     c = CpuBaseCollector()
-    usage = c.get_per_cpu_usage()
+    c.get_cpu_percents()
+    usage = c.get_per_cpu_usage(c.get_cpu_percents())
+    assert len(usage) > 0
     assert usage is not None
     for idx, u in enumerate(usage):
         assert 0 <= u["value"] <= 100
@@ -46,3 +82,49 @@ def test_per_cpu_usage():
         assert u["config"].chart_name == f"CPU Utilization (per core) (%)"
         # 每个核心的index应该相同,因为必须要放在同一个图表中
         assert u["config"].metric_name == f"CPU {idx}"
+
+
+def test_cpu_delta(tmp_path, monkeypatch):
+    """
+    CPU 使用率为两次采集之间的差值，汇总值与每个核心的值来自同一次读取
+    """
+    stat = tmp_path / "stat"
+    monkeypatch.setattr(utils, "PROC_STAT", str(stat))
+    stat.write_text(
+        "cpu  100 0 100 800 0 0 0 0 0 0\ncpu0 50 0 50 400 0 0 0 0 0 0\ncpu1 50 0 50 400 0 0 0 0 0 0\nintr 1\n"
+    )
+    reads = []
+    read_cpu_times = utils.read_cpu_times
+    monkeypatch.setattr(utils, "read_cpu_times", lambda: reads.append(1) or read_cpu_times())
+    c = CpuBaseCollector()
+    # 第一次采集没有可以比较的值，不上报使用率
+    percents = c.get_cpu_percents()
+    assert percents is None
+    assert c.get_cpu_usage(percents) is None
+    assert c.get_per_cpu_usage(percents) == []
+    stat.write_text(
+        "cpu  250 0 100 850 0 0 0 0 0 0\ncpu0 200 0 50 400 0 0 0 0 0 0\ncpu1 50 0 50 450 0 0 0 0 0 0\nintr 1\n"
+    )
+    percents = c.get_cpu_percents()
+    assert percents == [75, 100, 0]
+    # 汇总值与每个核心的使用率来自同一次读取
+    assert c.get_cpu_usage(percents)["value"] == 75
+    assert [u["value"] for u in c.get_per_cpu_usage(percents)] == [100, 0][: len(utils.CPU_INDEX_PER_CONFIGS)]
+    assert len(reads) == 2
+    assert c.get_cpu_percents() == [0, 0, 0]
+
+
+def test_cpu_collector():
+    """
+    CPU 使用率不阻塞采集线程，从第二次采集开始上报
+    以前每次采集调用两次 cpu_percent(interval=1)，至少阻塞 2 秒，现在只读取一次 /proc/stat
+    """
+    collector = CpuCollector()
+    start = time.perf_counter()
+    assert utils.CPU_PCT_KEY not in {r["key"] for r in collector()}
+    result = {r["key"]: r for r in collector()}
+    # 两次采集的总耗时远小于以前单次采集的阻塞时间，留出足够余量避免受机器负载影响
+    assert time.perf_counter() - start < 0.5
+    assert 0 <= result[utils.CPU_PCT_KEY]["value"] <= 100
+    # 内存采集器不受影响
+    assert MemoryCollector()()
@@ -0,0 +1,155 @@
+"""
+@author: cunyue
+@file: test_git.py
+@time: 2025/7/16 17:30
+@description: 测试直接读取 .git 目录获取 git 信息
+"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from swanlab.data.run.metadata import runtime
+from swanlab.data.run.metadata.git import GitReadError, find_git_repo, get_git_diff, parse_config
+
+SHA1 = "a" * 40
+SHA2 = "b" * 40
+
+has_git = shutil.which("git") is not None
+
+
+def make_git_dir(path, head="ref: refs/heads/main\n", config=""):
+    git_dir = path / ".git"
+    (git_dir / "refs" / "heads").mkdir(parents=True)
+    (git_dir / "HEAD").write_text(head)
+    (git_dir / "config").write_text(config)
+    return git_dir
+
+
+def run_git(cwd, *args):
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "swanlab",
+        "GIT_AUTHOR_EMAIL": "swanlab@example.com",
+        "GIT_COMMITTER_NAME": "swanlab",
+        "GIT_COMMITTER_EMAIL": "swanlab@example.com",
+    }
+    env.pop("GIT_DIR", None)
+    return subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture(autouse=True)
+def no_git_env(monkeypatch):
+    monkeypatch.delenv("GIT_DIR", raising=False)
+    monkeypatch.delenv("GIT_WORK_TREE", raising=False)
+
+
+def test_parse_config():
+    config = parse_config("""
+# comment
+[core]
+    bare = false
+    filemode
+[remote "origin"]
+    url = "git@github.com:swanhubx/swanlab.git" ; comment
+    fetch = +refs/heads/*:refs/remotes/origin/*
+[Remote "Upstream"] url = https://github.com/swanhubx/swanlab.git
+[branch.Main]
+    remote = origin
+""")
+    assert config["core.bare"] == "false"
+    assert config["core.filemode"] == "true"
+    assert config["remote.origin.url"] == "git@github.com:swanhubx/swanlab.git"
+    assert config["remote.Upstream.url"] == "https://github.com/swanhubx/swanlab.git"
+    assert config["branch.main.remote"] == "origin"
+
+
+def test_loose_ref(tmp_path):
+    git_dir = make_git_dir(tmp_path, config='[remote "origin"]\n\turl = git@github.com:swanhubx/swanlab.git\n')
+    (git_dir / "refs" / "heads" / "main").write_text(SHA1 + "\n")
+    (tmp_path / "sub" / "dir").mkdir(parents=True)
+    repo = find_git_repo(str(tmp_path / "sub" / "dir"))
+    assert repo.work_tree == str(tmp_path)
+    assert repo.head() == ("main", SHA1)
+    assert repo.remote_url() == "git@github.com:swanhubx/swanlab.git"
+
+
+def test_packed_ref(tmp_path):
+    git_dir = make_git_dir(tmp_path, head="ref: refs/heads/feat/x\n")
+    (git_dir / "packed-refs").write_text(
+        f"# pack-refs with: peeled fully-peeled sorted\n{SHA1} refs/heads/main\n{SHA2} refs/heads/feat/x\n^{SHA1}\n"
+    )
+    assert find_git_repo(str(tmp_path)).head() == ("feat/x", SHA2)
+    # 松散引用优先于 packed-refs
+    (git_dir / "refs" / "heads" / "feat").mkdir()
+    (git_dir / "refs" / "heads" / "feat" / "x").write_text(SHA1)
+    assert find_git_repo(str(tmp_path)).head() == ("feat/x", SHA1)
+
+
+def test_detached_and_unborn(tmp_path):
+    make_git_dir(tmp_path, head=SHA1 + "\n")
+    assert find_git_repo(str(tmp_path)).head() == (None, SHA1)
+    (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    assert find_git_repo(str(tmp_path)).head() == ("main", None)
+
+
+def test_worktree(tmp_path):
+    main_dir = make_git_dir(tmp_path / "main", config='[remote "origin"]\n\turl = https://example.com/a.git\n')
+    (main_dir / "refs" / "heads" / "dev").write_text(SHA2)
+    worktree_git_dir = main_dir / "worktrees" / "dev"
+    worktree_git_dir.mkdir(parents=True)
+    (worktree_git_dir / "HEAD").write_text("ref: refs/heads/dev\n")
+    (worktree_git_dir / "commondir").write_text("../..\n")
+    (tmp_path / "dev").mkdir()
+    (tmp_path / "dev" / ".git").write_text("gitdir: ../main/.git/worktrees/dev\n")
+    repo = find_git_repo(str(tmp_path / "dev"))
+    assert repo.head() == ("dev", SHA2)
+    assert repo.remote_url() == "https://example.com/a.git"
+
+
+def test_not_found(tmp_path, monkeypatch):
+    monkeypatch.setattr(os.path, "isfile", lambda p: False)
+    assert find_git_repo(str(tmp_path)) is None
+
+
+def test_fallback(tmp_path, monkeypatch):
+    """
+    不支持的仓库格式回退到 git 命令
+    """
+    make_git_dir(tmp_path, config="[extensions]\n\trefStorage = reftable\n")
+    with pytest.raises(GitReadError):
+        find_git_repo(str(tmp_path)).remote_url()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(runtime, "get_remote_url", lambda: "remote")
+    monkeypatch.setattr(runtime, "get_git_branch_and_commit", lambda: ("main", SHA1))
+    assert runtime.get_git_info() == {"git_remote": "remote", "git_info": ("main", SHA1)}
+
+
+@pytest.mark.skipif(not has_git, reason="git not found")
+def test_same_as_git(tmp_path, monkeypatch):
+    run_git(tmp_path, "init", "-q", "-b", "main")
+    run_git(tmp_path, "remote", "add", "origin", "git@github.com:swanhubx/swanlab.git")
+    (tmp_path / "a.txt").write_text("a\n")
+    run_git(tmp_path, "add", "a.txt")
+    run_git(tmp_path, "commit", "-q", "-m", "init")
+    run_git(tmp_path, "pack-refs", "--all")
+    monkeypatch.chdir(tmp_path)
+    info = runtime.get_git_info()
+    assert info["git_remote"] == "https://github.com/swanhubx/swanlab"
+    assert info["git_info"] == ("main", run_git(tmp_path, "rev-parse", "HEAD"))
+
+
+@pytest.mark.skipif(not has_git, reason="git not found")
+def test_git_diff(tmp_path):
+    run_git(tmp_path, "init", "-q")
+    (tmp_path / "a.txt").write_text("a\n")
+    run_git(tmp_path, "add", "a.txt")
+    run_git(tmp_path, "commit", "-q", "-m", "init")
+    assert get_git_diff(str(tmp_path), 1024) == ("", False)
+    (tmp_path / "a.txt").write_text("b\n" * 1000)
+    diff, truncated = get_git_diff(str(tmp_path), 1 << 20)
+    assert diff.startswith("diff --git a/a.txt b/a.txt") and not truncated
+    diff, truncated = get_git_diff(str(tmp_path), 100)
+    assert len(diff) == 100 and truncated
@@ -5,7 +5,11 @@
 @description: 测试获取python依赖
 """
 
-from swanlab.data.run.metadata.requirements import get_requirements
+import os
+import sys
+
+from swanlab.data.run.metadata import requirements
+from swanlab.data.run.metadata.requirements import freeze, get_cached_requirements, get_requirements
 
 
 def test_get_requirements():
@@ -16,3 +20,56 @@ def test_get_requirements():
     requirements = get_requirements()
     assert requirements is not None
     assert isinstance(requirements, str)
+
+
+def test_freeze():
+    """
+    进程内生成的依赖列表与 pip list --format=freeze 格式一致
+    """
+    lines = freeze().splitlines()
+    names = [line.split("==")[0] for line in lines]
+    assert all("==" in line for line in lines)
+    assert "swankit" in [name.lower() for name in names]
+    # 按名称排序，没有重复
+    normalized = [name.lower().replace("_", "-").replace(".", "-") for name in names]
+    assert normalized == sorted(normalized)
+    assert len(set(normalized)) == len(normalized)
+
+
+def test_cache(tmp_path, monkeypatch):
+    """
+    同一环境中只生成一次依赖列表，环境变化时缓存失效
+    """
+    calls = []
+
+    def fake_freeze():
+        calls.append(1)
+        return f"swanlab=={len(calls)}\n"
+
+    monkeypatch.setattr(requirements, "freeze", fake_freeze)
+    site_dir = tmp_path / "site-packages"
+    site_dir.mkdir()
+    monkeypatch.setattr(sys, "path", [*sys.path, str(site_dir)])
+    cache_dir = str(tmp_path / "cache")
+    assert get_cached_requirements(cache_dir) == "swanlab==1\n"
+    assert get_cached_requirements(cache_dir) == "swanlab==1\n"
+    assert len(calls) == 1
+    assert len(os.listdir(cache_dir)) == 1
+    # 安装新的包后 site-packages 的修改时间发生变化
+    (site_dir / "swanlab-2.dist-info").mkdir()
+    os.utime(site_dir, ns=(0, 0))
+    assert get_cached_requirements(cache_dir) == "swanlab==2\n"
+    assert len(calls) == 2
+
+
+def test_prune_cache(tmp_path):
+    """
+    只保留最新的缓存文件
+    """
+    for idx in range(5):
+        path = tmp_path / f"{idx}.txt"
+        path.write_text("swanlab\n")
+        os.utime(path, ns=(idx, idx))
+    (tmp_path / "other.tmp").write_text("")
+    requirements.prune_cache(str(tmp_path), keep=2)
+    assert sorted(os.listdir(tmp_path)) == ["3.txt", "4.txt", "other.tmp"]
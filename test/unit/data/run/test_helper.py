@@ -5,7 +5,16 @@
 @description: 测试工具函数
 """
 
-from swanlab.data.run.helper import check_log_level
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from concurrent.futures import Future
+
+import swanlab
+from swanlab.data.run.helper import check_log_level, MonitorCron, MonitorProcess
+from swanlab.swanlab_settings import Settings, get_settings, reset_settings, set_settings
 
 
 def test_check_log_level():
@@ -17,3 +26,148 @@ def test_check_log_level():
     assert check_log_level("critical") == "critical"
     assert check_log_level("not_exist") == "info"
     assert check_log_level("INFO") == "info"
+
+
+class FakeCollector:
+    def __init__(self, name: str, interval: float, cost: float = 0, timeout: float = None):
+        self.name = name
+        self.interval = interval
+        self.timeout = timeout
+        self.cost = cost
+
+    def __call__(self):
+        time.sleep(self.cost)
+        return self.name
+
+    def __repr__(self):
+        return self.name
+
+
+class TestMonitorCron:
+    @staticmethod
+    def run(collectors, seconds: float):
+        results = []
+        cron = MonitorCron(collectors, results.append)
+        time.sleep(seconds)
+        cron.cancel()
+        return cron, results
+
+    def test_interval(self):
+        """
+        每个采集任务按照各自的间隔执行
+        """
+        cron, results = self.run([FakeCollector("fast", 0.05), FakeCollector("slow", 0.25)], 0.6)
+        assert 8 <= results.count("fast") <= 14
+        assert 2 <= results.count("slow") <= 4
+        assert cron.overruns == 0
+
+    def test_slow_collector(self):
+        """
+        缓慢的采集任务不会推迟其他任务，上一次采集未完成时跳过并计数
+        """
+        cron, results = self.run([FakeCollector("fast", 0.05), FakeCollector("stuck", 0.05, cost=0.5, timeout=1)], 0.6)
+        assert results.count("fast") >= 8
+        assert results.count("stuck") == 1
+        assert cron.tasks[1].overruns >= 5
+        assert cron.tasks[0].overruns == 0
+
+    def test_timeout(self):
+        """
+        超时的采集结果被丢弃
+        """
+        cron, results = self.run([FakeCollector("late", 1, cost=0.2, timeout=0.1)], 0.4)
+        assert results == []
+        assert cron.timeouts == 1
+
+    def test_cancel(self):
+        cron, results = self.run([FakeCollector("fast", 0.01)], 0.1)
+        count = len(results)
+        time.sleep(0.1)
+        assert len(results) == count
+        assert not getattr(cron, "_thread").is_alive()
+
+    def test_cancelled_future(self):
+        """
+        线程池关闭时被取消的采集任务直接忽略
+        """
+        cron, results = self.run([FakeCollector("slow", 60)], 0)
+        count = len(results)
+        future = Future()
+        assert future.cancel()
+        getattr(cron, "_done")(cron.tasks[0], future)
+        assert len(results) == count
+
+
+def fake_monitor_factory():
+    """
+    在监控子进程中创建采集任务，采集结果为子进程中的采集间隔设置，用于验证配置被传递到子进程
+    """
+    return [FakeCollector(f"interval={get_settings().hardware_interval}", 0.05)]
+
+
+class TestMonitorProcess:
+    @staticmethod
+    def wait(results, count: int, timeout: float = 60):
+        # 子进程需要重新导入 swanlab，启动较慢
+        start = time.time()
+        while len(results) < count and time.time() - start < timeout:
+            time.sleep(0.05)
+
+    def test_stream(self):
+        set_settings(Settings(hardware_interval=7))
+        try:
+            results = []
+            monitor = MonitorProcess(results.append, factory=fake_monitor_factory)
+        finally:
+            reset_settings()
+        self.wait(results, 5)
+        monitor.cancel()
+        assert len(results) >= 5
+        assert set(results) == {"interval=7"}
+        assert monitor.count == len(results)
+        assert getattr(monitor, "_process").returncode == 0
+        assert not getattr(monitor, "_thread").is_alive()
+        # 停止后不再处理采集结果
+        count = len(results)
+        time.sleep(0.2)
+        assert len(results) == count
+
+    def test_unguarded_script(self, tmp_path):
+        """
+        没有 if __name__ == "__main__" 保护的脚本只执行一次，监控子进程不会重新导入主模块
+        """
+        marker = tmp_path / "marker.txt"
+        (tmp_path / "unguarded_factory.py").write_text(textwrap.dedent("""
+                class Collector:
+                    interval = 0.05
+                    timeout = None
+
+                    def __call__(self):
+                        return "ok"
+
+
+                def factory():
+                    return [Collector()]
+                """))
+        script = tmp_path / "unguarded.py"
+        script.write_text(textwrap.dedent(f"""
+                import time
+                from swanlab.data.run.helper import MonitorProcess
+                from unguarded_factory import factory
+
+                with open({str(marker)!r}, "a") as f:
+                    f.write("run\\n")
+                results = []
+                monitor = MonitorProcess(results.append, factory=factory)
+                start = time.time()
+                while len(results) < 3 and time.time() - start < 60:
+                    time.sleep(0.05)
+                monitor.cancel()
+                print(len(results) >= 3, set(results) == {{"ok"}}, monitor._process.returncode)
+                """))
+        root = os.path.dirname(os.path.dirname(swanlab.__file__))
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join([root, os.environ.get("PYTHONPATH", "")])}
+        result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, env=env, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ["True", "True", "0"]
+        assert marker.read_text().splitlines() == ["run"]
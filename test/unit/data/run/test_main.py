@@ -7,21 +7,26 @@ r"""
 @Description:
     测试SwanLabRun主类
 """
+
 import io
 import json
 import math
 import os
+import threading
 
 import numpy as np
 import pytest
 import soundfile as sf
 from PIL import Image as PILImage
 from nanoid import generate
+from swankit.callback import SwanKitCallback
 
 import swanlab
 import tutils as T
 from swanlab import Image, Audio, Text, SwanLabEnv
 from swanlab.data.modules import Line
+from swanlab.data.run import main
+from swanlab.data.run.helper import SwanLabRunOperator
 from swanlab.data.run.main import SwanLabRun, get_run, SwanLabRunState, swanlog, get_url, get_project_url
 from tutils import TEMP_PATH
 
@@ -68,6 +73,74 @@ class TestSwanLabRunInit:
         assert swanlog.proxied is False
 
 
+class RuntimeInfoRecorder(SwanKitCallback):
+    def __init__(self):
+        self.infos = []
+
+    def on_runtime_info_update(self, r, *args, **kwargs):
+        self.infos.append(r)
+
+    def __str__(self):
+        return "RuntimeInfoRecorder"
+
+
+class TestSwanLabRunRuntimeInfo:
+    """
+    系统信息在后台采集，不阻塞实验初始化
+    """
+
+    @staticmethod
+    def setup_method():
+        os.environ[SwanLabEnv.MODE.value] = "disabled"
+
+    def test_init_latency(self, monkeypatch):
+        """
+        依赖采集要等到初始化返回之后才能完成，如果初始化阻塞等待采集，采集会超时，依赖不会被上传
+        """
+        release = threading.Event()
+
+        def slow_requirements():
+            return "swanlab" if release.wait(10) else None
+
+        monkeypatch.setattr(main, "get_requirements", slow_requirements)
+        recorder = RuntimeInfoRecorder()
+        run = SwanLabRun(generate(), operator=SwanLabRunOperator(recorder))
+        assert not any(info.requirements for info in recorder.infos)
+        release.set()
+        # 结束实验时等待采集完成，运行时信息照常上传
+        run.finish()
+        assert [info.requirements.info for info in recorder.infos if info.requirements] == ["swanlab"]
+        assert any(info.metadata for info in recorder.infos)
+
+    def test_collect_error(self, monkeypatch):
+        """
+        采集失败时只跳过对应的信息
+        """
+
+        def broken_requirements():
+            raise RuntimeError("pip is broken")
+
+        monkeypatch.setattr(main, "get_requirements", broken_requirements)
+        recorder = RuntimeInfoRecorder()
+        SwanLabRun(generate(), operator=SwanLabRunOperator(recorder)).finish()
+        info = next(info for info in recorder.infos if info.metadata)
+        assert info.requirements is None
+
+    def test_git_diff(self, monkeypatch):
+        """
+        git diff 采集完成后再次更新元信息
+        """
+        monkeypatch.setattr(main, "get_git_diff_info", lambda: {"git_dirty": True, "git_diff": "diff"})
+        recorder = RuntimeInfoRecorder()
+        SwanLabRun(generate(), operator=SwanLabRunOperator(recorder)).finish()
+        metadata = [info.metadata.to_dict() for info in recorder.infos if info.metadata]
+        assert len(metadata) == 2
+        assert "git_dirty" not in metadata[0]
+        assert metadata[1]["git_dirty"] is True
+        assert metadata[1]["git_diff"] == "diff"
+        assert metadata[1]["swanlab"] == metadata[0]["swanlab"]
+
+
 class TestSwanLabRunState:
     """
     测试SwanLabRun的状态变化
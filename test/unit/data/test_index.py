@@ -0,0 +1,77 @@
+"""
+@author: cunyue
+@file: test_index.py
+@time: 2025/7/10 15:12
+@description: 测试本地实验索引
+"""
+
+import math
+import os
+
+import pytest
+
+import tutils as T
+from swanlab.data.index import IndexWriter, index_path, merge_summary, best_runs, list_runs
+
+
+def test_merge_summary():
+    summary = None
+    for step, value in enumerate([1, 3, "NaN", 2, "INF"]):
+        summary = merge_summary(summary, step, value)
+    assert summary["num"] == 5
+    assert summary["max"] == 3 and summary["max_step"] == 1
+    assert summary["min"] == 1 and summary["min_step"] == 0
+    assert math.isinf(summary["last"]) and summary["last_step"] == 4
+
+
+def write_runs(project: str, accs: list):
+    index = IndexWriter(index_path(T.TEMP_PATH), flush_interval=0.01)
+    for i, acc in enumerate(accs):
+        run_dir = os.path.join(T.TEMP_PATH, f"{project}-{i}")
+        index.upsert_run(run_dir, run_id=f"{project}-{i}", project=project, state="RUNNING", create_time=str(i))
+        index.add_column(run_dir, "val/acc", "0", "FLOAT", "CUSTOM")
+        summary = None
+        for step in range(10):
+            summary = merge_summary(summary, step, acc * step / 9)
+            index.update_summary(run_dir, "val/acc", summary)
+        index.upsert_run(run_dir, state="FINISHED")
+    index.close()
+
+
+def test_best_runs():
+    write_runs("a", [0.5, 0.9, 0.7])
+    write_runs("b", [0.95])
+    best = best_runs("val/acc", project="a", swanlog_dir=T.TEMP_PATH)
+    assert len(best) == 1
+    assert best[0]["run_id"] == "a-1"
+    assert best[0]["value"] == pytest.approx(0.9) and best[0]["step"] == 9
+    # 更新实验状态时没有覆盖其他字段
+    assert best[0]["state"] == "FINISHED" and best[0]["project"] == "a"
+    # 跨项目查询
+    assert [r["run_id"] for r in best_runs("val/acc", limit=2, swanlog_dir=T.TEMP_PATH)] == ["b-0", "a-1"]
+    worst = best_runs("val/acc", mode="min", swanlog_dir=T.TEMP_PATH)
+    assert worst[0]["value"] == 0
+    assert best_runs("val/loss", swanlog_dir=T.TEMP_PATH) == []
+    with pytest.raises(AssertionError):
+        best_runs("val/acc", mode="mean", swanlog_dir=T.TEMP_PATH)
+
+
+def test_list_runs():
+    write_runs("a", [0.5, 0.9])
+    write_runs("b", [0.95])
+    assert [r["run_id"] for r in list_runs(project="a", swanlog_dir=T.TEMP_PATH)] == ["a-0", "a-1"]
+    assert len(list_runs(swanlog_dir=T.TEMP_PATH)) == 3
+
+
+def test_query_without_index(tmp_path):
+    """
+    查询不会创建索引，索引不存在或者没有表时返回空结果
+    """
+    swanlog_dir = str(tmp_path)
+    assert list_runs(swanlog_dir=swanlog_dir) == []
+    assert best_runs("val/acc", swanlog_dir=swanlog_dir) == []
+    assert os.listdir(swanlog_dir) == []
+    # 写入器刚刚创建了空的数据库文件
+    open(index_path(swanlog_dir), "w").close()
+    assert list_runs(swanlog_dir=swanlog_dir) == []
+    assert os.path.getsize(index_path(swanlog_dir)) == 0
@@ -0,0 +1,106 @@
+"""
+@author: cunyue
+@file: test_store.py
+@time: 2025/7/9 14:02
+@description: 测试标量指标的列式存储
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+import tutils as T
+from swanlab.data import store
+from swanlab.data.store import ScalarBuffer, read_scalars, convert_scalars, has_scalars
+from swanlab.toolkit import create_time
+
+
+def write_slices(column_dir: str, metrics: list, slice_size: int = 1000):
+    """
+    按照本地模式的格式写入分片日志
+    """
+    os.makedirs(column_dir, exist_ok=True)
+    for i, metric in enumerate(metrics):
+        name = f"{(i // slice_size + 1) * slice_size}.log"
+        with open(os.path.join(column_dir, name), "a", encoding="utf-8") as f:
+            f.write(json.dumps(metric) + "\n")
+
+
+def new_metric(step: int, data):
+    return {"index": step, "data": data, "create_time": create_time()}
+
+
+def append(column_dir: str, metrics: list):
+    buffer = ScalarBuffer()
+    for metric in metrics:
+        buffer.append(metric)
+    os.makedirs(column_dir, exist_ok=True)
+    for name, data in buffer.dump().items():
+        with open(os.path.join(column_dir, name), "ab") as f:
+            f.write(data)
+    assert len(buffer) == 0
+
+
+def test_read_write():
+    column_dir = os.path.join(T.TEMP_PATH, "0")
+    metrics = [new_metric(i, i * 0.5) for i in range(100)]
+    append(column_dir, metrics[:50])
+    append(column_dir, metrics[50:])
+    columns = read_scalars(column_dir)
+    assert isinstance(columns.steps, np.memmap)
+    assert len(columns) == 100
+    assert columns.steps.tolist() == list(range(100))
+    assert columns.values.tolist() == [i * 0.5 for i in range(100)]
+    assert np.all(np.diff(columns.timestamps) >= 0)
+    # 特殊值
+    append(column_dir, [new_metric(100, "NaN"), new_metric(101, "INF")])
+    columns = read_scalars(column_dir)
+    assert math.isnan(columns.values[100]) and math.isinf(columns.values[101])
+
+
+def test_read_torn():
+    """
+    未写入完整的数据点被忽略
+    """
+    column_dir = os.path.join(T.TEMP_PATH, "0")
+    append(column_dir, [new_metric(i, i) for i in range(10)])
+    with open(os.path.join(column_dir, store.TIME_FILE), "ab") as f:
+        f.write(b"\x00" * 12)
+    with open(os.path.join(column_dir, store.VALUE_FILE), "r+b") as f:
+        f.truncate(8 * 9 + 3)
+    assert len(read_scalars(column_dir)) == 9
+
+
+def test_read_without_numpy(monkeypatch):
+    column_dir = os.path.join(T.TEMP_PATH, "0")
+    append(column_dir, [new_metric(i, i) for i in range(10)])
+    monkeypatch.setattr(store, "np", None)
+    columns = read_scalars(column_dir)
+    assert list(columns.steps) == list(range(10))
+    assert list(columns.values) == [float(i) for i in range(10)]
+
+
+def test_read_empty():
+    column_dir = os.path.join(T.TEMP_PATH, "0")
+    append(column_dir, [])
+    assert len(read_scalars(column_dir)) == 0
+    with pytest.raises(FileNotFoundError):
+        read_scalars(os.path.join(T.TEMP_PATH, "1"))
+
+
+def test_convert():
+    log_dir = os.path.join(T.TEMP_PATH, "logs")
+    scalars = [new_metric(i, i * 0.1) for i in range(2500)]
+    write_slices(os.path.join(log_dir, "0"), scalars)
+    write_slices(os.path.join(log_dir, "1"), [new_metric(i, ["a.png"]) for i in range(10)])
+    converted = convert_scalars(log_dir)
+    assert converted == [os.path.join(log_dir, "0")]
+    assert not has_scalars(os.path.join(log_dir, "1"))
+    columns = read_scalars(os.path.join(log_dir, "0"))
+    assert columns.steps.tolist() == list(range(2500))
+    assert columns.values.tolist() == [i * 0.1 for i in range(2500)]
+    # 已经转换的列被跳过
+    assert convert_scalars(log_dir) == []
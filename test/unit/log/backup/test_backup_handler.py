@@ -0,0 +1,51 @@
+"""
+@author: cunyue
+@file: test_backup_handler.py
+@time: 2025/7/17 10:20
+@description: 测试备份处理器
+"""
+
+import os
+
+from nanoid import generate
+
+from swanlab.log.backup import BackupHandler
+from swanlab.log.backup.datastore import DataStore
+from tutils import TEMP_PATH
+
+
+def read_records(path):
+    ds = DataStore()
+    ds.open_for_scan(path)
+    records = []
+    try:
+        while True:
+            record = ds.scan_available()
+            if record is None:
+                break
+            records.append(record)
+    finally:
+        ds.close()
+    return records
+
+
+def test_timed_flush(monkeypatch):
+    """
+    写入停止后，缓冲区中的记录由后台线程定时刷写，其他进程无需等待下一次写入即可读取
+    """
+    monkeypatch.setattr(BackupHandler, "FLUSH_INTERVAL", 3600)
+    run_dir = os.path.join(TEMP_PATH, generate())
+    os.mkdir(run_dir)
+    handler = BackupHandler()
+    path = os.path.join(run_dir, BackupHandler.BACKUP_FILE)
+    handler.start(run_dir, run_dir, "exp", "", [])
+    # 等待写入完成，此时记录仍在缓冲区中
+    handler.executor.submit(lambda: None).result()
+    assert os.path.getsize(path) == 0
+    # 模拟一次定时刷写
+    handler.flush()
+    handler.executor.submit(lambda: None).result()
+    # Header、Project、Experiment 三条记录均已刷写到文件
+    assert len(read_records(path)) == 3
+    handler.stop(0)
+    assert handler._flush_thread.is_alive() is False
@@ -7,9 +7,10 @@
 
 import os.path
 
+import pytest
 from nanoid import generate
 
-from swanlab.log.backup.datastore import DataStore
+from swanlab.log.backup.datastore import DataStore, CorruptRecordError, LEVELDBLOG_BLOCK_LEN
 from tutils import TEMP_PATH
 
 logs = [generate(size=l) for l in range(1, 100001, 1000)]
@@ -37,3 +38,91 @@ def test_scan(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
     for i in range(len(logs)):
         log = ds.scan()
         assert log == logs[i], "Error: Scanned log does not match written log"
+
+
+def test_scan_available(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
+    """
+    测试读取正在写入的文件，末尾未写入完整的记录在写入完成后才能被读取
+    """
+    test_write(filename)
+    with open(filename, "rb") as f:
+        content = f.read()
+    partial = os.path.join(TEMP_PATH, "partial.swanlab")
+    # 每次追加一部分数据，模拟正在写入的文件
+    chunk_size = 7919
+    with open(partial, "wb") as f:
+        f.write(content[:chunk_size])
+        f.flush()
+        ds = DataStore()
+        ds.open_for_scan(partial)
+        scanned = []
+        for offset in range(chunk_size, len(content) + chunk_size, chunk_size):
+            while True:
+                log = ds.scan_available()
+                if log is None:
+                    break
+                scanned.append(log)
+            f.write(content[offset : offset + chunk_size])
+            f.flush()
+        while True:
+            log = ds.scan_available()
+            if log is None:
+                break
+            scanned.append(log)
+        ds.close()
+    assert scanned == logs
+
+
+def corrupt(filename: str, offset: int):
+    """
+    翻转文件中某个字节，模拟损坏的扇区
+    """
+    with open(filename, "r+b") as f:
+        f.seek(offset)
+        b = f.read(1)
+        f.seek(offset)
+        f.write(bytes([b[0] ^ 0xFF]))
+
+
+def test_scan_corrupt(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
+    """
+    严格模式下遇到损坏的数据抛出异常
+    """
+    test_write(filename)
+    corrupt(filename, LEVELDBLOG_BLOCK_LEN * 3 + 100)
+    ds = DataStore()
+    ds.open_for_scan(filename)
+    with pytest.raises(CorruptRecordError):
+        list(ds)
+
+
+def test_scan_recover(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
+    """
+    恢复模式下跳过损坏的数据块，其余记录完整读取
+    """
+    test_write(filename)
+    corrupt(filename, LEVELDBLOG_BLOCK_LEN * 3 + 100)
+    ds = DataStore()
+    ds.open_for_scan(filename, recover=True)
+    scanned = list(ds)
+    assert ds.lost_records >= 1
+    assert ds.lost_bytes > 0
+    # 只丢失损坏数据块附近的记录
+    assert len(logs) - 3 <= len(scanned) <= len(logs) - ds.lost_records
+    # 剩余的记录顺序不变
+    assert all(log in logs for log in scanned)
+    assert [logs.index(log) for log in scanned] == sorted(logs.index(log) for log in scanned)
+
+
+def test_scan_recover_torn_tail(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
+    """
+    恢复模式下末尾未写入完整的记录被丢弃
+    """
+    test_write(filename)
+    size = os.stat(filename).st_size
+    with open(filename, "r+b") as f:
+        f.truncate(size - 10)
+    ds = DataStore()
+    ds.open_for_scan(filename, recover=True)
+    assert list(ds) == logs[:-1]
+    assert ds.lost_records == 1
@@ -0,0 +1,94 @@
+"""
+@author: cunyue
+@file: test_encoder.py
+@time: 2025/7/8 14:20
+@description: 测试高频备份记录的快速编码器
+"""
+
+import timeit
+
+import pytest
+
+from swanlab.log.backup.encoder import encode_metric, encode_logs
+from swanlab.log.backup.models import BaseModel, Metric, Log, Scalar, Media
+from swanlab.toolkit import ColumnInfo, MetricInfo, ChartType, MediaBuffer, create_time, ParseErrorInfo
+from tutils import TEMP_PATH
+
+
+def make_metric(key: str, chart_type: ChartType, data, buffers=None, error=None) -> MetricInfo:
+    column_info = ColumnInfo(
+        key=key,
+        kid="3",
+        name=None,
+        cls="CUSTOM",
+        chart_type=chart_type,
+        chart_reference="STEP",
+        section_name=None,
+        section_type="PUBLIC",
+    )
+    return MetricInfo(
+        column_info=column_info,
+        metric={"index": 1, "data": data, "create_time": create_time()},
+        metric_buffers=buffers,
+        metric_summary={},
+        metric_step=1,
+        metric_epoch=2,
+        metric_file_name="1000.log",
+        swanlab_logdir=TEMP_PATH,
+        swanlab_media_dir=TEMP_PATH,
+        error=error,
+    )
+
+
+@pytest.mark.parametrize("data", [1, 0.5, float("nan"), float("inf"), -1e308])
+def test_encode_scalar(data):
+    metric_info = make_metric("loss/训练", ChartType.LINE, data)
+    record = encode_metric(metric_info)
+    assert record == Metric.from_metric_info(metric_info).to_record()
+    assert isinstance(BaseModel.from_record(record), Scalar)
+
+
+def test_encode_media():
+    metric_info = make_metric("image/a b", ChartType.IMAGE, ["a.png", "b.png"], buffers=[MediaBuffer(), MediaBuffer()])
+    record = encode_metric(metric_info)
+    assert record == Metric.from_metric_info(metric_info).to_record()
+    media = BaseModel.from_record(record)
+    assert isinstance(media, Media)
+    assert media.buffers_name == ["a.png", "b.png"]
+    # 没有媒体文件的媒体指标，例如文本
+    metric_info = make_metric("text", ChartType.TEXT, ["hello"])
+    assert encode_metric(metric_info) == Metric.from_metric_info(metric_info).to_record()
+
+
+def test_encode_error_metric():
+    metric_info = make_metric("loss", ChartType.LINE, None, error=ParseErrorInfo("float", "str", ChartType.LINE))
+    assert encode_metric(metric_info) is None
+
+
+@pytest.mark.parametrize("log_type", ["stdout", "stderr"])
+def test_encode_logs(log_type):
+    log_data = {
+        "type": log_type,
+        "contents": [
+            {"message": "hello \"world\"\n你好", "create_time": create_time(), "epoch": 1},
+            {"message": "\x1b[31mred\x1b[0m", "create_time": create_time(), "epoch": 2},
+        ],
+    }
+    records = encode_logs(log_data)
+    assert records == [log.to_record() for log in Log.from_log_data(log_data)]
+
+
+def test_benchmark():
+    """
+    对比快速编码器与 pydantic 模型在备份线程上每秒编码的记录数
+    两者在同一进程中交替测量并取多次中最快的一次，只比较相对速度，避免受机器负载影响
+    """
+    metric_infos = [make_metric(f"loss{i % 10}", ChartType.LINE, i * 0.1) for i in range(1000)]
+
+    def rate(encode) -> float:
+        cost = min(timeit.repeat(lambda: [encode(m) for m in metric_infos], number=1, repeat=5))
+        return len(metric_infos) / cost
+
+    pydantic_rate = rate(lambda m: Metric.from_metric_info(m).to_record())
+    fast_rate = rate(encode_metric)
+    assert fast_rate > pydantic_rate
@@ -0,0 +1,64 @@
+"""
+@author: cunyue
+@file: test_repair.py
+@time: 2025/7/7 14:30
+@description: 测试备份文件修复
+"""
+
+import os.path
+
+from click.testing import CliRunner
+from nanoid import generate
+
+from swanlab.cli import cli
+from swanlab.log.backup import BackupHandler
+from swanlab.log.backup.datastore import DataStore, LEVELDBLOG_BLOCK_LEN
+from swanlab.log.backup.repair import repair
+from tutils import TEMP_PATH
+
+logs = [generate(size=l) for l in range(1, 100001, 1000)]
+
+
+def write_corrupted(filename: str):
+    """
+    写入日志并损坏其中一个数据块
+    """
+    ds = DataStore()
+    ds.open_for_write(filename)
+    for log in logs:
+        ds.write(log)
+    ds.close()
+    with open(filename, "r+b") as f:
+        f.seek(LEVELDBLOG_BLOCK_LEN * 2 + 10)
+        f.write(b"\x00" * 10)
+
+
+def test_repair():
+    filename = os.path.join(TEMP_PATH, BackupHandler.BACKUP_FILE)
+    write_corrupted(filename)
+    output = os.path.join(TEMP_PATH, "repaired.swanlab")
+    count, lost_records, lost_bytes = repair(filename, output)
+    assert count <= len(logs) - lost_records
+    assert lost_records > 0 and lost_bytes > 0
+    # 修复后的文件可以被严格模式读取
+    ds = DataStore()
+    ds.open_for_scan(output)
+    assert len(list(ds)) == count
+    ds.close()
+
+
+def test_cli_repair_in_place():
+    filename = os.path.join(TEMP_PATH, BackupHandler.BACKUP_FILE)
+    write_corrupted(filename)
+    result = CliRunner().invoke(cli, ["backup", "repair", TEMP_PATH])
+    assert result.exit_code == 0
+    assert os.path.exists(filename + ".bak")
+    assert not os.path.exists(filename + ".repaired")
+    ds = DataStore()
+    ds.open_for_scan(filename)
+    assert 0 < len(list(ds)) < len(logs)
+    ds.close()
+    # 再次修复时没有损坏，文件不变
+    result = CliRunner().invoke(cli, ["backup", "repair", TEMP_PATH])
+    assert result.exit_code == 0
+    assert not os.path.exists(filename + ".bak.bak")
@@ -0,0 +1,92 @@
+"""
+@author: cunyue
+@file: test_segment.py
+@time: 2025/7/4 17:21
+@description: 测试分段备份文件的读写
+"""
+
+import os.path
+
+import pytest
+from nanoid import generate
+
+from swanlab.log.backup.datastore import LEVELDBLOG_BLOCK_LEN
+from swanlab.log.backup.segment import SegmentedDataStore, read_manifest, segment_filename, MANIFEST_FILE
+from tutils import TEMP_PATH
+
+logs = [generate(size=l) for l in range(1, 100001, 1000)]
+
+
+def test_segment_filename():
+    assert segment_filename("/a/backup.swanlab", 0) == "/a/backup.swanlab"
+    assert segment_filename("/a/backup.swanlab", 3) == "/a/backup.3.swanlab"
+
+
+def test_no_segment(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
+    """
+    未开启分段时只有一个备份文件，没有清单
+    """
+    ds = SegmentedDataStore()
+    ds.open_for_write(filename)
+    for log in logs:
+        ds.write(log)
+    ds.close()
+    assert not os.path.exists(segment_filename(filename, 1))
+    assert read_manifest(filename) is None
+    ds = SegmentedDataStore()
+    ds.open_for_scan(filename)
+    assert list(ds) == logs
+
+
+def test_segment(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
+    """
+    开启分段后，所有分段被视为一个连续的日志
+    """
+    ds = SegmentedDataStore(segment_size=LEVELDBLOG_BLOCK_LEN * 4)
+    ds.open_for_write(filename)
+    for log in logs:
+        ds.write(log)
+    ds.close()
+    manifest = read_manifest(filename)
+    assert manifest["complete"] is True
+    segments = manifest["segments"]
+    assert len(segments) > 1
+    # 清单中的记录范围连续且覆盖所有记录
+    start = 0
+    for index, segment in enumerate(segments):
+        assert segment["file"] == os.path.basename(segment_filename(filename, index))
+        assert segment["start"] == start
+        start += segment["count"]
+    assert start == len(logs)
+    # 读取
+    ds = SegmentedDataStore()
+    ds.open_for_scan(filename)
+    assert list(ds) == logs
+    # 清单中的分段缺失时报错
+    os.remove(segment_filename(filename, len(segments) - 1))
+    with pytest.raises(FileNotFoundError):
+        SegmentedDataStore().open_for_scan(filename)
+    os.remove(os.path.join(TEMP_PATH, MANIFEST_FILE))
+
+
+def test_segment_scan_available(filename=os.path.join(TEMP_PATH, "backup.swanlab")):
+    """
+    读取正在写入的分段备份文件，跨分段时不会遗漏记录
+    """
+    writer = SegmentedDataStore(segment_size=LEVELDBLOG_BLOCK_LEN)
+    writer.open_for_write(filename)
+    writer.ensure_flushed()
+    reader = SegmentedDataStore()
+    reader.open_for_scan(filename)
+    scanned = []
+    for log in logs:
+        writer.write(log)
+        writer.ensure_flushed()
+        while True:
+            record = reader.scan_available()
+            if record is None:
+                break
+            scanned.append(record)
+    writer.close()
+    assert reader.segment > 0
+    assert scanned == logs
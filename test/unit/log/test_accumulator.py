@@ -0,0 +1,85 @@
+"""
+@author: cunyue
+@file: test_accumulator.py
+@time: 2025/7/11 11:05
+@description: 测试终端日志累积器
+"""
+
+import time
+
+from swanlab.log.accumulator import LogAccumulator
+from swanlab.log.type import LogData
+
+
+def new_log_data(log_type, start: int, count: int = 1) -> LogData:
+    return LogData(
+        type=log_type,
+        contents=[{"message": str(i), "create_time": "", "epoch": i} for i in range(start, start + count)],
+    )
+
+
+def test_batch_by_latency():
+    """
+    超过最大延迟后，累积的日志由后台线程交给处理函数
+    """
+    received = []
+    accumulator = LogAccumulator(received.append, max_latency=0.1)
+    for i in range(10):
+        accumulator(new_log_data("stdout", i))
+    accumulator(new_log_data("stderr", 10))
+    assert received == []
+    time.sleep(0.5)
+    assert len(received) == 2
+    assert received[0]["type"] == "stdout"
+    assert [c["epoch"] for c in received[0]["contents"]] == list(range(10))
+    assert received[1]["type"] == "stderr"
+    accumulator.close()
+
+
+def test_batch_by_size():
+    received = []
+    accumulator = LogAccumulator(received.append, max_latency=100)
+    accumulator(new_log_data("stdout", 0, LogAccumulator.MAX_LINES - 1))
+    assert received == []
+    accumulator(new_log_data("stdout", LogAccumulator.MAX_LINES - 1, 2))
+    assert len(received) == 1 and len(received[0]["contents"]) == LogAccumulator.MAX_LINES + 1
+    accumulator.close()
+
+
+def test_close():
+    """
+    关闭时交出剩余的日志，此后的日志直接交给处理函数
+    """
+    received = []
+    accumulator = LogAccumulator(received.append, max_latency=100)
+    accumulator(new_log_data("stdout", 0))
+    accumulator.close()
+    assert len(received) == 1
+    accumulator(new_log_data("stdout", 1))
+    assert len(received) == 2
+
+
+def test_no_latency():
+    received = []
+    accumulator = LogAccumulator(received.append, max_latency=0)
+    accumulator(new_log_data("stdout", 0))
+    assert len(received) == 1
+
+
+def test_reentrant():
+    """
+    处理函数中再次输出日志不会死锁
+    """
+    received = []
+    accumulator = None
+
+    def handler(log_data: LogData):
+        received.append(log_data)
+        if len(received) == 1:
+            accumulator(new_log_data("stderr", 100))
+
+    accumulator = LogAccumulator(handler, max_latency=0.05)
+    accumulator(new_log_data("stdout", 0))
+    time.sleep(0.5)
+    accumulator.close()
+    assert [r["type"] for r in received] == ["stdout", "stderr"]
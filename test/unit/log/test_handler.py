@@ -0,0 +1,95 @@
+"""
+@author: cunyue
+@file: test_handler.py
+@time: 2025/7/12 16:00
+@description: 测试 logging 集成
+"""
+
+import logging
+import sys
+from typing import List
+
+import pytest
+
+from swanlab.log import swanlog, SwanLabLoggingHandler
+from swanlab.log.accumulator import LogAccumulator
+from swanlab.log.backup.encoder import encode_logs
+from swanlab.log.type import LogData, get_log_level
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("swanlab.test.handler")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = SwanLabLoggingHandler()
+    logger.addHandler(handler)
+    yield logger
+    logger.removeHandler(handler)
+    swanlog.reset()
+
+
+def test_levels(logger, capsys):
+    received: List[LogData] = []
+    swanlog.start_proxy("all", 1024, received.append)
+    print("before")
+    logger.debug("debug")
+    logger.info("info")
+    logger.warning("warning")
+    logger.error("error")
+    logger.critical("multi\nline")
+    swanlog.stop_proxy()
+    contents = [(get_log_level(r), c["message"], c["epoch"]) for r in received for c in r["contents"]]
+    assert contents == [
+        ("INFO", "before", 1),
+        ("INFO", "DEBUG:swanlab.test.handler:debug", 2),
+        ("INFO", "INFO:swanlab.test.handler:info", 3),
+        ("WARN", "WARNING:swanlab.test.handler:warning", 4),
+        ("ERROR", "ERROR:swanlab.test.handler:error", 5),
+        ("ERROR", "CRITICAL:swanlab.test.handler:multi", 6),
+        ("ERROR", "line", 7),
+    ]
+    # 日志只输出到终端一次，没有被代理再次捕获
+    assert capsys.readouterr().err.count("warning") == 1
+
+
+def test_create_time(logger):
+    received: List[LogData] = []
+    swanlog.start_proxy("stderr", 1024, received.append)
+    record = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, "old", (), None)
+    record.created = 0
+    logger.handle(record)
+    swanlog.stop_proxy()
+    assert received[0]["contents"][0]["create_time"] == "1970-01-01T00:00:00+00:00"
+
+
+def test_not_proxied(logger, capsys):
+    """
+    未开启代理时只输出到终端
+    """
+    logger.warning("no proxy")
+    assert "WARNING:swanlab.test.handler:no proxy" in capsys.readouterr().err
+
+
+def test_accumulate_by_level():
+    received: List[LogData] = []
+    accumulator = LogAccumulator(received.append)
+    for level in ("WARN", "ERROR", "WARN"):
+        accumulator(LogData(type="stderr", contents=[{"message": level, "create_time": "", "epoch": 1}], level=level))
+    accumulator(LogData(type="stderr", contents=[{"message": "plain", "create_time": "", "epoch": 2}]))
+    accumulator.close()
+    assert [(r.get("level"), len(r["contents"])) for r in received] == [("WARN", 2), ("ERROR", 1), (None, 1)]
+    assert '"level": "ERROR"' in encode_logs(received[1])[0]
+    assert '"level": "WARN"' in encode_logs(received[2])[0]
+
+
+def test_stderr_still_captured(logger):
+    """
+    其他输出到标准错误流的内容仍然被代理捕获
+    """
+    received: List[LogData] = []
+    swanlog.start_proxy("stderr", 1024, received.append)
+    sys.stderr.write("plain\n")
+    swanlog.stop_proxy()
+    assert received[0]["contents"][0]["message"] == "plain"
+    assert "level" not in received[0]
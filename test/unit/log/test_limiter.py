@@ -0,0 +1,142 @@
+"""
+@author: cunyue
+@file: test_limiter.py
+@time: 2025/7/12 11:30
+@description: 测试终端日志限流器
+"""
+
+import sys
+from typing import List
+
+from swanlab import Settings
+from swanlab.log import swanlog
+from swanlab.log.limiter import LogLimiter, TokenBucket
+from swanlab.log.type import LogData
+
+
+def test_dedup():
+    limiter = LogLimiter()
+    messages = ["start"] + ["warning"] * 1000 + ["", "", "end", "end"]
+    assert limiter.filter("stdout", messages) == ["start", "warning", "", "", "end"]
+    # 重复跨越多个批次，输出流之间互不影响
+    assert limiter.filter("stdout", ["end"] * 10) == []
+    assert limiter.filter("stderr", ["end"]) == ["end"]
+    assert limiter.finish("stdout") == [
+        "[swanlab] message repeated 999 times: warning",
+        "[swanlab] message repeated 11 times: end",
+    ]
+    assert limiter.finish("stdout") == []
+    assert limiter.repeated_lines == 1010
+
+
+def test_dedup_interleaved():
+    """
+    多个 worker 交替输出的重复日志也会被去重
+    """
+    limiter = LogLimiter()
+    messages = [f"worker {i % 4}: warning" for i in range(400)]
+    assert limiter.filter("stdout", messages) == messages[:4]
+    assert limiter.finish("stdout") == [f"[swanlab] message repeated 99 times: worker {i}: warning" for i in range(4)]
+
+
+def test_dedup_evict(monkeypatch):
+    """
+    指纹表已满时淘汰最久未出现的日志，并输出它尚未提示的重复次数
+    """
+    monkeypatch.setattr(LogLimiter, "MAX_FINGERPRINTS", 2)
+    limiter = LogLimiter()
+    assert limiter.filter("stdout", ["a", "a", "b", "c", "a"]) == [
+        "a",
+        "b",
+        "[swanlab] message repeated 1 times: a",
+        "c",
+        "a",
+    ]
+    assert limiter.finish("stdout") == []
+
+
+def test_dedup_interval(monkeypatch):
+    """
+    重复持续超过提示间隔时输出一次提示
+    """
+    limiter = LogLimiter()
+    monkeypatch.setattr(LogLimiter, "REPEAT_INTERVAL", 0)
+    assert limiter.filter("stdout", ["a", "a", "a"]) == [
+        "a",
+        "[swanlab] message repeated 1 times: a",
+        "[swanlab] message repeated 1 times: a",
+    ]
+
+
+def test_rate_limit_lines():
+    limiter = LogLimiter(dedup=False, max_lines_per_second=10, burst=1)
+    output = limiter.filter("stdout", [str(i) for i in range(100)])
+    assert output == [str(i) for i in range(10)]
+    assert limiter.dropped_lines == 90
+    # 令牌恢复后先输出被丢弃的行数
+    getattr(limiter, "_lines").tokens = 10
+    assert limiter.filter("stdout", ["next"])[:2] == ["[swanlab] 90 lines suppressed by rate limit", "next"]
+    assert limiter.summary() == (
+        "[swanlab] terminal log capture suppressed 0 repeated lines and 90 lines exceeding the rate limit"
+    )
+
+
+def test_rate_limit_bytes():
+    limiter = LogLimiter(dedup=False, max_bytes_per_second=100, burst=1)
+    # 每行 10 个中文字符，UTF-8 编码为 30 字节
+    output = limiter.filter("stdout", ["中" * 10] * 5)
+    assert len(output) == 3
+    assert limiter.dropped_lines == 2
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.consume(20)
+    assert not bucket.consume(1)
+    bucket.refill(getattr(bucket, "_last") + 0.5)
+    assert bucket.tokens == 5
+    bucket.refill(getattr(bucket, "_last") + 100)
+    assert bucket.tokens == 20
+
+
+def test_no_suppression():
+    limiter = LogLimiter(max_lines_per_second=1000, max_bytes_per_second=1024 * 1024)
+    messages = [str(i) for i in range(100)]
+    assert limiter.filter("stdout", messages) == messages
+    assert limiter.summary() is None
+
+
+def test_proxy(capsys):
+    """
+    代理中的日志被限流，结束时输出统计，epoch 只计算保留的日志，第一次丢弃日志时在终端提示一次
+    """
+    received: List[LogData] = []
+    swanlog.start_proxy("stderr", 1024, received.append, limiter=LogLimiter(max_lines_per_second=10, burst=1))
+    try:
+        for _ in range(100):
+            sys.stderr.write("same warning\n")
+        for i in range(100):
+            sys.stderr.write(f"line {i}\n")
+        swanlog.finish_proxy()
+        assert swanlog.epoch == 12
+    finally:
+        swanlog.reset()
+    messages = [c["message"] for r in received for c in r["contents"]]
+    assert messages[0] == "same warning"
+    assert messages[1:10] == [f"line {i}" for i in range(9)]
+    assert messages[-2] == "[swanlab] message repeated 99 times: same warning"
+    assert messages[-1] == (
+        "[swanlab] terminal log capture suppressed 99 repeated lines and 91 lines exceeding the rate limit"
+    )
+    assert [c["epoch"] for r in received for c in r["contents"]] == list(range(1, 13))
+    assert capsys.readouterr().err.count("exceeds the log rate limit") == 1
+
+
+def test_default_off():
+    """
+    去重与限速需要用户主动开启
+    """
+    settings = Settings()
+    assert settings.log_dedup is False
+    assert settings.log_max_lines_per_second is None
+    assert settings.log_max_bytes_per_second is None
@@ -7,9 +7,11 @@ r"""
 @Description:
     测试swanlog类，只需测试其日志监听功能
 """
+
 import os
 import sys
 import time
+from typing import List
 
 import pytest
 from nanoid import generate
@@ -108,6 +110,7 @@ class TestSwanLogInstall:
         print(a)
         b = generate()
         print(b)
+        swanlog.flush_proxy()
         assert os.path.exists(log_file)
         # 比较最后两行内容
         with open(log_file, "r") as f:
@@ -129,7 +132,7 @@ class TestSwanLogInstall:
         # 默认最大长度为1024
         a = generate(size=3000)
         print(a)
-        time.sleep(0.1)
+        swanlog.flush_proxy()
         with open(os.path.join(log_file), "r") as f:
             content = f.readlines()
             assert content[-1] == a[:max_len] + "\n"
@@ -144,7 +147,7 @@ class TestSwanLogInstall:
         swanlog.warning(a)
         b = generate()
         swanlog.error(b)
-        time.sleep(0.1)
+        swanlog.flush_proxy()
         with open(log_file, "r") as f:
             content = f.readlines()
             assert content[-2] == "swanlab: " + a + "\n"
@@ -159,7 +162,7 @@ class TestSwanLogInstall:
         swanlog.debug(a)
         b = generate()
         swanlog.info(b)
-        time.sleep(0.1)
+        swanlog.flush_proxy()
         with open(log_file, "r") as f:
             content = f.readlines()
             assert content[-2] == "test write to file\n"
@@ -175,8 +178,8 @@ class TestSwanLogInstall:
         sys.stderr.write(a + "\n")
         b = generate()
         sys.stderr.write(b + "\n")
+        swanlog.flush_proxy()
         assert os.path.exists(log_file)
-        time.sleep(0.1)
         # 比较最后两行内容
         with open(log_file, "r") as f:
             content = f.readlines()
@@ -191,7 +194,7 @@ class TestSwanLogInstall:
         sys.stderr.write(a + "\n")
         b = generate()
         sys.stderr.write(b + "\n")
-        time.sleep(0.1)
+        swanlog.flush_proxy()
         assert os.path.exists(log_file)
         # 比较最后两行内容
         with open(log_file, "r") as f:
@@ -234,3 +237,52 @@ def test_clean_r():
     assert clean_control_chars("\r1234\n") == (["1234"], '')
     assert clean_control_chars("\r1234\r") == ([], "\r1234\r")
     assert clean_control_chars("\r1234\r\n\r") == ([""], '\r')
+
+
+class TestProgressBar:
+    """
+    测试进度条输出的合并
+    """
+
+    @staticmethod
+    def teardown_method():
+        swanlog.reset()
+
+    @staticmethod
+    def start_proxy():
+        received: List[LogData] = []
+        swanlog.start_proxy("stderr", 1024, received.append)
+        return received
+
+    def test_final_state(self):
+        """
+        进度条重绘时只保留最终状态
+        """
+        received = self.start_proxy()
+        sys.stderr.write("start\n")
+        for i in range(100):
+            sys.stderr.write(f"\r{i}%|")
+        sys.stderr.write("\r100%|\n")
+        swanlog.flush_proxy()
+        assert [c["message"] for r in received for c in r["contents"]] == ["start", "100%|"]
+        # 未完成的行只保留最后一次重绘
+        sys.stderr.write("\rloading 1")
+        sys.stderr.write("\rloading 2")
+        swanlog.flush_proxy()
+        assert getattr(swanlog, "_SwanLog__stderr_buffer") == "\rloading 2"
+        swanlog.stop_proxy()
+        assert received[-1]["contents"][-1]["message"] == "loading 2"
+
+    def test_coalesce_many_updates(self):
+        """
+        写入 100 万次进度条更新，所有更新合并为一行
+        """
+        received = self.start_proxy()
+        total = 1000000
+        for i in range(total):
+            sys.stderr.write(f"\r{i}/{total}")
+        sys.stderr.write("\n")
+        swanlog.flush_proxy()
+        swanlog.stop_proxy()
+        lines = [c["message"] for r in received for c in r["contents"]]
+        assert lines == [f"{total - 1}/{total}"]
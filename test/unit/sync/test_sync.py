@@ -5,8 +5,12 @@
 @description: 测试同步（仅测试本地解析）
 """
 
+import functools
+import multiprocessing
 import os.path
 import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
 
 import numpy as np
@@ -18,7 +22,13 @@ from swanlab import sync
 from swanlab.log.backup import BackupHandler
 from swanlab.log.backup.datastore import DataStore
 from swanlab.log.backup.models import ModelsParser
+from swanlab.core_python import reset_client
+from swanlab.data.index import best_runs
+from swanlab.sync import parallel, pipeline
+from swanlab.sync.parallel import sync_runs
 from swanlab.toolkit import MetricInfo
+from tutils import TEMP_PATH
+from tutils.setup import mock_login_info
 
 
 def test_sync():
@@ -127,3 +137,196 @@ def test_sync():
     # 验证媒体类型，这里简单一点，因为很难判断比如媒体类型的内容是否正确，所以只验证指标的数量和类型
     backup_images = [metric for metric in record_metrics if metric.column_info.chart_type.value.column_type == 'IMAGE']
     assert len(backup_images) == record_images_count, "Total images count does not match"
+
+
+class FakeClient:
+    """
+    模拟客户端，只记录调用
+    """
+
+    history_exp_count = 0
+    web_exp_url = "https://swanlab.cn/@test/test/runs/test"
+
+    def __init__(self):
+        self.mounted = []
+        self.success = None
+
+    def mount_project(self, name, username=None, public=None):
+        self.mounted.append(name)
+
+    def mount_exp(self, exp_name, colors, description=None, tags=None):
+        self.mounted.append(exp_name)
+
+    def update_state(self, success: bool):
+        self.success = success
+
+
+def test_sync_pipeline_chunks(monkeypatch):
+    """
+    流式同步时每次上传的数据量不超过块大小
+    """
+    run = swanlab.init(mode="offline", settings=swanlab.Settings(hardware_monitor=False))
+    for step in range(25):
+        swanlab.log({"a": step, "b": step}, step=step)
+    swanlab.finish()
+    run_dir = run.public.run_dir.__str__()
+    # ---------------------------------- 拦截上传函数 ----------------------------------
+    uploads = {"columns": [], "scalars": [], "logs": [], "files": []}
+
+    def recorder(name):
+        def wrapper(data, *args, **kwargs):
+            uploads[name].append(len(data))
+            return None, None
+
+        return wrapper
+
+    monkeypatch.setattr(pipeline, "SCALAR_CHUNK_SIZE", 10)
+    monkeypatch.setattr(pipeline.uploader, "upload_columns", recorder("columns"))
+    monkeypatch.setattr(pipeline.uploader, "upload_scalar_metrics", recorder("scalars"))
+    monkeypatch.setattr(pipeline.uploader, "upload_logs", recorder("logs"))
+    monkeypatch.setattr(pipeline.uploader, "upload_files", recorder("files"))
+    # ---------------------------------- 流式同步 ----------------------------------
+    ds = DataStore()
+    ds.open_for_scan(os.path.join(run_dir, BackupHandler.BACKUP_FILE))
+    p = pipeline.SyncPipeline(run_dir)
+    p.parse_head(ds)
+    client = FakeClient()
+    p.mount(client)
+    # 挂载后尚未上传任何数据
+    assert uploads["scalars"] == []
+    for record in ds:
+        p.feed(record)
+        # 缓存的标量数量永远不超过块大小
+        assert len(p._scalars) < 10
+    p.finish()
+    ds.close()
+    assert len(client.mounted) == 2
+    assert client.success is True
+    assert sum(uploads["scalars"]) == 50
+    assert max(uploads["scalars"]) == 10
+    assert sum(uploads["columns"]) == 2
+    assert uploads["files"] == [1]
+    # ---------------------------------- 写入本地索引 ----------------------------------
+    p.write_index()
+    best = best_runs("a", swanlog_dir=os.path.dirname(run_dir))
+    assert len(best) == 1
+    assert best[0]["run_dir"] == os.path.abspath(run_dir)
+    assert best[0]["url"] == FakeClient.web_exp_url
+    assert best[0]["state"] == "FINISHED"
+    assert best[0]["value"] == 24 and best[0]["step"] == 24
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_sync_runs_report(jobs):
+    """
+    多个实验同步时，单个实验失败不影响其他实验，结果顺序与输入一致
+    """
+    paths = [os.path.join(TEMP_PATH, generate()) for _ in range(3)]
+    try:
+        results = sync_runs(paths, mock_login_info(), jobs=jobs)
+    finally:
+        reset_client()
+    assert [r.path for r in results] == paths
+    for r in results:
+        assert r.success is False
+        assert r.error == f"Directory {r.path} does not exist."
+
+
+class NamedFakeClient(FakeClient):
+    """
+    实验地址包含实验名称的模拟客户端，用于区分每个实验的同步结果
+    """
+
+    @property
+    def web_exp_url(self):
+        return f"https://swanlab.cn/@test/test/runs/{self.mounted[-1]}"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_sync_runs_success(jobs, monkeypatch, capfd):
+    """
+    多个实验依次或并行同步成功，失败的实验单独报告，子进程中实验自身的终端输出被屏蔽
+    """
+    names = [generate(), generate()]
+    paths = []
+    for name in names:
+        run = swanlab.init(experiment_name=name, mode="offline", settings=swanlab.Settings(hardware_monitor=False))
+        for step in range(5):
+            swanlab.log({"a": step}, step=step)
+        swanlab.finish()
+        paths.append(run.public.run_dir.__str__())
+    paths.append(os.path.join(TEMP_PATH, generate()))
+    # ---------------------------------- 模拟客户端与上传 ----------------------------------
+    client = NamedFakeClient()
+    monkeypatch.setattr(parallel, "create_client", lambda login_info: client)
+    monkeypatch.setattr(parallel, "get_client", lambda: client)
+    monkeypatch.setattr(sys.modules["swanlab.sync"], "get_client", lambda: client)
+    for name in ("upload_columns", "upload_scalar_metrics", "upload_logs", "upload_files"):
+        monkeypatch.setattr(pipeline.uploader, name, lambda *args, **kwargs: (None, None))
+    # 子进程通过 fork 启动才能继承上面的模拟
+    if jobs > 1:
+        if "fork" not in multiprocessing.get_all_start_methods():
+            pytest.skip("fork is not available")
+        context = multiprocessing.get_context("fork")
+        monkeypatch.setattr(parallel, "ProcessPoolExecutor", functools.partial(ProcessPoolExecutor, mp_context=context))
+    capfd.readouterr()
+    results = sync_runs(paths, mock_login_info(), jobs=jobs)
+    assert [r.path for r in results] == paths
+    assert [r.success for r in results] == [True, True, False]
+    assert [r.url for r in results[:2]] == [f"https://swanlab.cn/@test/test/runs/{name}" for name in names]
+    assert results[2].error == f"Directory {paths[2]} does not exist."
+    assert "Sync completed" not in capfd.readouterr().out
+
+
+def test_sync_runs_progress(capsys):
+    """
+    依次同步时与并行同步一致，每个实验完成后回调一次，实验自身的终端输出被屏蔽
+    """
+    paths = [os.path.join(TEMP_PATH, generate()) for _ in range(3)]
+    done = []
+    try:
+        sync_runs(paths, mock_login_info(), jobs=1, callback=done.append)
+    finally:
+        reset_client()
+    assert [r.path for r in done] == paths
+    assert "Parsing" not in capsys.readouterr().out
+
+
+def test_follow_records():
+    """
+    跟随读取正在写入的备份文件，读取到 Footer 后停止，超时没有新记录时也停止
+    """
+    run = swanlab.init(mode="offline", settings=swanlab.Settings(hardware_monitor=False))
+    for step in range(10):
+        swanlab.log({"a": step}, step=step)
+    swanlab.finish()
+    with open(os.path.join(run.public.run_dir.__str__(), BackupHandler.BACKUP_FILE), "rb") as f:
+        content = f.read()
+    # 截断末尾的 Footer，模拟正在写入的文件
+    file_path = os.path.join(TEMP_PATH, BackupHandler.BACKUP_FILE)
+    with open(file_path, "wb") as f:
+        f.write(content[:-20])
+        f.flush()
+        ds = DataStore()
+        ds.open_for_scan(file_path)
+        p = pipeline.SyncPipeline(TEMP_PATH)
+        idle = []
+        for record in pipeline.follow_records(
+            ds,
+            finished=lambda: p.footer is not None,
+            on_idle=lambda: idle.append(1),
+            poll_interval=0.01,
+            timeout=0.1,
+        ):
+            p.feed(record)
+        assert p.head_parsed
+        assert p.footer is None
+        assert len(p._scalars) == 10
+        assert len(idle) > 0
+        # 写入剩余部分，继续跟随直到读取到 Footer
+        f.write(content[-20:])
+        f.flush()
+        for record in pipeline.follow_records(ds, finished=lambda: p.footer is not None, poll_interval=0.01):
+            p.feed(record)
+        assert p.footer is not None and p.footer.success is True
+        ds.close()